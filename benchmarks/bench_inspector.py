@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmarks inspector hot paths on synthetic style sheets and widget trees.
+
+Runs headless, using Qt offscreen platform. Each operation runs `--repeat`
+times and its fastest time is reported. Loads start from an empty editor and
+include every chunk of large style sheets, so they time a whole load.
+
+Results are written as JSON, so results of different versions can be
+compared::
+
+    $ python benchmarks/bench_inspector.py --output before.json
+    $ python benchmarks/bench_inspector.py --output after.json --compare \
+        before.json
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QT_VERSION_STR, PYQT_VERSION_STR  # noqa: E402
+from PyQt5.QtWidgets import QApplication, QCheckBox, QComboBox, \
+    QGroupBox, QLabel, QLineEdit, QPushButton, QVBoxLayout, \
+    QWidget  # noqa: E402
+
+WIDGET_CLASSES = [QLabel, QPushButton, QLineEdit, QCheckBox, QComboBox]
+
+
+def make_style_sheet(rule_count):
+    """
+    :param int rule_count: number of rules.
+    :rtype: unicode
+    :return: synthetic style sheet, mixing type, object name and property
+        selectors like real sheets do.
+    """
+    rules = []
+    for i in range(rule_count):
+        class_name = WIDGET_CLASSES[i % len(WIDGET_CLASSES)].__name__
+        kind = i % 4
+        if kind == 0:
+            selector = class_name
+        elif kind == 1:
+            selector = '{}#widget{}'.format(class_name, i)
+        elif kind == 2:
+            selector = 'QGroupBox > {}[flat="true"]'.format(class_name)
+        else:
+            selector = '{}:hover'.format(class_name)
+        rules.append(
+            '{} {{\n    margin: {}px;\n    color: #{:06x};\n}}\n'.format(
+                selector, i % 7, (i * 2654435761) % 0xffffff))
+    return ''.join(rules)
+
+
+def make_widget_tree(widget_count):
+    """
+    :param int widget_count: approximate number of widgets.
+    :rtype: QWidget
+    :return: top level widget with group boxes of assorted widgets.
+    """
+    root = QWidget()
+    root_layout = QVBoxLayout(root)
+    created = 1
+    group_index = 0
+    while created < widget_count:
+        group = QGroupBox('Group {}'.format(group_index), root)
+        group_layout = QVBoxLayout(group)
+        root_layout.addWidget(group)
+        created += 1
+        for i in range(min(20, widget_count - created)):
+            widget_class = WIDGET_CLASSES[i % len(WIDGET_CLASSES)]
+            widget = widget_class(group)
+            widget.setObjectName('widget{}'.format(created))
+            group_layout.addWidget(widget)
+            created += 1
+        group_index += 1
+    root.ensurePolished()
+    return root
+
+
+def timed(function, repeat, setup=None):
+    """
+    :param callable|None setup: called before each call of function, not
+        timed.
+    :rtype: float
+    :return: fastest time of calling function `repeat` times, in seconds.
+    """
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_case(app, rule_count, widget_count, repeat):
+    """
+    Times inspector operations for a style sheet and widget tree size.
+
+    :rtype: dict(unicode, float)
+    :return: seconds spent by each operation.
+    """
+    from qt_style_sheet_inspector._inspector import StyleSheetWidget
+
+    style_sheet = make_style_sheet(rule_count)
+    edited = style_sheet + 'QLabel { padding: 1px; }\n'
+    tree = make_widget_tree(widget_count)
+    app.setStyleSheet(style_sheet)
+    widget = StyleSheetWidget()
+    widget.search_delay = 0
+    results = {}
+
+    def load():
+        # Large style sheets are loaded in chunks across event loop
+        # iterations, a load ends once all chunks are in editor
+        widget.loadStyleSheet()
+        widget._flushPendingLoad()
+
+    # Editor starts empty, since loading the text it already shows only
+    # parses what changed
+    results['load'] = timed(load, repeat, widget.style_text_edit.clear)
+
+    def apply():
+        widget.style_text_edit.setPlainText(edited)
+        widget.applyStyleSheet()
+        widget.style_text_edit.setPlainText(style_sheet)
+        widget.applyStyleSheet()
+
+    results['apply'] = timed(apply, repeat) / 2
+
+    queries = iter(range(repeat))
+
+    def search():
+        # A new query each time, so search index cache isn't hit
+        widget.search_bar.setText('margin: {}px'.format(next(queries)))
+        widget.onNextSearchHit()
+
+    results['search'] = timed(search, repeat)
+    results['next_hit'] = timed(widget.onNextSearchHit, repeat)
+
+    def undo_redo():
+        widget.onUndo()
+        widget.onRedo()
+
+    results['undo_redo'] = timed(undo_redo, repeat) / 2
+
+    # Lookup of picked widget rules, once index is built by first pick
+    picked = tree.findChildren(QWidget)
+    widget.matchingRules(tree)
+
+    def pick():
+        for picked_widget in picked:
+            widget.matchingRules(picked_widget)
+
+    results['pick'] = timed(pick, repeat) / len(picked)
+
+    widget.deleteLater()
+    tree.deleteLater()
+    app.processEvents()
+    return results
+
+
+def compare(results, baseline):
+    """
+    Prints how each timing changed from a baseline.
+    """
+    baseline_cases = {
+        (case['rules'], case['widgets']): case['timings']
+        for case in baseline['cases']
+    }
+    for case in results['cases']:
+        base = baseline_cases.get((case['rules'], case['widgets']))
+        if base is None:
+            continue
+        for name, seconds in sorted(case['timings'].items()):
+            if name in base and base[name] > 0:
+                print('{:>7} rules {:>6} widgets {:>10}: {:+.1f}%'.format(
+                    case['rules'], case['widgets'], name,
+                    (seconds / base[name] - 1) * 100))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        '--rules', default='1000,10000,100000',
+        help='comma separated number of rules of generated style sheets')
+    parser.add_argument(
+        '--widgets', default='100,1000,10000',
+        help='comma separated number of widgets of generated widget trees')
+    parser.add_argument(
+        '--repeat', type=int, default=3,
+        help='times each operation runs, fastest time is reported')
+    parser.add_argument('--output', help='JSON file to write results to')
+    parser.add_argument('--compare', help='JSON results to compare with')
+    options = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    results = {
+        'python': platform.python_version(),
+        'qt': QT_VERSION_STR,
+        'pyqt': PYQT_VERSION_STR,
+        'platform': platform.platform(),
+        'cases': [],
+    }
+    for rule_count in [int(n) for n in options.rules.split(',')]:
+        for widget_count in [int(n) for n in options.widgets.split(',')]:
+            timings = bench_case(app, rule_count, widget_count, options.repeat)
+            results['cases'].append({
+                'rules': rule_count,
+                'widgets': widget_count,
+                'timings': timings,
+            })
+            print('{:>7} rules {:>6} widgets: {}'.format(
+                rule_count, widget_count, ', '.join(
+                    '{} {:.1f} ms'.format(name, seconds * 1000)
+                    for name, seconds in sorted(timings.items()))))
+            sys.stdout.flush()
+
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,8 @@ from __future__ import absolute_import, division, print_function, \
     unicode_literals
 
 from ._inspector import StyleSheetInspector
+from ._remote import RemoteStyleSheet, StyleSheetAgent
 
 __version__ = '0.1.0'
 
-__all__ = ['StyleSheetInspector']
+__all__ = ['RemoteStyleSheet', 'StyleSheetAgent', 'StyleSheetInspector']
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import sys
+
+from qt_style_sheet_inspector._remote import main
+
+sys.exit(main())
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import namedtuple
+
+from PyQt5 import sip
+from PyQt5.QtCore import QEvent, QObject, Qt
+from PyQt5.QtWidgets import QAbstractItemView, QDialog, QHeaderView, QLabel, \
+    QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget, qApp
+
+WidgetStyleSheet = namedtuple('WidgetStyleSheet', [
+    # Widget with its own style sheet
+    'widget',
+    # Object path of widget, see `widget_path`
+    'path',
+    # Size of style sheet, in UTF-8 bytes
+    'size',
+])
+
+
+def widget_path(widget):
+    """
+    :param QWidget widget: a widget.
+    :rtype: unicode
+    :return: path of widget from its top level widget, with the class name
+        and object name (if any) of each widget, like
+        `QMainWindow#main/QWidget/QPushButton#ok`.
+    """
+    names = []
+    while widget is not None:
+        name = widget.metaObject().className()
+        if widget.objectName():
+            name += '#' + widget.objectName()
+        names.append(name)
+        widget = widget.parentWidget()
+    return '/'.join(reversed(names))
+
+
+class StyleSheetCensus(QObject):
+    """
+    Keeps track of all widgets that have their own style sheet.
+
+    The widget tree is walked only once, when census is first needed. After
+    that, an application wide event filter keeps the census up to date: a
+    widget style sheet change sends it a `StyleChange` event and widgets
+    added to or removed from a parent send `ChildAdded` and `ChildRemoved`
+    events to the parent.
+    """
+
+    _EVENT_TYPES = frozenset(
+        [QEvent.StyleChange, QEvent.ChildAdded, QEvent.ChildRemoved])
+
+    def __init__(self, excluded=None, parent=None):
+        """
+        :param QWidget|None excluded: widget whose descendants (and itself)
+            are left out of census, like the inspector.
+        :param QObject parent: parent object.
+        """
+        QObject.__init__(self, parent)
+        self.excluded = excluded
+        # Widgets with style sheets by address of C++ object, as wrappers of
+        # partially destroyed widgets may not be the same
+        self._widgets = None
+
+    def entries(self):
+        """
+        :rtype: list(WidgetStyleSheet)
+        :return: widgets with own style sheets, biggest style sheets first.
+        """
+        if self._widgets is None:
+            self._widgets = {}
+            for widget in qApp.allWidgets():
+                self._update(widget)
+            qApp.installEventFilter(self)
+
+        entries = []
+        for key, widget in list(self._widgets.items()):
+            if sip.isdeleted(widget):
+                # Top level widgets have no parent to notify their removal
+                del self._widgets[key]
+                continue
+            if self._isExcluded(widget):
+                continue
+            entries.append(WidgetStyleSheet(
+                widget=widget,
+                path=widget_path(widget),
+                size=len(widget.styleSheet().encode('utf-8')),
+            ))
+        entries.sort(key=lambda entry: (-entry.size, entry.path))
+        return entries
+
+    def eventFilter(self, watched, event):
+        """
+        Updates census when widget style sheets or children change.
+        """
+        event_type = event.type()
+        if event_type not in self._EVENT_TYPES:
+            return False
+        if event_type == QEvent.StyleChange:
+            if watched.isWidgetType():
+                self._update(watched)
+        elif event_type == QEvent.ChildAdded:
+            child = event.child()
+            if child.isWidgetType():
+                self._update(child)
+                for descendant in child.findChildren(QWidget):
+                    self._update(descendant)
+        elif watched.isWidgetType():
+            # Child may be partially destroyed, only its address is used
+            self._removeTree(sip.unwrapinstance(event.child()))
+        return False
+
+    def stop(self):
+        """
+        Stops keeping census up to date, it is computed again when needed.
+        """
+        if self._widgets is not None:
+            qApp.removeEventFilter(self)
+            self._widgets = None
+
+    def _update(self, widget):
+        key = sip.unwrapinstance(widget)
+        if widget.styleSheet():
+            self._widgets[key] = widget
+        else:
+            self._widgets.pop(key, None)
+
+    def _removeTree(self, key):
+        """
+        Drops a widget removed from its parent and all its tracked
+        descendants, which stay alive if the widget was only detached.
+
+        :param int key: address of removed widget.
+        """
+        self._widgets.pop(key, None)
+        for descendant_key, widget in list(self._widgets.items()):
+            if sip.isdeleted(widget):
+                continue
+            ancestor = widget.parentWidget()
+            while ancestor is not None:
+                if sip.unwrapinstance(ancestor) == key:
+                    del self._widgets[descendant_key]
+                    break
+                ancestor = ancestor.parentWidget()
+
+    def _isExcluded(self, widget):
+        return self.excluded is not None and (
+            widget is self.excluded or self.excluded.isAncestorOf(widget))
+
+
+class StyleSheetCensusDialog(QDialog):
+    """
+    Shows widgets with their own style sheets, biggest ones first.
+    """
+
+    def __init__(self, entries, parent=None):
+        """
+        :param list(WidgetStyleSheet) entries: as returned by
+            `StyleSheetCensus.entries`.
+        :param QWidget parent: parent widget.
+        """
+        QDialog.__init__(self, parent)
+        self.setWindowTitle('Widget Style Sheets')
+        self.entries = entries
+
+        self.summary_label = QLabel('{} widgets, {:.1f} KB'.format(
+            len(entries), sum(entry.size for entry in entries) / 1024), self)
+
+        self.table = QTableWidget(len(entries), 2, self)
+        self.table.setHorizontalHeaderLabels(['Widget', 'Bytes'])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.Stretch)
+        for row, entry in enumerate(entries):
+            path_item = QTableWidgetItem(entry.path)
+            path_item.setToolTip(entry.widget.styleSheet())
+            self.table.setItem(row, 0, path_item)
+            size_item = QTableWidgetItem('{}'.format(entry.size))
+            size_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.table.setItem(row, 1, size_item)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+        self.resize(600, 400)
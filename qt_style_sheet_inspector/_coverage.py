@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import namedtuple
+
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtWidgets import QAbstractItemView, QDialog, QHeaderView, QLabel, \
+    QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout, qApp
+
+from ._selectors import WidgetIndex, parse_selector
+
+RuleCoverage = namedtuple('RuleCoverage', [
+    # Selector text of rule
+    'selector',
+    # Offsets of rule in style sheet text
+    'start',
+    'end',
+    # Line of rule in style sheet text, starting at 1
+    'line',
+    # Number of widgets any selector of rule matches, `None` if a selector
+    # can't be parsed so it is unknown
+    'matched_count',
+])
+
+
+def rule_coverage(parsed_style_sheet, widgets=None):
+    """
+    Matches every rule of a style sheet against widgets, considering class
+    names, object names, properties and pseudo states widgets can never be
+    in (see `pseudo_state_possible`). Rules that match no widget are dead:
+    they still cost Qt parse and match time on every polish.
+
+    Widgets are indexed by class and object name, and each distinct selector
+    is matched only once.
+
+    :param ParsedStyleSheet parsed_style_sheet: parsed style sheet text.
+    :param list(QWidget)|None widgets: widgets to match, by default all app
+        widgets.
+    :rtype: list(RuleCoverage)
+    :return: coverage of each rule, in source order.
+    """
+    if widgets is None:
+        widgets = qApp.allWidgets()
+    index = WidgetIndex(widgets)
+    text = parsed_style_sheet.text
+    # Matched widget ids of each distinct selector, `None` when unknown
+    matches = {}
+
+    coverage = []
+    line = 1
+    line_offset = 0
+    for rule in parsed_style_sheet.rules:
+        line += text.count('\n', line_offset, rule.start)
+        line_offset = rule.start
+        matched = set()
+        for selector_text in rule.selectors():
+            if selector_text not in matches:
+                try:
+                    selector = parse_selector(selector_text)
+                except ValueError:
+                    matches[selector_text] = None
+                else:
+                    matches[selector_text] = frozenset(
+                        id(widget) for widget in index.matches(
+                            selector, pseudo_states=True))
+            selector_matches = matches[selector_text]
+            if selector_matches is None:
+                matched = None
+                break
+            matched.update(selector_matches)
+        coverage.append(RuleCoverage(
+            selector=rule.selector,
+            start=rule.start,
+            end=rule.end,
+            line=line,
+            matched_count=None if matched is None else len(matched),
+        ))
+    return coverage
+
+
+def prune_style_sheet(style_sheet, coverage):
+    """
+    :param unicode style_sheet: style sheet text.
+    :param list(RuleCoverage) coverage: as returned by `rule_coverage` for
+        style sheet text.
+    :rtype: unicode
+    :return: style sheet text without dead rules, the ones that matched no
+        widget. Line breaks after removed rules are removed too.
+    """
+    parts = []
+    pos = 0
+    for rule in coverage:
+        if rule.matched_count != 0:
+            continue
+        parts.append(style_sheet[pos:rule.start])
+        pos = rule.end
+        if style_sheet.startswith('\n', pos):
+            pos += 1
+    parts.append(style_sheet[pos:])
+    return ''.join(parts)
+
+
+class RuleCoverageDialog(QDialog):
+    """
+    Lists dead rules of a style sheet, the ones that matched no widget.
+    Double clicking a rule emits `ruleActivated` with the rule offsets in
+    style sheet text, and the prune button emits `pruneRequested`.
+    """
+
+    ruleActivated = pyqtSignal(int, int)
+    pruneRequested = pyqtSignal()
+
+    def __init__(self, coverage, style_sheet, parent=None):
+        """
+        :param list(RuleCoverage) coverage: as returned by `rule_coverage`.
+        :param unicode style_sheet: style sheet text coverage refers to.
+        :param QWidget parent: parent widget.
+        """
+        QDialog.__init__(self, parent)
+        self.setWindowTitle('Rule Coverage')
+        self.coverage = coverage
+        self.style_sheet = style_sheet
+        self.dead_rules = [
+            rule for rule in coverage if rule.matched_count == 0]
+
+        dead_size = sum(rule.end - rule.start for rule in self.dead_rules)
+        self.summary_label = QLabel(
+            '{} of {} rules match no widget ({:.1f} KB)'.format(
+                len(self.dead_rules), len(coverage), dead_size / 1024), self)
+
+        self.table = QTableWidget(len(self.dead_rules), 2, self)
+        self.table.setHorizontalHeaderLabels(['Selector', 'Line'])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.Stretch)
+        for row, rule in enumerate(self.dead_rules):
+            self.table.setItem(row, 0, QTableWidgetItem(rule.selector))
+            line_item = QTableWidgetItem('{}'.format(rule.line))
+            line_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.table.setItem(row, 1, line_item)
+        self.table.cellDoubleClicked.connect(self.onCellDoubleClicked)
+
+        self.prune_button = QPushButton('Apply Without Dead Rules', self)
+        self.prune_button.setToolTip(
+            'Removes dead rules from style sheet text and applies it, undo '
+            'restores them')
+        self.prune_button.setEnabled(bool(self.dead_rules))
+        self.prune_button.clicked.connect(self.pruneRequested)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.table)
+        layout.addWidget(self.prune_button)
+        self.setLayout(layout)
+        self.resize(600, 400)
+
+    def prunedStyleSheet(self):
+        """
+        :rtype: unicode
+        :return: style sheet text without dead rules.
+        """
+        return prune_style_sheet(self.style_sheet, self.coverage)
+
+    def onCellDoubleClicked(self, row, column):
+        """
+        Emits `ruleActivated` for the rule in clicked row.
+        """
+        rule = self.dead_rules[row]
+        self.ruleActivated.emit(rule.start, rule.end)
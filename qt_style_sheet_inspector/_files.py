@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import io
+import os
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+
+class StyleSheetFiles(QObject):
+    """
+    Style sheet composed of linked .qss files, kept up to date as files
+    change on disk.
+
+    Files are watched with a `QFileSystemWatcher`. Editors usually save a
+    file with a burst of writes, or by replacing it with a new file, so
+    changes are debounced by `reload_delay` milliseconds and only files that
+    changed are read again. `changed` is emitted when the composed style
+    sheet changes.
+    """
+
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        """
+        :param QObject parent: parent object.
+        """
+        QObject.__init__(self, parent)
+        self.reload_delay = 200
+        # Linked paths, in composition order, and their last read contents
+        self._paths = []
+        self._contents = {}
+        # Paths changed since last reload
+        self._changed_paths = set()
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._onFileChanged)
+        self._reload_timer = QTimer(self)
+        self._reload_timer.setSingleShot(True)
+        self._reload_timer.timeout.connect(self.reload)
+
+    def paths(self):
+        """
+        :rtype: list(unicode)
+        :return: linked file paths, in composition order.
+        """
+        return list(self._paths)
+
+    def link(self, paths):
+        """
+        Links files, appending their contents to style sheet. Files already
+        linked are skipped.
+
+        :param list(unicode) paths: .qss file paths.
+        :raise IOError: if a file can't be read, no file is linked then.
+        """
+        contents = {}
+        for path in paths:
+            path = os.path.abspath(path)
+            if path not in self._contents and path not in contents:
+                contents[path] = self._read(path)
+        if not contents:
+            return
+        for path in paths:
+            path = os.path.abspath(path)
+            if path in contents and path not in self._contents:
+                self._contents[path] = contents[path]
+                self._paths.append(path)
+                self._watcher.addPath(path)
+        self.changed.emit()
+
+    def unlink(self, paths):
+        """
+        Unlinks files, removing their contents from style sheet.
+
+        :param list(unicode) paths: linked file paths.
+        """
+        changed = False
+        for path in paths:
+            path = os.path.abspath(path)
+            if path not in self._contents:
+                continue
+            self._paths.remove(path)
+            del self._contents[path]
+            self._changed_paths.discard(path)
+            self._watcher.removePath(path)
+            changed = True
+        if changed:
+            self.changed.emit()
+
+    def styleSheet(self):
+        """
+        :rtype: unicode
+        :return: contents of linked files, in link order.
+        """
+        return '\n'.join(self._contents[path] for path in self._paths)
+
+    def reload(self):
+        """
+        Reads changed files again, emitting `changed` if any of their
+        contents changed.
+        """
+        self._reload_timer.stop()
+        changed = False
+        for path in sorted(self._changed_paths):
+            try:
+                contents = self._read(path)
+            except IOError:
+                # Like while an editor replaces file, read it when it is back
+                continue
+            self._changed_paths.discard(path)
+            # Replaced files are no longer watched
+            if path not in self._watcher.files():
+                self._watcher.addPath(path)
+            if contents != self._contents[path]:
+                self._contents[path] = contents
+                changed = True
+        if self._changed_paths:
+            self._reload_timer.start(self.reload_delay)
+        if changed:
+            self.changed.emit()
+
+    def _onFileChanged(self, path):
+        if path in self._contents:
+            self._changed_paths.add(path)
+            self._reload_timer.start(self.reload_delay)
+
+    def _read(self, path):
+        """
+        :rtype: unicode
+        :return: file contents, with universal line breaks.
+        :raise IOError: if file can't be read.
+        """
+        with io.open(path, encoding='utf-8') as qss_file:
+            return qss_file.read()
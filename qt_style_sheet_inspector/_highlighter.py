@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import time
+
+from PyQt5.QtCore import QObject, QPoint, Qt, QTimer
+from PyQt5.QtGui import QColor, QFont, QTextBlockUserData, QTextCharFormat, \
+    QTextLayout
+
+from ._qss import TOKEN_CLOSE, TOKEN_COLON, TOKEN_COMMENT, TOKEN_OPEN, \
+    TOKEN_SEMICOLON, TOKEN_STRING, tokenize
+
+# Parser states at start and end of blocks
+STATE_SELECTOR = 0
+STATE_PROPERTY = 1
+STATE_VALUE = 2
+# Flag added to a state when a block ends inside a comment
+STATE_IN_COMMENT = 4
+
+# Kinds of highlighted spans
+SPAN_SELECTOR = 'selector'
+SPAN_PROPERTY = 'property'
+SPAN_VALUE = 'value'
+SPAN_STRING = 'string'
+SPAN_COMMENT = 'comment'
+SPAN_PUNCTUATION = 'punctuation'
+
+_TEXT_SPANS = {
+    STATE_SELECTOR: SPAN_SELECTOR,
+    STATE_PROPERTY: SPAN_PROPERTY,
+    STATE_VALUE: SPAN_VALUE,
+}
+
+
+def highlight_line(text, state):
+    """
+    Splits a line of style sheet text in highlighted spans.
+
+    :param unicode text: line text, without line break.
+    :param int state: one of `STATE_*` at start of line, possibly with
+        `STATE_IN_COMMENT`.
+    :rtype: tuple(int, list(tuple(int, int, unicode)))
+    :return: state at end of line and `(start, length, kind)` of each span,
+        where kind is one of `SPAN_*`.
+    """
+    spans = []
+    pos = 0
+    if state & STATE_IN_COMMENT:
+        state &= ~STATE_IN_COMMENT
+        end = text.find('*/')
+        if end == -1:
+            if text:
+                spans.append((0, len(text), SPAN_COMMENT))
+            return state | STATE_IN_COMMENT, spans
+        pos = end + 2
+        spans.append((0, pos, SPAN_COMMENT))
+
+    for kind, start, end in tokenize(text, pos):
+        if start > pos:
+            spans.append((pos, start - pos, _TEXT_SPANS[state]))
+        pos = end
+        if kind == TOKEN_COMMENT:
+            spans.append((start, end - start, SPAN_COMMENT))
+            if end - start < 4 or not text.endswith('*/', start, end):
+                return state | STATE_IN_COMMENT, spans
+        elif kind == TOKEN_STRING:
+            spans.append((start, end - start, SPAN_STRING))
+        elif kind == TOKEN_COLON and state == STATE_SELECTOR:
+            # Pseudo states and sub-controls
+            spans.append((start, end - start, SPAN_SELECTOR))
+        else:
+            spans.append((start, end - start, SPAN_PUNCTUATION))
+            if kind == TOKEN_OPEN:
+                state = STATE_PROPERTY
+            elif kind == TOKEN_CLOSE:
+                state = STATE_SELECTOR
+            elif kind == TOKEN_SEMICOLON and state == STATE_VALUE:
+                state = STATE_PROPERTY
+            elif kind == TOKEN_COLON and state == STATE_PROPERTY:
+                state = STATE_VALUE
+    if pos < len(text):
+        spans.append((pos, len(text) - pos, _TEXT_SPANS[state]))
+    return state, spans
+
+
+def _char_format(color, italic=False):
+    char_format = QTextCharFormat()
+    char_format.setForeground(QColor(color))
+    if italic:
+        char_format.setFontItalic(True)
+    return char_format
+
+
+class _BlockState(QTextBlockUserData):
+    """
+    Highlighting state of a text block. A block highlight is still valid if
+    the block wasn't edited (same revision) and the state at its start didn't
+    change.
+    """
+
+    def __init__(self, start_state, end_state, revision):
+        QTextBlockUserData.__init__(self)
+        self.start_state = start_state
+        self.end_state = end_state
+        self.revision = revision
+
+
+class StyleSheetHighlighter(QObject):
+    """
+    QSS syntax highlighter for a text edit that stays interactive on large
+    style sheets.
+
+    Unlike `QSyntaxHighlighter`, which highlights every changed block right
+    away (the whole document on each `setPlainText`), only visible blocks are
+    highlighted right away, the remaining dirty blocks are highlighted in idle
+    time, `IDLE_BATCH_TIME` seconds at a time. The parser state at the end of
+    each block is kept, so highlighting resumes from any block and stops as
+    soon as the state at the start of an unchanged block is the same.
+    """
+
+    # Seconds spent highlighting blocks per idle timer tick
+    IDLE_BATCH_TIME = 0.01
+
+    def __init__(self, text_edit):
+        """
+        :param QTextEdit|QPlainTextEdit text_edit: text edit to highlight,
+            also the parent of highlighter.
+        """
+        QObject.__init__(self, text_edit)
+        self.text_edit = text_edit
+        self.document = text_edit.document()
+        self.formats = {
+            SPAN_SELECTOR: _char_format(Qt.darkBlue),
+            SPAN_PROPERTY: _char_format(Qt.darkRed),
+            SPAN_VALUE: _char_format(Qt.black),
+            SPAN_STRING: _char_format(Qt.darkGreen),
+            SPAN_COMMENT: _char_format(Qt.gray, italic=True),
+            SPAN_PUNCTUATION: _char_format(Qt.darkGray),
+        }
+        self.formats[SPAN_SELECTOR].setFontWeight(QFont.Bold)
+        # Positions of blocks where highlighting must resume, every block
+        # that isn't highlighted follows one of them. Positions are kept
+        # instead of blocks, as blocks removed by an edit may still look
+        # valid.
+        self._pending = [0]
+        # Set while marking highlighted blocks dirty, which is not an edit
+        self._formatting = False
+
+        self._visible_timer = QTimer(self)
+        self._visible_timer.setSingleShot(True)
+        self._visible_timer.timeout.connect(self.highlightVisible)
+        self._idle_timer = QTimer(self)
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.timeout.connect(self.highlightIdle)
+
+        self.document.contentsChange.connect(self._onContentsChange)
+        text_edit.verticalScrollBar().valueChanged.connect(
+            self._scheduleVisible)
+        self._scheduleVisible()
+
+    def isFinished(self):
+        """
+        :rtype: bool
+        :return: if all blocks are highlighted.
+        """
+        return not self._pending
+
+    def highlightVisible(self):
+        """
+        Highlights dirty blocks in visible part of text edit. States of dirty
+        blocks before it are updated first, since visible blocks depend on
+        them.
+        """
+        viewport = self.text_edit.viewport()
+        last_number = self.text_edit.cursorForPosition(
+            QPoint(viewport.width(), viewport.height())).block().blockNumber()
+        pending = []
+        for block in self._takePending():
+            number = block.blockNumber()
+            if number > last_number:
+                pending.append(block.position())
+                continue
+            # Invisible blocks after last visible one are left for idle time
+            block = self._highlightFrom(block, last_number + 1)
+            if block is not None:
+                pending.append(block.position())
+        if pending:
+            self._pending = pending
+            self._idle_timer.start(0)
+
+    def highlightIdle(self):
+        """
+        Highlights dirty blocks for up to `IDLE_BATCH_TIME` seconds, and
+        schedules itself again while there are dirty blocks.
+        """
+        deadline = time.perf_counter() + self.IDLE_BATCH_TIME
+        pending = self._takePending()
+        # Some blocks are always highlighted, even if deadline is too short
+        while pending:
+            block = self._highlightFrom(pending.pop(0), deadline=deadline)
+            if block is not None:
+                pending.insert(0, block)
+            if time.perf_counter() > deadline:
+                break
+        self._pending = [block.position() for block in pending] + self._pending
+        if self._pending:
+            self._idle_timer.start(0)
+
+    def rehighlight(self):
+        """
+        Highlights the whole document again, in idle time except for visible
+        blocks.
+        """
+        block = self.document.firstBlock()
+        while block.isValid():
+            block.setUserData(None)
+            block = block.next()
+        self._pending = [0]
+        self._scheduleVisible()
+
+    def _takePending(self):
+        """
+        :rtype: list(QTextBlock)
+        :return: blocks at pending positions, sorted and without
+            duplicates. Pending positions are cleared.
+        """
+        blocks = {}
+        end = self.document.characterCount() - 1
+        for position in self._pending:
+            block = self.document.findBlock(min(position, end))
+            blocks[block.blockNumber()] = block
+        self._pending = []
+        return [blocks[number] for number in sorted(blocks)]
+
+    def _highlightFrom(self, block, stop_number=None, deadline=None):
+        """
+        Highlights blocks starting at `block` until a block is still valid.
+
+        :param QTextBlock block: first block to check.
+        :param int|None stop_number: block number where highlighting stops,
+            even if there are dirty blocks left.
+        :param float|None deadline: `time.perf_counter()` when highlighting
+            stops.
+        :rtype: QTextBlock|None
+        :return: block where highlighting stopped with dirty blocks left, if
+            any.
+        """
+        # Start at first block after last highlighted one
+        previous = block.previous()
+        while previous.isValid() and previous.userData() is None:
+            block = previous
+            previous = block.previous()
+        state = STATE_SELECTOR
+        if previous.isValid():
+            state = previous.userData().end_state
+        start = block.position()
+        end = start
+        count = 0
+        try:
+            while block.isValid():
+                data = block.userData()
+                if (data is not None and data.revision == block.revision() and
+                        data.start_state == state):
+                    return None
+                if (stop_number is not None and
+                        block.blockNumber() >= stop_number):
+                    return block
+                count += 1
+                if (deadline is not None and count % 32 == 0 and
+                        time.perf_counter() > deadline):
+                    return block
+                state = self._highlightBlock(block, state)
+                end = block.position() + block.length()
+                block = block.next()
+            return None
+        finally:
+            # Relayout all highlighted blocks at once, it is a lot faster
+            # than block by block
+            if end > start:
+                self._formatting = True
+                try:
+                    self.document.markContentsDirty(start, end - start)
+                finally:
+                    self._formatting = False
+
+    def _highlightBlock(self, block, state):
+        """
+        Sets formats of a block, its layout must be marked dirty after it.
+
+        :rtype: int
+        :return: state at end of block.
+        """
+        end_state, spans = highlight_line(block.text(), state)
+        ranges = []
+        for start, length, kind in spans:
+            format_range = QTextLayout.FormatRange()
+            format_range.start = start
+            format_range.length = length
+            format_range.format = self.formats[kind]
+            ranges.append(format_range)
+        block.setUserData(_BlockState(state, end_state, block.revision()))
+        block.layout().setFormats(ranges)
+        return end_state
+
+    def _onContentsChange(self, position, removed, added):
+        if self._formatting:
+            return
+        # Pending positions after edit move with text
+        self._pending = [
+            pending if pending <= position
+            else max(position, pending + added - removed)
+            for pending in self._pending
+        ]
+        self._pending.append(position)
+        self._scheduleVisible()
+
+    def _scheduleVisible(self, value=None):
+        """
+        Highlights visible blocks once text edit layout is up to date.
+        """
+        self._visible_timer.start(0)
@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+# Rough memory cost of an entry in history, besides its text
+_ENTRY_OVERHEAD = 64
+
+
+def compute_delta(old, new):
+    """
+    Computes a compact delta that turns `old` text into `new` text by
+    replacing the text between their common prefix and common suffix.
+
+    :param unicode old: original text.
+    :param unicode new: modified text.
+    :rtype: tuple(int, int, unicode)
+    :return: `(prefix, suffix, middle)`, the length of common prefix, length
+        of common suffix and the text that replaces everything in between.
+    """
+    max_common = min(len(old), len(new))
+    prefix = 0
+    # Compare in chunks first, it is a lot faster than char by char on large
+    # texts.
+    chunk = 4096
+    while (prefix + chunk <= max_common and
+           old[prefix:prefix + chunk] == new[prefix:prefix + chunk]):
+        prefix += chunk
+    while prefix < max_common and old[prefix] == new[prefix]:
+        prefix += 1
+    max_suffix = max_common - prefix
+    suffix = 0
+    while (suffix + chunk <= max_suffix and
+           old[len(old) - suffix - chunk:len(old) - suffix] ==
+           new[len(new) - suffix - chunk:len(new) - suffix]):
+        suffix += chunk
+    while (suffix < max_suffix and
+           old[len(old) - suffix - 1] == new[len(new) - suffix - 1]):
+        suffix += 1
+    return prefix, suffix, new[prefix:len(new) - suffix]
+
+
+def apply_delta(old, delta):
+    """
+    :param unicode old: original text.
+    :param tuple(int, int, unicode) delta: as returned by `compute_delta`.
+    :rtype: unicode
+    :return: modified text.
+    """
+    prefix, suffix, middle = delta
+    return old[:prefix] + middle + old[len(old) - suffix:]
+
+
+class HistoryLog(object):
+    """
+    Append-only log of style sheet states on disk, so undo tape survives the
+    inspector and takes no memory until a state is needed.
+
+    Two files are kept: `path` holds zlib compressed JSON records, and
+    `path + '.idx'` an index with a fixed size entry per record (offset and
+    size of record, timestamp, kind and references to other records). Only
+    the index is read when a log is opened, any record is then read with a
+    single seek.
+
+    There are two kinds of records:
+
+    * `RECORD_STATE`: an applied style sheet, either as a full copy or as a
+      delta from its parent state (at most `snapshot_interval` deltas in a
+      row), and the metrics of its apply. Its parent is the state it was
+      applied over, so the states of a tape are the chain of parents of the
+      last state.
+    * `RECORD_MOVE`: current state changed to an existing state, like on
+      undo and redo.
+
+    Records are written before their index entry, so records left without
+    index entry by a crash are ignored.
+    """
+
+    RECORD_STATE = 0
+    RECORD_MOVE = 1
+
+    # Record offset, size, timestamp, kind, parent (states) or target (moves)
+    # and delta base (-1 for full copies and moves)
+    _INDEX_ENTRY = struct.Struct('<QIdBqq')
+
+    def __init__(self, path, snapshot_interval=16):
+        """
+        :param unicode path: log file path, created if missing.
+        :param int snapshot_interval: max number of delta records in a row
+            on a chain of states.
+        """
+        self.path = path
+        self.index_path = path + '.idx'
+        self.snapshot_interval = snapshot_interval
+        self._entries = []
+        # Number of deltas up to a full copy, by record
+        self._depths = []
+        self._data_size = 0
+        # Last read state, speeds up reading consecutive states
+        self._cache = (None, None)
+        self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def appendState(self, text, parent=-1, parent_text=None, metrics=None):
+        """
+        Records an applied style sheet.
+
+        :param unicode text: style sheet text.
+        :param int parent: record of state it was applied over, -1 if none.
+        :param unicode|None parent_text: text of parent state, if known,
+            saves reading it again.
+        :param dict|None metrics: metrics of apply, must be serializable to
+            JSON.
+        :rtype: int
+        :return: record number of state.
+        """
+        content = {'metrics': metrics}
+        base = -1
+        if parent != -1 and self._depths[parent] < self.snapshot_interval:
+            if parent_text is None:
+                parent_text = self.text(parent)
+            delta = compute_delta(parent_text, text)
+            if len(delta[2]) * 2 < len(text):
+                base = parent
+                content['delta'] = delta
+        if base == -1:
+            content['text'] = text
+        record = self._append(self.RECORD_STATE, parent, base, content)
+        self._cache = (record, text)
+        return record
+
+    def appendMove(self, target):
+        """
+        Records that current state changed to a recorded state.
+
+        :param int target: record of new current state.
+        :rtype: int
+        :return: record number of move.
+        """
+        return self._append(self.RECORD_MOVE, target, -1, None)
+
+    def text(self, record):
+        """
+        :param int record: record of a state.
+        :rtype: unicode
+        :return: style sheet text of state.
+        """
+        cached_record, cached_text = self._cache
+        if cached_record == record:
+            return cached_text
+        chain = [record]
+        while self._entries[chain[-1]][5] != -1:
+            if self._entries[chain[-1]][5] == cached_record:
+                break
+            chain.append(self._entries[chain[-1]][5])
+        with io.open(self.path, 'rb') as data_file:
+            contents = [self._read(data_file, r) for r in reversed(chain)]
+        if 'text' in contents[0]:
+            text = contents[0]['text']
+        else:
+            text = apply_delta(cached_text, contents[0]['delta'])
+        for content in contents[1:]:
+            text = apply_delta(text, content['delta'])
+        self._cache = (record, text)
+        return text
+
+    def timestamp(self, record):
+        """
+        :param int record: a record.
+        :rtype: float
+        :return: `time.time()` when record was written.
+        """
+        return self._entries[record][2]
+
+    def metrics(self, record):
+        """
+        :param int record: record of a state.
+        :rtype: dict|None
+        :return: metrics of apply of state, if recorded.
+        """
+        with io.open(self.path, 'rb') as data_file:
+            return self._read(data_file, record)['metrics']
+
+    def tape(self):
+        """
+        Rebuilds undo tape from index only, no state is read.
+
+        :rtype: tuple(list(int), int)
+        :return: records of tape states, oldest first, and index of current
+            state in tape (-1 if log is empty).
+        """
+        last_state = current = -1
+        for record in range(len(self._entries) - 1, -1, -1):
+            kind, reference = self._entries[record][3:5]
+            if current == -1:
+                current = reference if kind == self.RECORD_MOVE else record
+            if kind == self.RECORD_STATE:
+                last_state = record
+                break
+        records = []
+        record = last_state
+        while record != -1:
+            records.append(record)
+            record = self._entries[record][4]
+        records.reverse()
+        if current not in records:
+            current = last_state
+        return records, records.index(current) if records else -1
+
+    def _append(self, kind, reference, base, content):
+        data = zlib.compress(json.dumps(content).encode('utf-8'))
+        entry = (self._data_size, len(data), time.time(), kind, reference,
+                 base)
+        with io.open(self.path, 'ab') as data_file:
+            data_file.write(data)
+        with io.open(self.index_path, 'ab') as index_file:
+            index_file.write(self._INDEX_ENTRY.pack(*entry))
+        self._data_size += len(data)
+        self._entries.append(entry)
+        self._depths.append(0 if base == -1 else self._depths[base] + 1)
+        return len(self._entries) - 1
+
+    def _read(self, data_file, record):
+        offset, size = self._entries[record][:2]
+        data_file.seek(offset)
+        return json.loads(zlib.decompress(data_file.read(size)).decode(
+            'utf-8'))
+
+    def _load(self):
+        """
+        Reads index, dropping entries of incomplete writes.
+        """
+        if not os.path.exists(self.index_path):
+            return
+        data_size = 0
+        if os.path.exists(self.path):
+            data_size = os.path.getsize(self.path)
+        with io.open(self.index_path, 'rb') as index_file:
+            index = index_file.read()
+        entry_size = self._INDEX_ENTRY.size
+        for start in range(0, len(index) - entry_size + 1, entry_size):
+            entry = self._INDEX_ENTRY.unpack_from(index, start)
+            if entry[0] + entry[1] > data_size:
+                break
+            self._entries.append(entry)
+            base = entry[5]
+            self._depths.append(0 if base == -1 else self._depths[base] + 1)
+        if self._entries:
+            self._data_size = self._entries[-1][0] + self._entries[-1][1]
+        # Later writes must follow last complete record
+        if len(index) != len(self._entries) * entry_size:
+            with io.open(self.index_path, 'r+b') as index_file:
+                index_file.truncate(len(self._entries) * entry_size)
+        if data_size != self._data_size:
+            with io.open(self.path, 'r+b') as data_file:
+                data_file.truncate(self._data_size)
+
+
+class StyleSheetHistory(object):
+    """
+    Memory efficient storage of style sheet states, used as inspector undo
+    tape.
+
+    Every `snapshot_interval` entries a full copy of the style sheet is kept,
+    entries in between only keep a delta from the previous entry. Identical
+    snapshots share the same text. When `max_memory` is exceeded, oldest
+    entries are evicted.
+
+    A `HistoryLog` can be attached to history, see `attachLog`. Entries
+    restored from it only keep their record number until they are read.
+
+    Supports `len(history)` and `history[index]` like a list of texts.
+    """
+
+    def __init__(self, snapshot_interval=16, max_memory=64 * 1024 * 1024):
+        """
+        :param int snapshot_interval: max number of entries between full
+            snapshots.
+        :param int max_memory: max bytes used by history, approximately. The
+            latest entry is always kept, even if it exceeds this limit.
+        """
+        self.snapshot_interval = snapshot_interval
+        self.max_memory = max_memory
+        # Either an unicode snapshot, a delta tuple or the record number of
+        # a state in log
+        self._entries = []
+        # Log records of entries, when a log is attached
+        self._log = None
+        self._records = []
+        # Snapshot digest to `[text, ref count]`, to share identical snapshots
+        self._snapshots = {}
+        self._memory = 0
+        # Last reconstructed entry, speeds up sequential access
+        self._cache = (None, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._entries)
+        if not 0 <= index < len(self._entries):
+            raise IndexError('History index out of range')
+        cached_index, cached_text = self._cache
+        if cached_index == index:
+            return cached_text
+
+        start = index
+        while not self._isSnapshot(start):
+            start -= 1
+        if cached_index is not None and start <= cached_index < index:
+            start, text = cached_index, cached_text
+        else:
+            text = self._entries[start]
+            if isinstance(text, int):
+                text = self._log.text(text)
+        for entry in self._entries[start + 1:index + 1]:
+            text = apply_delta(text, entry)
+        self._cache = (index, text)
+        return text
+
+    def attachLog(self, log):
+        """
+        Restores entries of the tape recorded in a log, replacing current
+        ones, and records new entries in it. Restored entries are read from
+        log when accessed.
+
+        :param HistoryLog log: history log.
+        :rtype: int
+        :return: index of current entry according to log, -1 if log is
+            empty.
+        """
+        self.truncate(0)
+        self._log = log
+        self._records, position = log.tape()
+        self._entries = list(self._records)
+        self._memory = _ENTRY_OVERHEAD * len(self._entries)
+        self._cache = (None, None)
+        return position
+
+    def markCurrent(self, index):
+        """
+        Records in log that an entry became current, like on undo and redo.
+        Does nothing when no log is attached.
+
+        :param int index: index of entry.
+        """
+        if self._log is not None:
+            self._log.appendMove(self._records[index])
+
+    def append(self, text, metrics=None):
+        """
+        Adds a new state at the end of history, evicting oldest entries if
+        needed.
+
+        :param unicode text: style sheet text.
+        :param dict|None metrics: metrics of state apply, only recorded in
+            log, if any.
+        :rtype: int
+        :return: number of evicted entries.
+        """
+        if self._log is not None:
+            parent = parent_text = None
+            if self._entries:
+                parent, parent_text = self._records[-1], self[-1]
+            self._records.append(self._log.appendState(
+                text, -1 if parent is None else parent, parent_text, metrics))
+        if self._entries and not self._snapshotDue():
+            delta = compute_delta(self[-1], text)
+            if len(delta[2]) * 2 < len(text):
+                self._entries.append(delta)
+                self._memory += self._entryMemory(delta)
+            else:
+                self._appendSnapshot(text)
+        else:
+            self._appendSnapshot(text)
+        self._cache = (len(self._entries) - 1, text)
+        return self._evict()
+
+    def truncate(self, length):
+        """
+        Drops all entries after `length` first ones.
+
+        :param int length: number of entries to keep.
+        """
+        while len(self._entries) > length:
+            self._memory -= self._release(self._entries.pop())
+        del self._records[length:]
+        if self._cache[0] is not None and self._cache[0] >= length:
+            self._cache = (None, None)
+
+    def memoryUsage(self):
+        """
+        :rtype: int
+        :return: approximate memory used by history, in bytes.
+        """
+        return self._memory
+
+    def _isSnapshot(self, index):
+        return not isinstance(self._entries[index], tuple)
+
+    def _snapshotDue(self):
+        for distance, index in enumerate(
+                range(len(self._entries) - 1, -1, -1)):
+            if self._isSnapshot(index):
+                return distance + 1 >= self.snapshot_interval
+        return True
+
+    def _appendSnapshot(self, text):
+        self._entries.append(self._internSnapshot(text))
+
+    def _internSnapshot(self, text):
+        """
+        Registers a new snapshot entry, sharing its text with identical
+        snapshots.
+
+        :rtype: unicode
+        :return: text to be stored in entry.
+        """
+        digest = hashlib.sha1(text.encode('utf-8')).digest()
+        shared = self._snapshots.get(digest)
+        if shared is None:
+            shared = self._snapshots[digest] = [text, 0]
+            self._memory += sys.getsizeof(text)
+        shared[1] += 1
+        self._memory += _ENTRY_OVERHEAD
+        return shared[0]
+
+    def _entryMemory(self, delta):
+        return _ENTRY_OVERHEAD + sys.getsizeof(delta[2])
+
+    def _release(self, entry):
+        """
+        Forgets an entry that has been removed from history.
+
+        :rtype: int
+        :return: memory freed.
+        """
+        if isinstance(entry, tuple):
+            return self._entryMemory(entry)
+        if isinstance(entry, int):
+            return _ENTRY_OVERHEAD
+        digest = hashlib.sha1(entry.encode('utf-8')).digest()
+        shared = self._snapshots[digest]
+        shared[1] -= 1
+        if shared[1] == 0:
+            del self._snapshots[digest]
+            return _ENTRY_OVERHEAD + sys.getsizeof(entry)
+        return _ENTRY_OVERHEAD
+
+    def _evict(self):
+        evicted = 0
+        while self._memory > self.max_memory and len(self._entries) > 1:
+            if not self._isSnapshot(1):
+                # Next entry becomes the oldest one, so it must be turned in a
+                # snapshot before its base is dropped.
+                text = self[1]
+                self._memory -= self._release(self._entries[1])
+                self._entries[1] = self._internSnapshot(text)
+            self._memory -= self._release(self._entries.pop(0))
+            del self._records[:1]
+            self._cache = (None, None)
+            evicted += 1
+        return evicted
@@ -3,12 +3,43 @@
 from __future__ import absolute_import, division, print_function, \
     unicode_literals
 
+import time
+from bisect import bisect_left
+from collections import deque
 from textwrap import dedent
 
-from PyQt5.QtCore import QEvent, Qt
-from PyQt5.QtGui import QKeySequence, QTextCursor
-from PyQt5.QtWidgets import QDialog, QHBoxLayout, QLineEdit, QMessageBox, \
-    QPushButton, QShortcut, QTextEdit, QVBoxLayout, QWidget, qApp
+from PyQt5.QtCore import QEvent, QPoint, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QKeySequence, QTextCharFormat, QTextCursor
+from PyQt5.QtWidgets import QCheckBox, QDialog, QFileDialog, QHBoxLayout, \
+    QLabel, QLineEdit, QMessageBox, QPlainTextEdit, QPushButton, QShortcut, \
+    QSplitter, QTextEdit, QToolTip, QTreeView, QVBoxLayout, QWidget, qApp
+
+from ._census import StyleSheetCensus, StyleSheetCensusDialog
+from ._coverage import RuleCoverageDialog, rule_coverage
+from ._files import StyleSheetFiles
+from ._highlighter import StyleSheetHighlighter
+from ._history import HistoryLog, StyleSheetHistory, compute_delta
+from ._isolation import inspector_style_sheet
+from ._metrics import ACTION_APPLY, ACTION_REDO, ACTION_UNDO, \
+    AppStyleSheet, ApplyMetrics, format_metrics
+from ._optimizer import OptimizeDialog, measure_apply_time, \
+    optimize_style_sheet
+from ._outline import RuleOutlineModel
+from ._picker import PickedRulesDialog, SelectorIndex, WidgetPicker
+from ._preview import SandboxPreviewDialog
+from ._profiler import RuleProfileDialog, RuleTimer, profile_rules
+from ._qss import ParsedStyleSheet, diff_rules, split_rules
+from ._search import RegexSearcher, SearchIndex, next_hit, previous_hit
+from ._selectors import parse_selector, selector_matches, \
+    split_selector_group, widget_class_names
+from ._template import StyleSheetTemplate, TemplateError
+from ._validation import SEVERITY_ERROR, style_sheet_problems, \
+    validate_rules
+
+# Scopes of an apply, as stored in `StyleSheetWidget.last_apply_scope`
+APPLY_SKIPPED = 'skipped'
+APPLY_SCOPED = 'scoped'
+APPLY_FULL = 'full'
 
 
 class StyleSheetInspector(QDialog):
@@ -35,8 +66,12 @@ class StyleSheetInspector(QDialog):
     Known issues
     ------------
 
-    * Inspector window still reuses app style sheet, which can be annoying
-    when testing styles. Is there a way to avoid reusing style sheets?
+    * Qt repolishes every widget on each app style sheet change, inspector
+    ones included. Inspector widgets have their own fixed style sheet (see
+    `isolate_style` argument of `StyleSheetWidget`), which wins over app
+    style sheet, so they keep their look and are repolished quickly. App
+    style sheet properties the inspector style sheet doesn't set, like scroll
+    bar styles, and tool tips still follow app style sheet.
 
     Reference
     ---------
@@ -45,13 +80,20 @@ class StyleSheetInspector(QDialog):
     http://doc.qt.io/qt-5/qtwidgets-widgets-stylesheet-example.html.
     """
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, **kwargs):
+        """
+        :param QWidget parent: parent widget.
+        :param kwargs: passed to `StyleSheetWidget`.
+        """
         QDialog.__init__(self, parent)
 
         self.setWindowTitle('Qt Style Sheet Inspector')
-        self.widget = StyleSheetWidget()
+        self.widget = StyleSheetWidget(**kwargs)
 
         layout = QHBoxLayout()
+        # Inspector widget covers the whole dialog, so its style hides any
+        # app style of dialog
+        layout.setContentsMargins(0, 0, 0, 0)
         layout.addWidget(self.widget)
         self.setLayout(layout)
 
@@ -69,34 +111,249 @@ class StyleSheetInspector(QDialog):
 
 class StyleSheetWidget(QWidget):
 
-    def __init__(self, parent=None):
+    # Emitted when search results for search bar text are shown
+    searchFinished = pyqtSignal()
+    # Emitted with an `ApplyMetrics` after each apply
+    styleSheetApplied = pyqtSignal(object)
+    # Emitted when style sheet text is completely loaded in editor, see
+    # `isLoading`
+    styleSheetLoaded = pyqtSignal()
+    # Emitted when rules of style sheet text change, with the index of first
+    # changed rule, number of rules removed and number of rules added there,
+    # see `ParsedStyleSheet.update`
+    rulesChanged = pyqtSignal(int, int, int)
+
+    def __init__(self, parent=None, history_max_memory=64 * 1024 * 1024,
+                 history_snapshot_interval=16, metrics_size=100,
+                 large_document_size=1024 * 1024,
+                 large_document_read_only=False, history_log_path=None,
+                 isolate_style=True, app_style_sheet=None):
+        """
+        :param QWidget parent: parent widget.
+        :param int history_max_memory: approximate max bytes used by undo
+            tape, oldest states are evicted past it.
+        :param int history_snapshot_interval: max number of undo tape states
+            stored as deltas between full copies of style sheet.
+        :param int metrics_size: number of latest apply metrics kept, see
+            `applyMetrics`.
+        :param int large_document_size: style sheets with at least this
+            number of chars are shown in large document mode: text is loaded
+            in chunks across event loop iterations and lines aren't wrapped.
+        :param bool large_document_read_only: if editor is read only in large
+            document mode, which is a faster view of style sheet.
+        :param unicode|None history_log_path: if given, applied style sheets
+            and their metrics are recorded in a `HistoryLog` at this path, and
+            undo tape recorded there is restored.
+        :param bool isolate_style: if inspector widgets have their own fixed
+            style, so their look doesn't depend on app style sheet and
+            applies repolish them quickly, see `inspector_style_sheet`.
+        :param AppStyleSheet|RemoteStyleSheet|None app_style_sheet: style
+            sheet inspected, by default the one of the app running the
+            inspector. Rule profiler, coverage and widget style sheet census
+            need app widgets, so they are only available for it.
+        """
         QWidget.__init__(self, parent)
-        self.tape = []
+        if app_style_sheet is None:
+            app_style_sheet = AppStyleSheet()
+        self.app_style_sheet = app_style_sheet
+        # Applied style sheets, `tape_pos` is the index of current one
+        self.tape = StyleSheetHistory(
+            snapshot_interval=history_snapshot_interval,
+            max_memory=history_max_memory,
+        )
         self.tape_pos = -1
+        self.history_log = None
+        if history_log_path is not None:
+            self.history_log = HistoryLog(
+                history_log_path, snapshot_interval=history_snapshot_interval)
+            self.tape_pos = self.tape.attachLog(self.history_log)
 
+        # Applied style sheet text, which is a template when templates are
+        # enabled, and QSS it was compiled to
         self.style_sheet = None
+        self.compiled_style_sheet = None
+        # When template check box is checked, style sheet text is a template
+        # compiled to QSS on apply, see `StyleSheetTemplate`
+        self.style_sheet_template = StyleSheetTemplate()
+
+        # When enabled, applies diff new style sheet against current one and
+        # skip changes that don't change any rule (comments, formatting).
+        self.incremental_apply = False
+        # When enabled, incremental applies also count widgets matched by the
+        # changed selectors. It walks the whole widget tree, so it is only a
+        # diagnostic and is off by default.
+        self.count_affected_widgets = False
+        self.last_apply_scope = None
+        self.last_repolish_count = 0
+        self.last_affected_count = None
+        # `(selector, declarations)` of each rule of applied style sheet, so
+        # incremental applies don't parse it again
+        self._applied_rules = None
+        # Number of rules matching most widgets that are also timed by rule
+        # profiler, each one costs an apply, one per event loop iteration
+        self.profile_timed_rules = 10
+        self._rule_timer = None
+        # Number of times style sheet optimizer times applies of original and
+        # optimized style sheets, 0 to not time them
+        self.optimize_timed_applies = 3
+        # When live apply is checked, edits are applied after user stops
+        # typing for `live_apply_delay` milliseconds. Live applies less than
+        # `live_apply_fold_time` seconds apart share a single tape entry.
+        self.live_apply_delay = 500
+        self.live_apply_fold_time = 2.0
+        self._last_live_apply = None
+        self._live_timer = QTimer(self)
+        self._live_timer.setSingleShot(True)
+        self._live_timer.timeout.connect(self._liveApply)
+        # Widgets with their own style sheets, kept up to date once first
+        # shown
+        self.style_sheet_census = StyleSheetCensus(excluded=self, parent=self)
+        # Rules of applied style sheet indexed by the widgets they can match,
+        # built when a widget is first picked and updated on each apply
+        self.selector_index = None
+        self.widget_picker = WidgetPicker(parent=self)
+        self.widget_picker.picked.connect(self.showWidgetRules)
+        self._picked_rules_dialog = None
+        # Linked .qss files, applied whenever they change on disk
+        self.style_sheet_files = StyleSheetFiles(self)
+        self.style_sheet_files.changed.connect(self.onStyleSheetFilesChanged)
+        self._metrics = deque(maxlen=metrics_size)
+
+        # Rules of style sheet text, kept up to date as style sheet text
+        # changes.
+        self.parsed_style_sheet = ParsedStyleSheet()
+        # If whole text was removed and rules and search index weren't
+        # updated yet, see `onStyleContentsChange`
+        self._text_cleared = False
+
+        # Style sheet text is validated `validation_delay` milliseconds after
+        # user stops typing, in idle time batches, and before each apply.
+        # Rules keep their problems until edited, so validating an edited
+        # style sheet only checks edited rules. Style sheets with errors are
+        # not applied when `validate_before_apply` is enabled.
+        self.validate_before_apply = True
+        self.validation_delay = 300
+        self.style_sheet_problems = []
+        self._validation_timer = QTimer(self)
+        self._validation_timer.setSingleShot(True)
+        self._validation_timer.timeout.connect(self._validateIdle)
+
+        # Occurrences of search bar text in style sheet text, kept up to date
+        # as style sheet text changes.
+        self.search_index = SearchIndex()
+        self.search_hits = []
+        # End offsets of hits, only known for regex, case sensitive or whole
+        # words searches
+        self._search_hit_ends = None
+
+        # Searches start after user stops typing for `search_delay`
+        # milliseconds. Regex, case sensitive or whole words searches run in a
+        # worker thread.
+        self.regex_searcher = RegexSearcher(self)
+        self.regex_searcher.finished.connect(self._onRegexSearchFinished)
+        self.regex_searcher.failed.connect(self._onRegexSearchFailed)
+        self.search_delay = 200
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.timeout.connect(self._startSearch)
+        # Extra selections of style text edit, by the feature that owns them
+        self._extra_selections = {}
+
+        self.large_document_size = large_document_size
+        self.large_document_read_only = large_document_read_only
+        self.large_document = False
+        # Number of chars inserted in editor per event loop iteration when
+        # loading a large document
+        self.load_chunk_size = 256 * 1024
+        # Text still to be inserted in editor and where insertion stopped
+        self._pending_load = None
+        self._pending_load_pos = 0
+        self._rule_count_before_load = 0
+        self._load_timer = QTimer(self)
+        self._load_timer.setSingleShot(True)
+        self._load_timer.timeout.connect(self._loadNextChunk)
 
         self.search_bar = QLineEdit(self)
         self.search_bar.textChanged.connect(self.onSearchTextChanged)
+        self.search_hits_label = QLabel(self)
+        self.regex_check_box = QCheckBox('Regex', self)
+        self.case_check_box = QCheckBox('Case', self)
+        self.words_check_box = QCheckBox('Words', self)
+        for check_box in (self.regex_check_box, self.case_check_box,
+                          self.words_check_box):
+            check_box.toggled.connect(self.onSearchOptionsChanged)
 
-        self.style_text_edit = QTextEdit(self)
+        # A plain text editor lays out only visible blocks, so it stays fast
+        # on large documents and can't be messed with rich text pasted from
+        # an IDE, for instance.
+        self.style_text_edit = QPlainTextEdit(self)
         self.style_text_edit.textChanged.connect(self.onStyleTextChanged)
-        # To prevent messing with contents when pasted from an IDE, for
-        # instance.
-        self.style_text_edit.setAcceptRichText(False)
+        self.style_text_edit.document().contentsChange.connect(
+            self.onStyleContentsChange)
+        self.style_text_edit.verticalScrollBar().valueChanged.connect(
+            self._highlightSearchHits)
+        self.style_text_edit.verticalScrollBar().valueChanged.connect(
+            self._highlightProblems)
+        # Shows problems under mouse as tool tips
+        self.style_text_edit.viewport().installEventFilter(self)
+        # Skips needless font changes of editor, see `eventFilter`
+        self.style_text_edit.installEventFilter(self)
+        self.highlighter = StyleSheetHighlighter(self.style_text_edit)
+
+        # Outline of rules grouped by widget class and object name
+        self.outline_model = RuleOutlineModel(self.parsed_style_sheet, self)
+        self.rulesChanged.connect(self.outline_model.onRulesChanged)
+        self.outline_view = QTreeView(self)
+        self.outline_view.setModel(self.outline_model)
+        self.outline_view.setHeaderHidden(True)
+        self.outline_view.setUniformRowHeights(True)
+        self.outline_view.activated.connect(self.onOutlineActivated)
+        self.outline_view.clicked.connect(self.onOutlineActivated)
 
         self.apply_button = QPushButton('Apply', self)
         self.apply_button.clicked.connect(self.onApplyButton)
+        self.live_apply_check_box = QCheckBox('Live', self)
+        self.live_apply_check_box.setToolTip(
+            'Apply changes as you type, once style sheet text is valid')
+        self.live_apply_check_box.toggled.connect(self.onLiveApplyToggled)
+        self.template_check_box = QCheckBox('Template', self)
+        self.template_check_box.setToolTip(
+            'Style sheet text is a template with @variables and @import, '
+            'compiled before applied')
+        self.template_check_box.toggled.connect(self.onStyleTextChanged)
+
+        self.status_label = QLabel(self)
+
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(self.search_bar)
+        search_layout.addWidget(self.search_hits_label)
+        search_layout.addWidget(self.regex_check_box)
+        search_layout.addWidget(self.case_check_box)
+        search_layout.addWidget(self.words_check_box)
+
+        splitter = QSplitter(self)
+        splitter.addWidget(self.outline_view)
+        splitter.addWidget(self.style_text_edit)
+        splitter.setStretchFactor(1, 1)
 
         layout = QVBoxLayout(self)
-        layout.addWidget(self.search_bar)
-        layout.addWidget(self.style_text_edit)
-        layout.addWidget(self.apply_button)
+        layout.addLayout(search_layout)
+        layout.addWidget(splitter)
+        apply_layout = QHBoxLayout()
+        apply_layout.addWidget(self.apply_button, 1)
+        apply_layout.addWidget(self.live_apply_check_box)
+        apply_layout.addWidget(self.template_check_box)
+        layout.addLayout(apply_layout)
+        layout.addWidget(self.status_label)
         self.setLayout(layout)
 
         next_hit_shortcut = QShortcut(QKeySequence(Qt.Key_F3), self)
         next_hit_shortcut.activated.connect(self.onNextSearchHit)
 
+        previous_hit_shortcut = QShortcut(
+            QKeySequence(Qt.SHIFT + Qt.Key_F3), self)
+        previous_hit_shortcut.activated.connect(self.onPreviousSearchHit)
+
         search_shortcut = QShortcut(QKeySequence(Qt.CTRL + Qt.Key_F), self)
         search_shortcut.activated.connect(self.onFocusSearchBar)
 
@@ -111,33 +368,74 @@ class StyleSheetWidget(QWidget):
             QKeySequence(Qt.CTRL + Qt.ALT + Qt.Key_Y), self)
         redo_shortcut.activated.connect(self.onRedo)
 
+        profile_shortcut = QShortcut(
+            QKeySequence(Qt.CTRL + Qt.SHIFT + Qt.Key_P), self)
+        profile_shortcut.activated.connect(self.onProfileRules)
+
+        census_shortcut = QShortcut(
+            QKeySequence(Qt.CTRL + Qt.SHIFT + Qt.Key_W), self)
+        census_shortcut.activated.connect(self.onStyleSheetCensus)
+
+        coverage_shortcut = QShortcut(
+            QKeySequence(Qt.CTRL + Qt.SHIFT + Qt.Key_U), self)
+        coverage_shortcut.activated.connect(self.onRuleCoverage)
+
+        optimize_shortcut = QShortcut(
+            QKeySequence(Qt.CTRL + Qt.SHIFT + Qt.Key_M), self)
+        optimize_shortcut.activated.connect(self.onOptimizeStyleSheet)
+
+        pick_shortcut = QShortcut(
+            QKeySequence(Qt.CTRL + Qt.SHIFT + Qt.Key_C), self)
+        pick_shortcut.activated.connect(self.onPickWidget)
+
+        preview_shortcut = QShortcut(
+            QKeySequence(Qt.CTRL + Qt.SHIFT + Qt.Key_V), self)
+        preview_shortcut.activated.connect(self.onSandboxPreview)
+
+        link_files_shortcut = QShortcut(
+            QKeySequence(Qt.CTRL + Qt.SHIFT + Qt.Key_O), self)
+        link_files_shortcut.activated.connect(self.onLinkStyleSheetFiles)
+
         help_shortcut = QShortcut(
             QKeySequence(Qt.Key_F1), self)
         help_shortcut.activated.connect(self.onHelp)
 
+        if isolate_style:
+            self.setAttribute(Qt.WA_StyledBackground)
+            self.setStyleSheet(
+                inspector_style_sheet(qApp.palette(), qApp.font()))
+
         self.loadStyleSheet()
 
     def onUndo(self, checked=False):
         """
         Undo last applied style sheet, if there is any.
+
+        Only the text that differs from current style sheet text is replaced,
+        keeping cursor and scroll position, and the style sheet is applied
+        incrementally.
         """
         assert self.tape_pos >= 0
         if self.tape_pos == 0:
             return
         self.tape_pos -= 1
-        self.style_text_edit.setPlainText(self.tape[self.tape_pos])
-        self.applyStyleSheet(stateless=True)
+        self.tape.markCurrent(self.tape_pos)
+        self._replaceStyleText(self.tape[self.tape_pos])
+        self.applyStyleSheet(
+            stateless=True, incremental=True, action=ACTION_UNDO)
 
     def onRedo(self, checked=False):
         """
-        Redo last reverted style sheet, if there is any.
+        Redo last reverted style sheet, if there is any. See `onUndo`.
         """
         assert self.tape_pos >= 0
         if self.tape_pos == len(self.tape) - 1:
             return
         self.tape_pos += 1
-        self.style_text_edit.setPlainText(self.tape[self.tape_pos])
-        self.applyStyleSheet(stateless=True)
+        self.tape.markCurrent(self.tape_pos)
+        self._replaceStyleText(self.tape[self.tape_pos])
+        self.applyStyleSheet(
+            stateless=True, incremental=True, action=ACTION_REDO)
 
     def onHelp(self):
         """
@@ -151,8 +449,16 @@ class StyleSheetWidget(QWidget):
             Ctrl+S: apply current changes
             Ctrl+F: go to search bar
             F3: go to next search hit
+            Shift+F3: go to previous search hit
             Ctrl+Alt+Z: revert to last applied style sheet
             Ctrl+Alt+Y: redo last reverted style sheet
+            Ctrl+Shift+P: profile cost of each rule
+            Ctrl+Shift+W: list widgets with their own style sheets
+            Ctrl+Shift+U: list rules that match no widget
+            Ctrl+Shift+M: optimize style sheet
+            Ctrl+Shift+V: preview style sheet on a copy of a window
+            Ctrl+Shift+C: click a widget to list its rules
+            Ctrl+Shift+O: link .qss files, applied when they change
         """))
         msg_box.setStandardButtons(QMessageBox.Ok)
         msg_box.setDefaultButton(QMessageBox.Ok)
@@ -163,24 +469,469 @@ class StyleSheetWidget(QWidget):
         When search bar text changes, try to find text in style sheet text.
         If there is a match, color search bar text green, otherwise goes back
         to start of style sheet text and text is colored red.
+
+        Search is debounced by `search_delay`, and `searchFinished` is emitted
+        when results are shown. Regex, case sensitive or whole words searches
+        are done in background, see `RegexSearcher`.
         """
-        search = self.search_bar.text()
-        if not self.style_text_edit.find(search):
-            self.search_bar.setStyleSheet("color: red;")
-            self.style_text_edit.moveCursor(QTextCursor.Start)
-        else:
-            self.search_bar.setStyleSheet("color: green;")
+        self.regex_searcher.cancel()
+        self._search_timer.start(self.search_delay)
+
+    def onSearchOptionsChanged(self, checked=False):
+        """
+        Search again when regex, case sensitive or whole words options change.
+        """
+        self.onSearchTextChanged(self.search_bar.text())
 
     def onNextSearchHit(self):
         """
         Goes to next match to search text. If there isn't any, cycles back to
         first occurrence.
         """
-        search = self.search_bar.text()
-        if not self.style_text_edit.find(search):
-            # Cycle back to first hit
+        self._flushPendingSearch()
+        cursor = self.style_text_edit.textCursor()
+        hit = next_hit(self.search_hits, cursor.selectionEnd())
+        if hit is None:
+            self.style_text_edit.moveCursor(QTextCursor.Start)
+        else:
+            self._selectSearchHit(hit)
+        self._updateSearchHits()
+
+    def onPreviousSearchHit(self):
+        """
+        Goes to previous match to search text. If there isn't any, cycles
+        back to last occurrence.
+        """
+        self._flushPendingSearch()
+        cursor = self.style_text_edit.textCursor()
+        hit = previous_hit(self.search_hits, cursor.selectionStart())
+        if hit is None:
             self.style_text_edit.moveCursor(QTextCursor.Start)
-            self.style_text_edit.find(search)
+        else:
+            self._selectSearchHit(hit)
+        self._updateSearchHits()
+
+    def onProfileRules(self):
+        """
+        Profiles cost of each rule in style sheet text and shows them ranked,
+        matching rules against app widgets, except the inspector ones. Rules
+        matching most widgets are timed in event loop iterations, see
+        `RuleTimer`. Double clicking a rule selects it in style sheet text.
+        Templates are compiled first, so rules are the ones of the compiled
+        style sheet and can't be selected in template text.
+
+        :rtype: RuleProfileDialog|None
+        :return: dialog with profile, or `None` if style sheet text can't be
+            parsed or app is in another process.
+        """
+        if not self._checkLocal():
+            return None
+        self._flushPendingLoad()
+        parsed = self.parsed_style_sheet
+        style_sheet = parsed.text
+        applied = self.app_style_sheet.styleSheet()
+        template = self.template_check_box.isChecked()
+        try:
+            if template:
+                style_sheet = self.style_sheet_template.compile(
+                    style_sheet, parsed.rules).text
+            profiles = profile_rules(style_sheet, self._appWidgets())
+        except ValueError as e:
+            self.status_label.setText('Could not profile rules: {}'.format(e))
+            return None
+
+        dialog = RuleProfileDialog(profiles, self)
+        if not template:
+            dialog.ruleActivated.connect(self.selectRange)
+        dialog.show()
+        if self.profile_timed_rules > 0:
+            if self._rule_timer is not None:
+                self._rule_timer.cancel()
+            # Timing applies profiled style sheet, applied one is restored
+            self._rule_timer = RuleTimer(
+                style_sheet, profiles, self.profile_timed_rules,
+                restore=applied, parent=dialog)
+            dialog.timeRules(self._rule_timer)
+        return dialog
+
+    def onStyleSheetCensus(self):
+        """
+        Shows widgets that have their own style sheets, which are not part of
+        app style sheet but are also parsed on every repolish.
+
+        :rtype: StyleSheetCensusDialog|None
+        :return: dialog with census, or `None` if app is in another process.
+        """
+        if not self._checkLocal():
+            return None
+        dialog = StyleSheetCensusDialog(
+            self.style_sheet_census.entries(), self)
+        dialog.show()
+        return dialog
+
+    def onRuleCoverage(self):
+        """
+        Matches rules of style sheet text against all widgets, except the
+        inspector ones, and lists dead rules, the ones that match no widget.
+        Double clicking a rule selects it in style sheet text, and the dialog
+        can apply style sheet text without dead rules, which undo reverts.
+
+        :rtype: RuleCoverageDialog|None
+        :return: dialog with coverage, or `None` if app is in another
+            process.
+        """
+        if not self._checkLocal():
+            return None
+        self._flushPendingLoad()
+        coverage = rule_coverage(self.parsed_style_sheet, self._appWidgets())
+        dialog = RuleCoverageDialog(
+            coverage, self.parsed_style_sheet.text, self)
+        dialog.ruleActivated.connect(self.selectRange)
+        dialog.pruneRequested.connect(
+            lambda: self._applyPrunedStyleSheet(dialog))
+        dialog.show()
+        return dialog
+
+    def _appWidgets(self):
+        """
+        :rtype: list(QWidget)
+        :return: app widgets, except inspector ones.
+        """
+        return [
+            widget for widget in qApp.allWidgets()
+            if widget is not self and not self.isAncestorOf(widget)
+        ]
+
+    def _checkLocal(self):
+        """
+        :rtype: bool
+        :return: if app is in inspector process, otherwise the reason a
+            feature is not available is shown.
+        """
+        if self.app_style_sheet.is_local:
+            return True
+        self.status_label.setText(
+            'Not available for an app in another process')
+        return False
+
+    def _applyPrunedStyleSheet(self, dialog):
+        """
+        Applies style sheet text without dead rules of a coverage dialog,
+        unless style sheet text changed since coverage was computed.
+
+        :param RuleCoverageDialog dialog: coverage dialog.
+        """
+        if self.style_text_edit.toPlainText() != dialog.style_sheet:
+            self.status_label.setText(
+                'Style sheet changed since coverage, not pruned')
+            return
+        self._replaceStyleText(dialog.prunedStyleSheet())
+        self.applyStyleSheet()
+        dialog.close()
+
+    def onOptimizeStyleSheet(self):
+        """
+        Optimizes style sheet text, see `optimize_style_sheet`, and shows it
+        compared to the original one. Applies of both are timed, unless
+        `optimize_timed_applies` is 0 or app is in another process, which
+        leaves applied style sheet as it was.
+
+        Templates are compiled first. Optimized style sheet can then only be
+        exported, since applying it would replace the template.
+
+        :rtype: OptimizeDialog|None
+        :return: dialog with optimized style sheet, or `None` if style sheet
+            text can't be optimized.
+        """
+        self._flushPendingLoad()
+        parsed = self.parsed_style_sheet
+        text = style_sheet = parsed.text
+        template = self.template_check_box.isChecked()
+        try:
+            if template:
+                style_sheet = self.style_sheet_template.compile(
+                    text, parsed.rules).text
+                parsed = ParsedStyleSheet(style_sheet)
+            optimized, stats = optimize_style_sheet(parsed)
+        except ValueError as e:
+            self.status_label.setText(
+                'Could not optimize style sheet: {}'.format(e))
+            return None
+
+        apply_times = None
+        if self.optimize_timed_applies > 0 and self.app_style_sheet.is_local:
+            applied = qApp.styleSheet()
+            apply_times = (
+                measure_apply_time(style_sheet, self.optimize_timed_applies),
+                measure_apply_time(optimized, self.optimize_timed_applies),
+            )
+            self.app_style_sheet.setStyleSheet(applied)
+
+        dialog = OptimizeDialog(style_sheet, optimized, stats, apply_times,
+                                self)
+        dialog.apply_button.setEnabled(not template)
+        dialog.applyRequested.connect(
+            lambda: self._applyOptimizedStyleSheet(dialog, text))
+        dialog.show()
+        return dialog
+
+    def _applyOptimizedStyleSheet(self, dialog, text):
+        """
+        Applies optimized style sheet of a dialog, unless style sheet text
+        changed since it was optimized.
+
+        :param OptimizeDialog dialog: optimize dialog.
+        :param unicode text: style sheet text that was optimized.
+        """
+        if self.style_text_edit.toPlainText() != text:
+            self.status_label.setText(
+                'Style sheet changed since optimized, not applied')
+            return
+        self._replaceStyleText(dialog.optimized)
+        self.applyStyleSheet()
+        dialog.close()
+
+    def onSandboxPreview(self):
+        """
+        Previews style sheet text on a hidden copy of an app window, without
+        applying it, and shows which widgets look different with it, see
+        `SandboxPreview`. Templates are compiled first.
+
+        :rtype: SandboxPreviewDialog|None
+        :return: preview dialog, or `None` if template can't be compiled or
+            app is in another process.
+        """
+        if not self._checkLocal():
+            return None
+        self._flushPendingLoad()
+        parsed = self.parsed_style_sheet
+        style_sheet = parsed.text
+        if self.template_check_box.isChecked():
+            try:
+                style_sheet = self.style_sheet_template.compile(
+                    style_sheet, parsed.rules).text
+            except TemplateError as e:
+                self.status_label.setText(
+                    'Could not compile template: {}'.format(e))
+                return None
+        inspector_window = self.window()
+        windows = []
+        for widget in qApp.topLevelWidgets():
+            # Skips inspector and its dialogs
+            owner = widget
+            while owner is not None and owner is not inspector_window:
+                owner = owner.parentWidget()
+            if widget.isVisible() and owner is None:
+                windows.append(widget)
+        dialog = SandboxPreviewDialog(windows, style_sheet, self)
+        dialog.show()
+        return dialog
+
+    def onPickWidget(self):
+        """
+        Starts pick mode: the next widget clicked in the app, out of
+        inspector, is shown with the rules matching it, see
+        `showWidgetRules`.
+
+        :rtype: PickedRulesDialog|None
+        :return: dialog listing rules of picked widgets, or `None` if app is
+            in another process.
+        """
+        if not self._checkLocal():
+            return None
+        dialog = self._pickedRulesDialog()
+        dialog.show()
+        self.widget_picker.excluded = [self.window()]
+        self.widget_picker.start()
+        self.status_label.setText(
+            'Click a widget to list its rules, Escape cancels')
+        return dialog
+
+    def matchingRules(self, widget):
+        """
+        :param QWidget widget: a widget.
+        :rtype: list(RuleMatch)
+        :return: rules of applied style sheet matching widget, in cascade
+            order, see `SelectorIndex.matches`. Template rules are matched
+            with their template selectors.
+        """
+        self._flushPendingLoad()
+        if self.selector_index is None:
+            self.selector_index = SelectorIndex()
+            self._updateSelectorIndex()
+        return self.selector_index.matches(widget)
+
+    def showWidgetRules(self, widget):
+        """
+        Lists rules matching a widget and selects the one that wins
+        conflicts in style sheet text.
+
+        :param QWidget widget: a widget.
+        :rtype: PickedRulesDialog
+        """
+        matches = self.matchingRules(widget)
+        parsed = self.parsed_style_sheet
+        document = self.style_text_edit.document()
+        lines = []
+        for match in matches:
+            index = parsed.ruleAt(match.rule.start)
+            if index is None or parsed.rules[index] is not match.rule:
+                # Rule was edited since applied, offsets are outdated
+                lines.append(None)
+            else:
+                lines.append(
+                    document.findBlock(match.rule.start).blockNumber() + 1)
+        dialog = self._pickedRulesDialog()
+        dialog.setMatches(widget, matches, lines)
+        dialog.show()
+        for match, line in zip(matches, lines):
+            if line is not None:
+                self.selectRange(match.rule.start, match.rule.end)
+                break
+        self.status_label.setText('{} rules match {}'.format(
+            len(matches), widget.metaObject().className()))
+        return dialog
+
+    def _pickedRulesDialog(self):
+        """
+        :rtype: PickedRulesDialog
+        :return: dialog listing rules of picked widgets, created once.
+        """
+        if self._picked_rules_dialog is None:
+            dialog = self._picked_rules_dialog = PickedRulesDialog(self)
+            dialog.ruleActivated.connect(self.selectRange)
+            dialog.pickRequested.connect(self.onPickWidget)
+            dialog.finished.connect(lambda result: self.widget_picker.stop())
+        return self._picked_rules_dialog
+
+    def _updateSelectorIndex(self):
+        """
+        Updates selector index with rules of applied style sheet. Rules of
+        style sheet text are reused when it is the applied one, so only
+        rules changed since last update are indexed.
+        """
+        parsed = self.parsed_style_sheet
+        if parsed.text == self.style_sheet:
+            self.selector_index.update(parsed.rules)
+        elif not len(self.selector_index):
+            # Style sheet text was edited since applied, its rules can't be
+            # found in text
+            self.selector_index.update(
+                ParsedStyleSheet(self.style_sheet or '').rules)
+
+    def onLinkStyleSheetFiles(self):
+        """
+        Asks for .qss files to link, see `linkStyleSheetFiles`.
+        """
+        paths, _filter = QFileDialog.getOpenFileNames(
+            self, 'Link Style Sheet Files', '',
+            'Qt Style Sheets (*.qss);;All Files (*)')
+        if paths:
+            self.linkStyleSheetFiles(paths)
+
+    def linkStyleSheetFiles(self, paths):
+        """
+        Links .qss files to inspector: style sheet text becomes the contents
+        of all linked files and is applied each time any of them is saved.
+
+        :param list(unicode) paths: .qss file paths.
+        :rtype: bool
+        :return: if files were linked.
+        """
+        try:
+            self.style_sheet_files.link(paths)
+        except IOError as e:
+            self.status_label.setText('Could not link files: {}'.format(e))
+            return False
+        return True
+
+    def onStyleSheetFilesChanged(self):
+        """
+        Shows and applies style sheet of linked files, replacing only text
+        that changed and keeping undo tape.
+        """
+        if not self.style_sheet_files.paths():
+            return
+        style_sheet = self.style_sheet_files.styleSheet()
+        self._replaceStyleText(style_sheet)
+        if style_sheet != self.style_sheet:
+            self.applyStyleSheet(incremental=True)
+
+    def selectRange(self, start, end):
+        """
+        Selects a range of style sheet text, scrolling to it.
+
+        :param int start: start offset.
+        :param int end: end offset.
+        """
+        cursor = self.style_text_edit.textCursor()
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        self.style_text_edit.setTextCursor(cursor)
+        self.style_text_edit.ensureCursorVisible()
+
+    def onOutlineActivated(self, index):
+        """
+        Selects rule of outline item in style sheet text.
+
+        :param QModelIndex index: outline model index.
+        """
+        rule = self.outline_model.ruleAt(index)
+        if rule is not None:
+            self.selectRange(rule.start, rule.end)
+
+    def validateStyleSheet(self):
+        """
+        Validates style sheet text right away and shows its problems.
+
+        :rtype: list(Problem)
+        :return: problems of style sheet text, sorted by offset.
+        """
+        self._flushPendingLoad()
+        self._validation_timer.stop()
+        self.style_sheet_problems = style_sheet_problems(
+            self.parsed_style_sheet)
+        self._highlightProblems()
+        return self.style_sheet_problems
+
+    def describeProblem(self, problem):
+        """
+        :param Problem problem: a problem of style sheet text.
+        :rtype: unicode
+        :return: problem message with its line and column.
+        """
+        block = self.style_text_edit.document().findBlock(problem.start)
+        return 'Line {}, column {}: {}'.format(
+            block.blockNumber() + 1, problem.start - block.position() + 1,
+            problem.message)
+
+    def eventFilter(self, watched, event):
+        """
+        Shows problems of style sheet text under mouse as tool tips.
+
+        Also skips font changes of editor that don't change its font. Qt sets
+        the font of every widget again on each app style sheet change, and
+        the editor lays out its whole document again on any font change,
+        which makes applies of large style sheets slow.
+        """
+        if watched is self.style_text_edit:
+            return (event.type() == QEvent.FontChange and
+                    watched.font() == watched.document().defaultFont())
+        if (event.type() != QEvent.ToolTip or
+                watched is not self.style_text_edit.viewport()):
+            return False
+        position = self.style_text_edit.cursorForPosition(
+            event.pos()).position()
+        messages = [
+            self.describeProblem(problem)
+            for problem in self.style_sheet_problems
+            if problem.start <= position <= problem.end
+        ]
+        if messages:
+            QToolTip.showText(event.globalPos(), '\n'.join(messages))
+        else:
+            QToolTip.hideText()
+        return True
 
     def onFocusSearchBar(self):
         """
@@ -188,11 +939,79 @@ class StyleSheetWidget(QWidget):
         """
         self.search_bar.setFocus()
 
+    def onStyleContentsChange(self, position, removed, added):
+        """
+        Keeps search index and parsed rules up to date with style sheet text
+        edits.
+
+        Replacing whole text, like `setPlainText` does, removes it in an edit
+        and inserts new text in another one. Removal is only handled with the
+        insert that follows, or on `textChanged` if none does, so new text is
+        diffed against previous one and parsed once.
+        """
+        document = self.style_text_edit.document()
+        end = document.characterCount() - 1
+        if (position == 0 and removed and not added and not end and
+                removed >= len(self.search_index)):
+            self._text_cleared = True
+            return
+        if self._text_cleared or (
+                position == 0 and removed >= len(self.search_index)):
+            # Whole text replaced, like on load, undo and redo
+            self._text_cleared = False
+            text = self.style_text_edit.toPlainText()
+            self.search_index.setText(text)
+            changed = self.parsed_style_sheet.setText(text)
+        else:
+            cursor = QTextCursor(document)
+            cursor.setPosition(min(position, end))
+            cursor.setPosition(
+                min(position + added, end), QTextCursor.KeepAnchor)
+            added_text = cursor.selectedText().replace('\u2029', '\n')
+            self.search_index.update(position, removed, added_text)
+            changed = self.parsed_style_sheet.update(
+                position, removed, added_text)
+        if len(self.search_index) != end:
+            # Edit reported by Qt doesn't match index text, like when the
+            # whole text is replaced
+            text = self.style_text_edit.toPlainText()
+            self.search_index.setText(text)
+            changed = self.parsed_style_sheet.setText(text)
+        if (changed[1] or changed[2]) and not self.isLoading():
+            # While loading, rule changes are reported when load finishes
+            self.rulesChanged.emit(*changed)
+        if not self.isLoading():
+            self._validation_timer.start(self.validation_delay)
+        if self._isRegexSearch():
+            if self.search_bar.text():
+                self._search_timer.start(self.search_delay)
+        elif not self._search_timer.isActive():
+            self.search_hits = self.search_index.find(self.search_bar.text())
+            self._search_hit_ends = None
+            self._updateSearchHits()
+
     def onStyleTextChanged(self):
         """
-        Enable apply button when there are style text changes.
+        Enable apply button when there are style text changes, and schedules
+        a live apply when live apply is checked.
         """
+        if self._text_cleared:
+            # Whole text was removed, with no new text inserted
+            self.onStyleContentsChange(0, 0, 0)
         self.apply_button.setEnabled(True)
+        if self.live_apply_check_box.isChecked():
+            # Restarting the timer coalesces edits, there is never more than
+            # one pending apply
+            self._live_timer.start(self.live_apply_delay)
+
+    def onLiveApplyToggled(self, checked):
+        """
+        Applies pending changes when live apply is checked.
+        """
+        if checked:
+            self._live_timer.start(self.live_apply_delay)
+        else:
+            self._live_timer.stop()
 
     def onApplyButton(self, checked=False):
         """
@@ -203,25 +1022,592 @@ class StyleSheetWidget(QWidget):
     def loadStyleSheet(self):
         """
         Load app style sheet and displays its text in inspector widget.
+
+        App style sheet is added to undo tape, unless it is already the
+        current state, like when tape is restored from history log.
         """
-        style_sheet = self.style_sheet = qApp.styleSheet()
-        self.tape.append(style_sheet)
-        self.tape_pos = 0
+        try:
+            style_sheet = self.app_style_sheet.styleSheet()
+        except IOError as e:
+            self.status_label.setText(
+                'Could not load style sheet: {}'.format(e))
+            return
+        self.style_sheet = style_sheet
+        self._applied_rules = None
+        if self.tape_pos == -1 or self.tape[self.tape_pos] != style_sheet:
+            self.tape.append(style_sheet)
+            self.tape_pos = len(self.tape) - 1
 
-        self.style_text_edit.setPlainText(style_sheet)
+        self._setStyleText(style_sheet)
         self.apply_button.setEnabled(False)
 
-    def applyStyleSheet(self, stateless=False):
+    def isLoading(self):
+        """
+        :rtype: bool
+        :return: if a large style sheet is still being loaded in editor,
+            `styleSheetLoaded` is emitted when it finishes.
+        """
+        return self._pending_load is not None
+
+    def applyStyleSheet(self, stateless=False, incremental=None, live=False,
+                        action=ACTION_APPLY):
         """
         Apply style sheet changes in running app.
 
         :param bool stateless: If true, style sheet state tape isn't updated.
+        :param bool|None incremental: if style sheet is applied incrementally,
+            by default uses `incremental_apply`.
+        :param bool live: if it is a live apply. Live applies replace the tape
+            entry of a previous live apply done less than
+            `live_apply_fold_time` seconds before.
+        :param unicode action: one of `ACTION_*`, why style sheet is applied.
+
+        Unless stateless, style sheets with errors are not applied when
+        `validate_before_apply` is enabled, see `validateStyleSheet`.
         """
-        self.style_sheet = self.style_text_edit.toPlainText()
-        qApp.setStyleSheet(self.style_sheet)
+        self._flushPendingLoad()
+        self._live_timer.stop()
+        if self._rule_timer is not None:
+            # Rule timing would restore the previous style sheet when done
+            self._rule_timer.cancel()
+        if self.validate_before_apply and not stateless:
+            errors = [
+                problem for problem in self.validateStyleSheet()
+                if problem.severity == SEVERITY_ERROR
+            ]
+            if errors:
+                message = 'Style sheet not applied. {}'.format(
+                    self.describeProblem(errors[0]))
+                if len(errors) > 1:
+                    message += ' ({} more errors)'.format(len(errors) - 1)
+                self.status_label.setText(message)
+                return
+        now = time.perf_counter()
+        if (live and not stateless and self._last_live_apply is not None and
+                now - self._last_live_apply[0] < self.live_apply_fold_time and
+                self._last_live_apply[1] == self.tape_pos and
+                self.tape_pos > 0):
+            self.tape.truncate(self.tape_pos)
+            self.tape_pos -= 1
+        style_sheet = self.style_text_edit.toPlainText()
+        qss = style_sheet
+        rules = None
+        compile_time = 0.0
+        if self.template_check_box.isChecked():
+            start = time.perf_counter()
+            parsed = self.parsed_style_sheet
+            try:
+                qss, rules = self.style_sheet_template.compile(
+                    style_sheet,
+                    parsed.rules if parsed.text == style_sheet else None)
+            except TemplateError as e:
+                self.status_label.setText(
+                    'Could not compile template: {}'.format(e))
+                return
+            compile_time = time.perf_counter() - start
+        if incremental is None:
+            incremental = self.incremental_apply
+        try:
+            if incremental:
+                parse_time, repolish_time = self._applyIncremental(
+                    qss, rules, action)
+            else:
+                parse_time = 0.0
+                repolish_time = self._applyFull(qss, rules, action)
+        except IOError as e:
+            self.status_label.setText(
+                'Could not apply style sheet: {}'.format(e))
+            return
+        parse_time += compile_time
+        self.style_sheet = style_sheet
+        if self.selector_index is not None:
+            self._updateSelectorIndex()
+        self.compiled_style_sheet = (
+            qss if self.template_check_box.isChecked() else None)
+        metrics = ApplyMetrics(
+            timestamp=time.time(),
+            size=len(qss),
+            parse_time=parse_time,
+            repolish_time=repolish_time,
+            polished_count=self.last_repolish_count,
+            tape_pos=self.tape_pos,
+            scope=self.last_apply_scope,
+            live=live,
+        )
         if not stateless:
-            if self.tape_pos + 1 < len(self.tape):
-                self.tape = self.tape[:self.tape_pos + 1]
-            self.tape.append(self.style_sheet)
-            self.tape_pos += 1
+            self.tape.truncate(self.tape_pos + 1)
+            # Metrics are recorded in history log, if any
+            evicted = self.tape.append(
+                self.style_sheet,
+                metrics._replace(tape_pos=self.tape_pos + 1)._asdict())
+            self.tape_pos += 1 - evicted
+            metrics = metrics._replace(tape_pos=self.tape_pos)
+        self.apply_button.setEnabled(False)
+        self._last_live_apply = (now, self.tape_pos) if live else None
+
+        self._metrics.append(metrics)
+        self.status_label.setText(format_metrics(metrics))
+        self.styleSheetApplied.emit(metrics)
+
+    def applyMetrics(self, count=None):
+        """
+        :param int|None count: max number of metrics returned, by default
+            returns all kept metrics.
+        :rtype: list(ApplyMetrics)
+        :return: metrics of latest applies, oldest first.
+        """
+        metrics = list(self._metrics)
+        if count is not None:
+            metrics = metrics[max(0, len(metrics) - count):]
+        return metrics
+
+    def _applyFull(self, style_sheet, rules=None, action=ACTION_APPLY):
+        """
+        Apply whole style sheet to app, repolishing all widgets.
+
+        Rules of style sheet are kept, so next incremental apply, like an
+        undo, doesn't parse it again. Unless given, they are the parsed rules
+        of style sheet text, when it is the applied style sheet.
+
+        :param unicode style_sheet: style sheet text.
+        :param list(tuple(unicode, unicode))|None rules: rules of style
+            sheet, as returned by `split_rules`, if already known.
+        :param unicode action: see `applyStyleSheet`.
+        :rtype: float
+        :return: seconds spent setting app style sheet.
+        :raise IOError: if app is in another process and can't be reached.
+        """
+        repolish_time, self.last_repolish_count = (
+            self.app_style_sheet.setStyleSheet(style_sheet, action))
+        if rules is None:
+            parsed = self.parsed_style_sheet
+            if parsed.text == style_sheet and not parsed.errors:
+                rules = [(rule.selector, rule.body) for rule in parsed.rules]
+        self._applied_rules = rules
+        self.last_apply_scope = APPLY_FULL
+        self.last_affected_count = self.last_repolish_count
+        return repolish_time
+
+    def _applyIncremental(self, style_sheet, rules=None,
+                          action=ACTION_APPLY):
+        """
+        Diff style sheet against last applied one rule by rule, and only
+        apply it if any rule changed.
+
+        Qt always repolishes all widgets when app style sheet changes, so a
+        scoped change is still applied to the whole app. When
+        `count_affected_widgets` is enabled, widgets matched by changed
+        selectors are counted in `last_affected_count`. When the diff can't
+        be scoped (parse errors, universal selectors) a full apply is done.
+
+        :param unicode style_sheet: style sheet text.
+        :param list(tuple(unicode, unicode))|None rules: rules of style
+            sheet, as returned by `split_rules`, if already known.
+        :param unicode action: see `applyStyleSheet`.
+        :rtype: tuple(float, float)
+        :return: seconds spent diffing style sheets and setting app style
+            sheet.
+        :raise IOError: see `_applyFull`.
+        """
+        start = time.perf_counter()
+        try:
+            old_rules = self._applied_rules
+            if old_rules is None:
+                old_rules = split_rules(self.app_style_sheet.styleSheet())
+            new_rules = rules
+            if new_rules is None:
+                new_rules = self._rulesOf(style_sheet)
+            removed, added = diff_rules(old_rules, new_rules)
+            selectors = [
+                parse_selector(text)
+                for selector_group, _declarations in removed + added
+                for text in split_selector_group(selector_group)
+            ]
+        except ValueError:
+            return (time.perf_counter() - start,
+                    self._applyFull(style_sheet, action=action))
+
+        if not selectors:
+            self._applied_rules = new_rules
+            self.last_apply_scope = APPLY_SKIPPED
+            self.last_repolish_count = 0
+            self.last_affected_count = 0
+            return time.perf_counter() - start, 0.0
+        if any(selector.subject.isUniversal() for selector in selectors):
+            return (time.perf_counter() - start,
+                    self._applyFull(style_sheet, new_rules, action))
+
+        affected = None
+        if self.count_affected_widgets and self.app_style_sheet.is_local:
+            affected = 0
+            for widget in qApp.allWidgets():
+                class_names = widget_class_names(widget)
+                if any(selector_matches(selector, widget, class_names)
+                       for selector in selectors):
+                    affected += 1
+        parse_time = time.perf_counter() - start
+        repolish_time, self.last_repolish_count = (
+            self.app_style_sheet.setStyleSheet(style_sheet, action))
+        self._applied_rules = new_rules
+        self.last_apply_scope = APPLY_SCOPED
+        self.last_affected_count = affected
+        return parse_time, repolish_time
+
+    def _rulesOf(self, style_sheet):
+        """
+        :param unicode style_sheet: style sheet text.
+        :rtype: list(tuple(unicode, unicode))
+        :return: rules of style sheet text, as returned by `split_rules`.
+            Parsed rules of style sheet text are reused when possible.
+        :raise ValueError: if style sheet can't be parsed.
+        """
+        parsed = self.parsed_style_sheet
+        if parsed.text != style_sheet:
+            return split_rules(style_sheet)
+        if parsed.errors:
+            raise ValueError(parsed.errors[0].message)
+        return [(rule.selector, rule.body) for rule in parsed.rules]
+
+    def _liveApply(self):
+        """
+        Applies style sheet text incrementally, unless it didn't change or
+        can't be parsed, like while a rule is still being typed.
+        """
+        if self.isLoading():
+            return
+        style_sheet = self.style_text_edit.toPlainText()
+        if style_sheet == self.style_sheet:
+            # Like after an undo or redo, which apply their changes
+            return
+        errors = [
+            problem for problem in self.validateStyleSheet()
+            if problem.severity == SEVERITY_ERROR
+        ]
+        if errors:
+            self.status_label.setText(
+                'Live apply waiting for valid style sheet. {}'.format(
+                    self.describeProblem(errors[0])))
+            return
+        self.applyStyleSheet(incremental=True, live=True)
+
+    def _setStyleText(self, text):
+        """
+        Shows text in editor. Large texts are loaded in chunks, see
+        `large_document_size`.
+
+        :param unicode text: style sheet text.
+        """
+        self._load_timer.stop()
+        self._pending_load = None
+        self._updateLargeDocument(len(text))
+        if not self.large_document:
+            self.style_text_edit.setReadOnly(False)
+            self.style_text_edit.setPlainText(text)
+            self.styleSheetLoaded.emit()
+            return
+
+        self._rule_count_before_load = len(self.parsed_style_sheet.rules)
+        self._pending_load = text
+        self._pending_load_pos = 0
+        # Chunks must not be undone by user
+        self.style_text_edit.document().setUndoRedoEnabled(False)
+        self.style_text_edit.setReadOnly(True)
+        self.style_text_edit.clear()
+        self._loadNextChunk()
+
+    def _replaceStyleText(self, text):
+        """
+        Turns editor text into `text` with a single edit that only replaces
+        the range that differs, so document layout, cursor and scroll
+        position are kept.
+
+        :param unicode text: new style sheet text.
+        """
+        self._flushPendingLoad()
+        current = self.style_text_edit.toPlainText()
+        prefix, suffix, middle = compute_delta(current, text)
+        if prefix + suffix == len(current) and not middle:
+            return
+        self._updateLargeDocument(len(text))
+        scroll_bars = [
+            self.style_text_edit.verticalScrollBar(),
+            self.style_text_edit.horizontalScrollBar(),
+        ]
+        scroll_values = [scroll_bar.value() for scroll_bar in scroll_bars]
+        cursor = QTextCursor(self.style_text_edit.document())
+        cursor.beginEditBlock()
+        cursor.setPosition(prefix)
+        cursor.setPosition(len(current) - suffix, QTextCursor.KeepAnchor)
+        cursor.insertText(middle)
+        cursor.endEditBlock()
+        for scroll_bar, value in zip(scroll_bars, scroll_values):
+            scroll_bar.setValue(value)
+
+    def _updateLargeDocument(self, size):
+        """
+        Turns large document mode on or off for a style sheet size.
+
+        :param int size: number of chars of style sheet.
+        """
+        self.large_document = size >= self.large_document_size
+        self.style_text_edit.setLineWrapMode(
+            QPlainTextEdit.NoWrap if self.large_document
+            else QPlainTextEdit.WidgetWidth)
+
+    def _loadNextChunk(self, size=None):
+        """
+        Inserts next chunk of style sheet text being loaded in editor.
+
+        :param int|None size: number of chars inserted, by default
+            `load_chunk_size`. Chunks end at line breaks, if possible.
+        """
+        text = self._pending_load
+        start = self._pending_load_pos
+        end = min(start + (size or self.load_chunk_size), len(text))
+        if end < len(text):
+            line_end = text.rfind('\n', start, end)
+            if line_end != -1:
+                end = line_end + 1
+        cursor = QTextCursor(self.style_text_edit.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text[start:end])
+        self._pending_load_pos = end
+        if end < len(text):
+            self._load_timer.start(0)
+            return
+
+        self._pending_load = None
+        self.style_text_edit.document().setUndoRedoEnabled(True)
+        self.style_text_edit.setReadOnly(self.large_document_read_only)
         self.apply_button.setEnabled(False)
+        self.rulesChanged.emit(
+            0, self._rule_count_before_load,
+            len(self.parsed_style_sheet.rules))
+        self._validation_timer.start(self.validation_delay)
+        self.styleSheetLoaded.emit()
+
+    def _flushPendingLoad(self):
+        """
+        Loads remaining style sheet text being loaded at once, if any.
+        """
+        if self.isLoading():
+            self._load_timer.stop()
+            self._loadNextChunk(len(self._pending_load))
+
+    def _isRegexSearch(self):
+        """
+        :rtype: bool
+        :return: if current search options require a background search.
+        """
+        return (
+            self.regex_check_box.isChecked() or
+            self.case_check_box.isChecked() or
+            self.words_check_box.isChecked()
+        )
+
+    def _flushPendingSearch(self):
+        """
+        Runs a literal search still waiting for debounce delay right away, so
+        going to next or previous hit uses current search text.
+        """
+        if self._search_timer.isActive() and not self._isRegexSearch():
+            self._search_timer.stop()
+            self._startSearch()
+
+    def _startSearch(self):
+        """
+        Searches current search text with current options. Literal searches
+        use `search_index`, others start a background search.
+        """
+        search = self.search_bar.text()
+        if not self._isRegexSearch():
+            self.search_bar.setToolTip('')
+            self.search_hits = self.search_index.find(search)
+            self._search_hit_ends = None
+            self._goToFirstSearchHit()
+            self.searchFinished.emit()
+            return
+        if not search:
+            self._onRegexSearchFinished([], [])
+            return
+        self.regex_searcher.search(
+            self.style_text_edit.toPlainText(),
+            search,
+            regex=self.regex_check_box.isChecked(),
+            case_sensitive=self.case_check_box.isChecked(),
+            whole_words=self.words_check_box.isChecked(),
+        )
+
+    def _onRegexSearchFinished(self, starts, ends):
+        """
+        Shows results of a background search.
+        """
+        self.search_bar.setToolTip('')
+        self.search_hits = starts
+        self._search_hit_ends = ends
+        self._goToFirstSearchHit()
+        self.searchFinished.emit()
+
+    def _onRegexSearchFailed(self, message):
+        """
+        Shows why search pattern is invalid.
+        """
+        self.search_hits = []
+        self._search_hit_ends = []
+        self.search_bar.setStyleSheet("color: red;")
+        self.search_bar.setToolTip(message)
+        self._updateSearchHits()
+        self.searchFinished.emit()
+
+    def _goToFirstSearchHit(self):
+        """
+        Selects first search hit after cursor, coloring search bar green if
+        there is any hit or red otherwise.
+        """
+        cursor = self.style_text_edit.textCursor()
+        hit = next_hit(self.search_hits, cursor.selectionStart())
+        if hit is None:
+            self.search_bar.setStyleSheet("color: red;")
+            self.style_text_edit.moveCursor(QTextCursor.Start)
+        else:
+            self.search_bar.setStyleSheet("color: green;")
+            self._selectSearchHit(hit)
+        self._updateSearchHits()
+
+    def _searchHitEnd(self, hit):
+        """
+        :param int hit: index of hit in `search_hits`.
+        :rtype: int
+        :return: end offset of hit.
+        """
+        if self._search_hit_ends is None:
+            return self.search_hits[hit] + len(self.search_bar.text())
+        return self._search_hit_ends[hit]
+
+    def _selectSearchHit(self, hit):
+        """
+        Selects a search hit in style sheet text.
+
+        :param int hit: index of hit in `search_hits`.
+        """
+        start = self.search_hits[hit]
+        cursor = self.style_text_edit.textCursor()
+        cursor.setPosition(start)
+        cursor.setPosition(self._searchHitEnd(hit), QTextCursor.KeepAnchor)
+        self.style_text_edit.setTextCursor(cursor)
+        self.style_text_edit.ensureCursorVisible()
+
+    def _updateSearchHits(self):
+        """
+        Updates search hit counter and highlights.
+        """
+        if not self.search_bar.text():
+            self.search_hits_label.clear()
+        else:
+            cursor = self.style_text_edit.textCursor()
+            current = 0
+            if cursor.hasSelection():
+                hit = next_hit(self.search_hits, cursor.selectionStart())
+                if (hit is not None and
+                        self.search_hits[hit] == cursor.selectionStart()):
+                    current = hit + 1
+            self.search_hits_label.setText(
+                '{} of {}'.format(current, len(self.search_hits)))
+        self._highlightSearchHits()
+
+    def _highlightSearchHits(self):
+        """
+        Highlights all search hits in visible part of style sheet text. Only
+        visible hits are highlighted so it stays fast no matter how many hits
+        there are.
+        """
+        selections = []
+        if self.search_hits:
+            viewport = self.style_text_edit.viewport()
+            first = self.style_text_edit.cursorForPosition(
+                QPoint(0, 0)).position()
+            last = self.style_text_edit.cursorForPosition(
+                QPoint(viewport.width(), viewport.height())).position()
+            # Also highlight hit that starts before and ends in visible text
+            hit = bisect_left(self.search_hits, first)
+            if hit > 0 and self._searchHitEnd(hit - 1) > first:
+                hit -= 1
+            hit_format = QTextEdit.ExtraSelection().format
+            hit_format.setBackground(QColor(Qt.yellow))
+            while hit < len(self.search_hits):
+                start = self.search_hits[hit]
+                if start > last:
+                    break
+                selection = QTextEdit.ExtraSelection()
+                selection.format = hit_format
+                selection.cursor = QTextCursor(
+                    self.style_text_edit.document())
+                selection.cursor.setPosition(start)
+                selection.cursor.setPosition(
+                    self._searchHitEnd(hit), QTextCursor.KeepAnchor)
+                selections.append(selection)
+                hit += 1
+        self._setExtraSelections('search', selections)
+
+    def _validateIdle(self):
+        """
+        Validates rules for up to `StyleSheetHighlighter.IDLE_BATCH_TIME`
+        seconds, and shows problems once all rules are validated.
+        """
+        if self.isLoading():
+            return
+        deadline = time.perf_counter() + self.highlighter.IDLE_BATCH_TIME
+        if validate_rules(self.parsed_style_sheet.rules,
+                          self.parsed_style_sheet.text, deadline):
+            self.validateStyleSheet()
+        else:
+            self._validation_timer.start(0)
+
+    def _highlightProblems(self):
+        """
+        Underlines problems in visible part of style sheet text: errors in
+        red and warnings in orange.
+        """
+        selections = []
+        if self.style_sheet_problems:
+            document = self.style_text_edit.document()
+            viewport = self.style_text_edit.viewport()
+            first = self.style_text_edit.cursorForPosition(
+                QPoint(0, 0)).position()
+            last = self.style_text_edit.cursorForPosition(
+                QPoint(viewport.width(), viewport.height())).position()
+            # Problems may be a bit behind text while user types
+            end = document.characterCount() - 1
+            for problem in self.style_sheet_problems:
+                if problem.start > last:
+                    break
+                if problem.end < first:
+                    continue
+                selection = QTextEdit.ExtraSelection()
+                selection.format.setUnderlineStyle(
+                    QTextCharFormat.WaveUnderline)
+                selection.format.setUnderlineColor(
+                    QColor(Qt.red) if problem.severity == SEVERITY_ERROR
+                    else QColor(255, 140, 0))
+                selection.cursor = QTextCursor(document)
+                selection.cursor.setPosition(min(problem.start, end))
+                selection.cursor.setPosition(
+                    min(max(problem.end, problem.start + 1), end),
+                    QTextCursor.KeepAnchor)
+                selections.append(selection)
+        self._setExtraSelections('problems', selections)
+
+    def _setExtraSelections(self, owner, selections):
+        """
+        Sets extra selections of style text edit owned by a feature, keeping
+        the ones of other features.
+
+        :param unicode owner: name of feature.
+        :param list(QTextEdit.ExtraSelection) selections: new selections.
+        """
+        self._extra_selections[owner] = selections
+        self.style_text_edit.setExtraSelections([
+            selection
+            for owned in self._extra_selections.values()
+            for selection in owned
+        ])
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from PyQt5.QtGui import QPalette
+
+# Style of inspector widgets. A widget style sheet always wins over app style
+# sheet, whatever selector specificity, so setting the properties app style
+# sheets commonly set keeps inspector look fixed while style sheets are
+# tested. Colors and font come from app palette and font, which app style
+# sheet doesn't change.
+#
+# Qt sets palette of every styled widget again on each repolish, so colors
+# are only set on widgets that show them, not on internal widgets of scroll
+# areas. Scroll bars aren't styled: styling them doubles repolish time of
+# inspector, and app style of scroll bars is still usable.
+_INSPECTOR_STYLE_SHEET = """\
+* {{
+    font-family: "{font_family}";
+    font-size: {font_size};
+    font-style: normal;
+    font-weight: normal;
+}}
+StyleSheetWidget, QDialog, QMessageBox, QLabel, QCheckBox, QPushButton,
+QLineEdit, QPlainTextEdit, QTextEdit, QAbstractItemView, QHeaderView {{
+    color: {text};
+    selection-color: {highlighted_text};
+    selection-background-color: {highlight};
+}}
+StyleSheetWidget, QDialog, QMessageBox, QLabel, QCheckBox {{
+    background-color: {window};
+    border: none;
+    margin: 0px;
+    padding: 0px;
+}}
+QLineEdit, QPlainTextEdit, QTextEdit, QAbstractItemView {{
+    background-color: {base};
+    alternate-background-color: {alternate_base};
+    border: 1px solid {mid};
+    margin: 0px;
+    padding: 1px;
+}}
+QHeaderView::section {{
+    background-color: {button};
+    border: none;
+    border-right: 1px solid {mid};
+    border-bottom: 1px solid {mid};
+    padding: 2px 4px;
+}}
+QPushButton {{
+    background-color: {button};
+    border: 1px solid {mid};
+    border-radius: 2px;
+    margin: 0px;
+    padding: 3px 12px;
+    min-width: 0px;
+    min-height: 0px;
+}}
+QPushButton:pressed {{
+    background-color: {mid};
+}}
+QPushButton:disabled, QLabel:disabled, QCheckBox:disabled {{
+    color: {disabled_text};
+}}
+QCheckBox {{
+    spacing: 4px;
+}}
+QCheckBox::indicator {{
+    width: 10px;
+    height: 10px;
+    border: 1px solid {mid};
+    background-color: {base};
+}}
+QCheckBox::indicator:checked {{
+    background-color: {highlight};
+}}
+QSplitter::handle {{
+    background-color: {mid};
+}}
+QSplitter::handle:horizontal {{
+    width: 1px;
+}}
+QSplitter::handle:vertical {{
+    height: 1px;
+}}
+"""
+
+
+def inspector_style_sheet(palette, font):
+    """
+    :param QPalette palette: palette of inspector, like app palette.
+    :param QFont font: font of inspector, like app font.
+    :rtype: unicode
+    :return: style sheet that fixes inspector look, whatever app style sheet
+        is applied.
+    """
+    if font.pointSizeF() > 0:
+        font_size = '{}pt'.format(font.pointSizeF())
+    else:
+        font_size = '{}px'.format(font.pixelSize())
+
+    def color(role, group=QPalette.Active):
+        return palette.color(group, role).name()
+
+    return _INSPECTOR_STYLE_SHEET.format(
+        font_family=font.family(),
+        font_size=font_size,
+        window=color(QPalette.Window),
+        base=color(QPalette.Base),
+        alternate_base=color(QPalette.AlternateBase),
+        text=color(QPalette.Text),
+        disabled_text=color(QPalette.Text, QPalette.Disabled),
+        button=color(QPalette.Button),
+        mid=color(QPalette.Mid),
+        highlight=color(QPalette.Highlight),
+        highlighted_text=color(QPalette.HighlightedText),
+    )
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import time
+from collections import namedtuple
+
+from PyQt5.QtWidgets import qApp
+
+# Why a style sheet is applied, see `AppStyleSheet.setStyleSheet`
+ACTION_APPLY = 'apply'
+ACTION_UNDO = 'undo'
+ACTION_REDO = 'redo'
+
+ApplyMetrics = namedtuple('ApplyMetrics', [
+    # `time.time()` when apply finished
+    'timestamp',
+    # Style sheet size, in chars
+    'size',
+    # Seconds spent by inspector parsing and diffing style sheet
+    'parse_time',
+    # Seconds spent in `qApp.setStyleSheet`, which includes Qt parsing the
+    # style sheet and repolishing widgets
+    'repolish_time',
+    # Number of widgets repolished by Qt
+    'polished_count',
+    # Position of applied style sheet in undo tape
+    'tape_pos',
+    # One of `APPLY_*` scopes, see `StyleSheetWidget.last_apply_scope`
+    'scope',
+    # If apply was done by live apply mode, as user typed
+    'live',
+])
+
+
+def set_app_style_sheet(style_sheet):
+    """
+    Sets app style sheet, measuring how long it takes.
+
+    :param unicode style_sheet: style sheet text.
+    :rtype: tuple(float, int)
+    :return: seconds spent and number of widgets repolished.
+    """
+    start = time.perf_counter()
+    qApp.setStyleSheet(style_sheet)
+    return time.perf_counter() - start, len(qApp.allWidgets())
+
+
+class AppStyleSheet(object):
+    """
+    Style sheet of the app running the inspector. See `RemoteStyleSheet` for
+    the style sheet of an app in another process.
+    """
+
+    # If app widgets are in inspector process, so they can be analyzed
+    is_local = True
+
+    def styleSheet(self):
+        """
+        :rtype: unicode
+        :return: current app style sheet.
+        """
+        return qApp.styleSheet()
+
+    def setStyleSheet(self, style_sheet, action=ACTION_APPLY):
+        """
+        Applies a style sheet to app.
+
+        :param unicode style_sheet: style sheet text.
+        :param unicode action: one of `ACTION_*`, what is applied.
+        :rtype: tuple(float, int)
+        :return: see `set_app_style_sheet`.
+        """
+        return set_app_style_sheet(style_sheet)
+
+
+def format_metrics(metrics):
+    """
+    :param ApplyMetrics metrics: metrics of an apply.
+    :rtype: unicode
+    :return: short description of metrics, suitable for a status bar.
+    """
+    if metrics.scope == 'skipped':
+        text = 'No rule changes, apply skipped ({:.1f} ms)'.format(
+            metrics.parse_time * 1000)
+    else:
+        text = 'Applied {:.1f} KB in {:.1f} ms ({} widgets repolished)'.format(
+            metrics.size / 1024,
+            (metrics.parse_time + metrics.repolish_time) * 1000,
+            metrics.polished_count,
+        )
+    if metrics.live:
+        text = 'Live: ' + text
+    return text
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import io
+import re
+from bisect import bisect_right, insort
+from collections import namedtuple
+
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import QDialog, QFileDialog, QHBoxLayout, QLabel, \
+    QPlainTextEdit, QPushButton, QVBoxLayout, qApp
+
+from ._metrics import set_app_style_sheet
+from ._qss import strip_comments
+from ._selectors import parse_selector, split_selector_group
+
+# Quoted strings, whose white space is kept
+_STRING_RE = re.compile(r'''("(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?)''')
+_SPACE_RE = re.compile(r'\s+')
+# White space around these chars is dropped from values, and also around
+# combinators in selectors
+_VALUE_SPACE_RE = re.compile(r' ?([,()]) ?')
+_SELECTOR_SPACE_RE = re.compile(r' ?([,>+~]) ?')
+
+OptimizeStats = namedtuple('OptimizeStats', [
+    # Number of rules before and after optimizing
+    'rules_before',
+    'rules_after',
+    # Declarations dropped because a later one in same rule sets the same
+    # property
+    'overridden_count',
+    # Rules merged into a later rule with the same selectors
+    'merged_selector_count',
+    # Rules merged into a later rule with the same declarations
+    'merged_body_count',
+])
+
+
+def _collapse_whitespace(text, space_re):
+    """
+    :rtype: unicode
+    :return: text with white space runs outside quoted strings collapsed to
+        a single space, and dropped around chars matched by `space_re`.
+    """
+    parts = []
+    for index, part in enumerate(_STRING_RE.split(text)):
+        if index % 2:
+            parts.append(part)
+        else:
+            parts.append(space_re.sub(r'\1', _SPACE_RE.sub(' ', part)))
+    return ''.join(parts).strip()
+
+
+def _property_family(name):
+    """
+    :rtype: unicode
+    :return: family of a property: properties of different families never
+        affect each other, while a shorthand like `border` affects its whole
+        family, like `border-top-color`.
+    """
+    name = name.lower()
+    if name.startswith(('qproperty-', '-qt-')):
+        return name
+    return name.split('-', 1)[0]
+
+
+class _Entry(object):
+    """
+    A rule being optimized.
+    """
+
+    __slots__ = ('selectors', 'declarations', 'families', 'valid')
+
+    def __init__(self, selectors, declarations, valid):
+        # Minified selector texts
+        self.selectors = selectors
+        # Minified `(name, declaration text)` pairs
+        self.declarations = declarations
+        self.families = frozenset(
+            _property_family(name) for name, _text in declarations)
+        # If all selectors can be parsed, so the rule can be grouped
+        self.valid = valid
+
+    def selectorText(self):
+        return ','.join(self.selectors)
+
+    def bodyText(self):
+        return ';'.join(text for _name, text in self.declarations)
+
+
+def _is_important(text):
+    return text.replace(' ', '').lower().endswith('!important')
+
+
+def _drop_overridden(declarations):
+    """
+    :param list(tuple(unicode, unicode)) declarations: `(name, text)` of
+        each declaration, in source order.
+    :rtype: list(tuple(unicode, unicode))
+    :return: declarations without those overridden by a later declaration
+        of the same property.
+    """
+    kept = []
+    seen = {}
+    for name, text in reversed(declarations):
+        key = name.lower()
+        important = _is_important(text)
+        if key in seen and (seen[key] or not important):
+            continue
+        seen[key] = seen.get(key, False) or important
+        kept.append((name, text))
+    kept.reverse()
+    return kept
+
+
+def optimize_style_sheet(parsed_style_sheet):
+    """
+    Turns a style sheet into an equivalent smaller one:
+
+    * Comments, at-rule statements (which Qt skips) and needless white space
+      are removed, leaving one rule per line.
+    * Declarations overridden by a later declaration of the same property
+      in the same rule are dropped.
+    * A rule is merged into the next rule with the same selectors, and
+      then rules with identical declarations are grouped, like
+      `QLabel, QLineEdit { color: red; }`.
+
+    Merging moves declarations of a rule to a later rule, which only keeps
+    cascade order when no rule in between sets a property of the same
+    family (a shorthand like `border` sets `border-color` too), so rules are
+    only merged then. Rules are only grouped when all their selectors can be
+    parsed, since Qt drops a whole group with an invalid selector.
+
+    :param ParsedStyleSheet parsed_style_sheet: parsed style sheet text.
+    :rtype: tuple(unicode, OptimizeStats)
+    :return: optimized style sheet text and what was optimized.
+    :raise ValueError: if style sheet has parse errors.
+    """
+    parsed = parsed_style_sheet
+    style_sheet = parsed.text
+    if parsed.errors:
+        raise ValueError(parsed.errors[0].message)
+
+    entries = []
+    overridden_count = 0
+    valid_selectors = {}
+    for rule in parsed.rules:
+        prelude = strip_comments(
+            style_sheet[rule.start:rule.start + rule.body_start])
+        selectors = [
+            _collapse_whitespace(selector, _SELECTOR_SPACE_RE)
+            for selector in split_selector_group(prelude)
+        ]
+        valid = True
+        for selector in rule.selectors():
+            if selector not in valid_selectors:
+                try:
+                    parse_selector(selector)
+                except ValueError:
+                    valid_selectors[selector] = False
+                else:
+                    valid_selectors[selector] = True
+            valid = valid and valid_selectors[selector]
+        if not valid:
+            # Keep selector text as is, Qt drops it anyway
+            selectors = [_collapse_whitespace(prelude, _SELECTOR_SPACE_RE)]
+        declarations = []
+        for declaration in rule.declarations:
+            source = strip_comments(style_sheet[
+                rule.start + declaration.start:rule.start + declaration.end])
+            name, _colon, value = source.partition(':')
+            name = name.strip()
+            declarations.append((name, '{}:{}'.format(
+                name, _collapse_whitespace(value, _VALUE_SPACE_RE))))
+        kept = _drop_overridden(declarations)
+        overridden_count += len(declarations) - len(kept)
+        entries.append(_Entry(selectors, kept, valid))
+
+    merged_selector_count = _merge(
+        entries, lambda entry: entry.selectorText(), _merge_declarations)
+    merged_body_count = _merge(
+        entries,
+        lambda entry: entry.bodyText() if entry.valid else None,
+        _merge_selectors)
+
+    entries = [entry for entry in entries if entry is not None]
+    text = '\n'.join(
+        '{}{{{}}}'.format(entry.selectorText(), entry.bodyText())
+        for entry in entries)
+    return text, OptimizeStats(
+        rules_before=len(parsed.rules),
+        rules_after=len(entries),
+        overridden_count=overridden_count,
+        merged_selector_count=merged_selector_count,
+        merged_body_count=merged_body_count,
+    )
+
+
+def _merge_declarations(entry, later):
+    """
+    :rtype: _Entry
+    :return: entry with declarations of entry followed by those of a later
+        entry with the same selectors.
+    """
+    return _Entry(
+        later.selectors,
+        _drop_overridden(entry.declarations + later.declarations),
+        later.valid)
+
+
+def _merge_selectors(entry, later):
+    """
+    :rtype: _Entry
+    :return: entry grouping selectors of entry and a later entry with the
+        same declarations.
+    """
+    selectors = list(entry.selectors)
+    selectors.extend(
+        selector for selector in later.selectors
+        if selector not in entry.selectors)
+    return _Entry(selectors, later.declarations, True)
+
+
+def _merge(entries, key, merge):
+    """
+    Merges each entry into the next entry with the same key, when no entry in
+    between sets a property of the same family. Merged entries are replaced
+    by `None`.
+
+    :param list(_Entry|None) entries: entries, in cascade order.
+    :param callable key: returns key of an entry, entries with a `None` key
+        aren't merged.
+    :param callable merge: returns an entry merging an entry into a later
+        one.
+    :rtype: int
+    :return: number of merged entries.
+    """
+    # Positions of entries with each key, and of entries setting each
+    # property family, sorted
+    by_key = {}
+    by_family = {}
+    for position, entry in enumerate(entries):
+        if entry is None:
+            continue
+        by_key.setdefault(key(entry), []).append(position)
+        for family in entry.families:
+            by_family.setdefault(family, []).append(position)
+
+    count = 0
+    for position, entry in enumerate(entries):
+        if entry is None:
+            continue
+        entry_key = key(entry)
+        if entry_key is None:
+            continue
+        positions = by_key[entry_key]
+        next_index = bisect_right(positions, position)
+        if next_index == len(positions):
+            continue
+        later_position = positions[next_index]
+        blocked = False
+        for family in entry.families:
+            family_positions = by_family[family]
+            index = bisect_right(family_positions, position)
+            if (index < len(family_positions) and
+                    family_positions[index] < later_position):
+                blocked = True
+                break
+        if blocked:
+            continue
+        later = entries[later_position]
+        merged = merge(entry, later)
+        entries[later_position] = merged
+        entries[position] = None
+        for family in merged.families - later.families:
+            insort(by_family[family], later_position)
+        count += 1
+    return count
+
+
+def measure_apply_time(style_sheet, repeat=3):
+    """
+    Times how long applying a style sheet to the app takes, when widgets are
+    already styled by it, like on an apply from the inspector. It is first
+    applied untimed unless it is already the app one, since Qt takes a
+    different path when the previous style sheet is another one or empty.
+    App style sheet is left changed.
+
+    :param unicode style_sheet: style sheet text.
+    :param int repeat: number of times apply is timed, the fastest one is
+        used.
+    :rtype: float
+    :return: seconds of fastest apply.
+    """
+    if qApp.styleSheet() != style_sheet:
+        qApp.setStyleSheet(style_sheet)
+    return min(
+        set_app_style_sheet(style_sheet)[0] for _ in range(repeat))
+
+
+class OptimizeDialog(QDialog):
+    """
+    Shows an optimized style sheet with its size and apply time compared to
+    the original one. Apply button emits `applyRequested`, and export button
+    saves optimized style sheet to a file.
+    """
+
+    applyRequested = pyqtSignal()
+
+    def __init__(self, style_sheet, optimized, stats, apply_times=None,
+                 parent=None):
+        """
+        :param unicode style_sheet: original style sheet text.
+        :param unicode optimized: optimized style sheet text.
+        :param OptimizeStats stats: as returned by `optimize_style_sheet`.
+        :param tuple(float, float)|None apply_times: seconds applying
+            original and optimized style sheets took, if measured.
+        :param QWidget parent: parent widget.
+        """
+        QDialog.__init__(self, parent)
+        self.setWindowTitle('Optimize Style Sheet')
+        self.style_sheet = style_sheet
+        self.optimized = optimized
+        self.stats = stats
+
+        size_before = len(style_sheet.encode('utf-8'))
+        size_after = len(optimized.encode('utf-8'))
+        lines = [
+            'Size: {:.1f} KB -> {:.1f} KB ({:.0f}% smaller)'.format(
+                size_before / 1024, size_after / 1024,
+                100 * (1 - size_after / size_before) if size_before else 0),
+            'Rules: {} -> {} ({} overridden declarations dropped, {} rules '
+            'merged by selector, {} by declarations)'.format(
+                stats.rules_before, stats.rules_after,
+                stats.overridden_count, stats.merged_selector_count,
+                stats.merged_body_count),
+        ]
+        if apply_times is not None:
+            lines.append('Apply: {:.1f} ms -> {:.1f} ms'.format(
+                apply_times[0] * 1000, apply_times[1] * 1000))
+        self.summary_label = QLabel('\n'.join(lines), self)
+
+        self.text_edit = QPlainTextEdit(self)
+        self.text_edit.setReadOnly(True)
+        self.text_edit.setPlainText(optimized)
+
+        self.apply_button = QPushButton('Apply', self)
+        self.apply_button.clicked.connect(self.applyRequested)
+        self.export_button = QPushButton('Export...', self)
+        self.export_button.clicked.connect(self.onExport)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.apply_button, 1)
+        button_layout.addWidget(self.export_button)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.text_edit)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+        self.resize(600, 400)
+
+    def onExport(self):
+        """
+        Asks for a file to export optimized style sheet, see
+        `exportStyleSheet`.
+        """
+        path, _filter = QFileDialog.getSaveFileName(
+            self, 'Export Style Sheet', '',
+            'Qt Style Sheets (*.qss);;All Files (*)')
+        if path:
+            self.exportStyleSheet(path)
+
+    def exportStyleSheet(self, path):
+        """
+        Saves optimized style sheet to a file, as UTF-8.
+
+        :param unicode path: file path.
+        :rtype: bool
+        :return: if file was saved, otherwise the error is shown in dialog.
+        """
+        try:
+            with io.open(path, 'w', encoding='utf-8') as qss_file:
+                qss_file.write(self.optimized)
+        except IOError as e:
+            self.summary_label.setText(
+                'Could not export style sheet: {}'.format(e))
+            return False
+        return True
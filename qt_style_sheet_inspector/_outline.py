@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import re
+from bisect import bisect_left
+
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, Qt
+
+# Last compound selector of a selector, split by combinators
+_COMBINATOR_RE = re.compile(r'\s*>\s*|\s+')
+# Class and object name of a compound selector
+_SUBJECT_RE = re.compile(r'\*?\.?([\w-]+)?(#[\w-]+)?')
+
+# Group of selectors whose subject has no class nor object name
+UNIVERSAL_GROUP = '*'
+
+
+def outline_key(selector):
+    """
+    :param unicode selector: a single selector (not a group).
+    :rtype: unicode
+    :return: outline group of selector: class name of styled widget, or its
+        object name (prefixed with `#`) when selector has no class name, or
+        `UNIVERSAL_GROUP` if neither is known.
+    """
+    subject = _COMBINATOR_RE.split(selector.strip())[-1]
+    match = _SUBJECT_RE.match(subject)
+    class_name, object_name = match.groups()
+    return class_name or object_name or UNIVERSAL_GROUP
+
+
+class _OutlineGroup(object):
+    """
+    Selectors of an outline group, in source order. Only the first `fetched`
+    entries are known by views.
+    """
+
+    __slots__ = ('key', 'entries', 'fetched')
+
+    def __init__(self, key):
+        self.key = key
+        # `(rule, selector)` pairs
+        self.entries = []
+        self.fetched = 0
+
+
+class RuleOutlineModel(QAbstractItemModel):
+    """
+    Tree model of style sheet rules: top level items are outline groups (see
+    `outline_key`), sorted by name, and their children are selectors of
+    rules, in source order.
+
+    Rows are fetched lazily, in batches of `FETCH_SIZE`, so only rows views
+    actually show are created. The model follows edits through
+    `onRulesChanged`, changing only the rows of changed rules. When more than
+    `RESET_SIZE` rules change at once, like when a different style sheet is
+    loaded, the model is reset instead.
+    """
+
+    FETCH_SIZE = 256
+    RESET_SIZE = 1000
+
+    def __init__(self, parsed_style_sheet, parent=None):
+        """
+        :param ParsedStyleSheet parsed_style_sheet: rules shown by model.
+        :param QObject parent: parent object.
+        """
+        QAbstractItemModel.__init__(self, parent)
+        self.parsed_style_sheet = parsed_style_sheet
+        # Rules as last seen by model, to know which entries to remove when
+        # rules change
+        self._rules = []
+        # Sorted group keys and respective groups
+        self._keys = []
+        self._groups = []
+        self._fetched_groups = 0
+        self._reset()
+
+    def ruleAt(self, index):
+        """
+        :param QModelIndex index: index of model.
+        :rtype: Rule|None
+        :return: rule of a selector item, `None` for groups.
+        """
+        group = index.internalPointer() if index.isValid() else None
+        if group is None:
+            return None
+        return group.entries[index.row()][0]
+
+    def onRulesChanged(self, index, removed, added):
+        """
+        Updates rows of changed rules.
+
+        :param int index: index of first changed rule.
+        :param int removed: number of rules removed at index.
+        :param int added: number of rules added at index.
+        """
+        if removed + added > self.RESET_SIZE:
+            self.beginResetModel()
+            self._reset()
+            self.endResetModel()
+            return
+        new_rules = self.parsed_style_sheet.rules[index:index + added]
+        for rule in self._rules[index:index + removed]:
+            for selector in rule.selectors():
+                self._removeEntry(outline_key(selector), rule)
+        self._rules[index:index + removed] = new_rules
+        for rule in new_rules:
+            for selector in rule.selectors():
+                self._insertEntry(outline_key(selector), rule, selector)
+
+    def _reset(self):
+        """
+        Groups all rules again, without notifying views.
+        """
+        self._rules = list(self.parsed_style_sheet.rules)
+        groups = {}
+        for rule in self._rules:
+            for selector in rule.selectors():
+                key = outline_key(selector)
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = _OutlineGroup(key)
+                group.entries.append((rule, selector))
+        self._keys = sorted(groups)
+        self._groups = [groups[key] for key in self._keys]
+        self._fetched_groups = 0
+
+    def _removeEntry(self, key, rule):
+        position = bisect_left(self._keys, key)
+        group = self._groups[position]
+        row = next(
+            row for row, (entry_rule, _selector) in enumerate(group.entries)
+            if entry_rule is rule)
+        if row < group.fetched:
+            parent = self.index(position, 0)
+            self.beginRemoveRows(parent, row, row)
+            del group.entries[row]
+            group.fetched -= 1
+            self.endRemoveRows()
+        else:
+            del group.entries[row]
+        if group.entries:
+            self._emitGroupChanged(position)
+            return
+        if position < self._fetched_groups:
+            self.beginRemoveRows(QModelIndex(), position, position)
+            self._removeGroup(position)
+            self._fetched_groups -= 1
+            self.endRemoveRows()
+        else:
+            self._removeGroup(position)
+
+    def _insertEntry(self, key, rule, selector):
+        position = bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            group = _OutlineGroup(key)
+            # Fully fetched rows stay fully fetched, otherwise views wouldn't
+            # know about rows added at their end
+            if (position < self._fetched_groups or
+                    self._fetched_groups == len(self._groups)):
+                self.beginInsertRows(QModelIndex(), position, position)
+                self._insertGroup(position, group)
+                self._fetched_groups += 1
+                self.endInsertRows()
+            else:
+                self._insertGroup(position, group)
+        group = self._groups[position]
+
+        # Entries are sorted by rule offset
+        entries = group.entries
+        low, high = 0, len(entries)
+        while low < high:
+            middle = (low + high) // 2
+            if entries[middle][0].start <= rule.start:
+                low = middle + 1
+            else:
+                high = middle
+        row = low
+        if row < group.fetched or (
+                group.fetched == len(entries) and
+                position < self._fetched_groups):
+            self.beginInsertRows(self.index(position, 0), row, row)
+            entries.insert(row, (rule, selector))
+            group.fetched += 1
+            self.endInsertRows()
+        else:
+            entries.insert(row, (rule, selector))
+        self._emitGroupChanged(position)
+
+    def _insertGroup(self, position, group):
+        self._keys.insert(position, group.key)
+        self._groups.insert(position, group)
+
+    def _removeGroup(self, position):
+        del self._keys[position]
+        del self._groups[position]
+
+    def _emitGroupChanged(self, position):
+        """
+        Group text includes its number of selectors.
+        """
+        if position < self._fetched_groups:
+            index = self.index(position, 0)
+            self.dataChanged.emit(index, index)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, None)
+        return self.createIndex(row, column, self._groups[parent.row()])
+
+    def parent(self, index):
+        group = index.internalPointer() if index.isValid() else None
+        if group is None:
+            return QModelIndex()
+        return self.createIndex(bisect_left(self._keys, group.key), 0, None)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return self._fetched_groups
+        if parent.internalPointer() is not None:
+            return 0
+        return self._groups[parent.row()].fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self._groups)
+        return parent.internalPointer() is None
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return self._fetched_groups < len(self._groups)
+        if parent.internalPointer() is not None:
+            return False
+        group = self._groups[parent.row()]
+        return group.fetched < len(group.entries)
+
+    def fetchMore(self, parent):
+        if not parent.isValid():
+            first = self._fetched_groups
+            last = min(first + self.FETCH_SIZE, len(self._groups)) - 1
+            self.beginInsertRows(parent, first, last)
+            self._fetched_groups = last + 1
+            self.endInsertRows()
+            return
+        group = self._groups[parent.row()]
+        first = group.fetched
+        last = min(first + self.FETCH_SIZE, len(group.entries)) - 1
+        self.beginInsertRows(parent, first, last)
+        group.fetched = last + 1
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        group = index.internalPointer()
+        if group is None:
+            group = self._groups[index.row()]
+            return '{} ({})'.format(group.key, len(group.entries))
+        rule, selector = group.entries[index.row()]
+        if role == Qt.ToolTipRole:
+            return rule.selector
+        return selector
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Checks how long a style sheet takes to apply, to catch slow style sheets
+before they ship.
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+from PyQt5 import QtWidgets
+from PyQt5.QtWidgets import QApplication, QFrame, QGroupBox, QVBoxLayout, \
+    QWidget, qApp
+
+from ._qss import ParsedStyleSheet
+from ._validation import SEVERITY_ERROR, style_sheet_problems
+
+# Widget classes of gallery when none are given
+DEFAULT_GALLERY_CLASSES = [
+    'QLabel', 'QPushButton', 'QLineEdit', 'QCheckBox', 'QRadioButton',
+    'QComboBox', 'QSpinBox', 'QSlider', 'QProgressBar', 'QTreeWidget',
+]
+
+# Number of widgets in each group box of gallery
+_GROUP_SIZE = 20
+
+# Timings of a report, in the order they are shown
+TIMINGS = ['parse', 'validate', 'repolish']
+
+# Exit codes of `main`
+EXIT_OK = 0
+EXIT_THRESHOLD_EXCEEDED = 1
+EXIT_ERROR = 2
+
+
+def build_gallery(widget_count, class_names=None, depth=1):
+    """
+    Builds a widget tree to apply style sheets to: group boxes of widgets of
+    each class in turn, nested in frames so descendant selectors have
+    ancestors to walk.
+
+    :param int widget_count: number of widgets of given classes.
+    :param list(unicode)|None class_names: names of `QtWidgets` classes, by
+        default `DEFAULT_GALLERY_CLASSES`.
+    :param int depth: number of frames each group box is nested in.
+    :rtype: QWidget
+    :return: top level widget of gallery, not shown.
+    :raise ValueError: if a class name is not a `QtWidgets` widget class.
+    """
+    classes = []
+    for name in class_names or DEFAULT_GALLERY_CLASSES:
+        widget_class = getattr(QtWidgets, name, None)
+        if not (isinstance(widget_class, type) and
+                issubclass(widget_class, QWidget)):
+            raise ValueError('Unknown widget class: {}'.format(name))
+        classes.append(widget_class)
+
+    root = QWidget()
+    root.setObjectName('gallery')
+    root_layout = QVBoxLayout(root)
+    created = 0
+    group_index = 0
+    while created < widget_count:
+        parent = root
+        parent_layout = root_layout
+        for level in range(depth):
+            frame = QFrame(parent)
+            frame.setObjectName('frame{}'.format(level))
+            parent_layout.addWidget(frame)
+            parent = frame
+            parent_layout = QVBoxLayout(frame)
+        group = QGroupBox('Group {}'.format(group_index), parent)
+        parent_layout.addWidget(group)
+        group_layout = QVBoxLayout(group)
+        for _ in range(min(_GROUP_SIZE, widget_count - created)):
+            widget = classes[created % len(classes)](group)
+            widget.setObjectName('widget{}'.format(created))
+            group_layout.addWidget(widget)
+            created += 1
+        group_index += 1
+    return root
+
+
+def measure_style_sheet(style_sheet, repeat=3):
+    """
+    Measures a style sheet the way the inspector applies it: parses and
+    validates it, then applies it to the app with
+    `StyleSheetWidget.applyStyleSheet`. Style sheet is applied once before
+    timing, so timed applies repolish widgets already styled by it, like
+    applies from the inspector do, instead of taking the cheaper path Qt
+    takes when app has no style sheet.
+
+    :param unicode style_sheet: style sheet text.
+    :param int repeat: number of times each step is timed, the fastest time
+        is reported.
+    :rtype: dict
+    :return: report with style sheet `size` in chars, number of `rules`,
+        `errors` and `polished` app widgets, not counting the ones of the
+        `StyleSheetWidget` applying it, and seconds of each `TIMINGS` step
+        in `timings`. Style sheets with errors aren't applied, so their
+        report has no repolish timing.
+    """
+    from ._inspector import StyleSheetWidget
+
+    timings = {}
+
+    def timed(name, function):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        timings[name] = min(timings.get(name, elapsed), elapsed)
+        return result
+
+    for _ in range(repeat):
+        parsed = timed('parse', lambda: ParsedStyleSheet(style_sheet))
+        problems = timed('validate', lambda: style_sheet_problems(parsed))
+    errors = [
+        problem for problem in problems if problem.severity == SEVERITY_ERROR]
+    report = {
+        'size': len(style_sheet),
+        'rules': len(parsed.rules),
+        'errors': len(errors),
+        'polished': 0,
+        'timings': timings,
+    }
+    if errors:
+        return report
+
+    widget = StyleSheetWidget()
+    try:
+        widget.style_text_edit.setPlainText(style_sheet)
+        widget.applyStyleSheet(stateless=True)
+        for _ in range(repeat):
+            widget.applyStyleSheet(stateless=True)
+            metrics = widget.applyMetrics(1)[0]
+            timings['repolish'] = min(
+                timings.get('repolish', metrics.repolish_time),
+                metrics.repolish_time)
+        report['polished'] = (
+            metrics.polished_count - len(widget.findChildren(QWidget)) - 1)
+    finally:
+        qApp.setStyleSheet('')
+        widget.deleteLater()
+    return report
+
+
+def check_thresholds(report, baseline=None, max_slowdown=0.25,
+                     min_slowdown=0.005, max_growth=0.1, max_repolish=None,
+                     max_size=None):
+    """
+    :param dict report: as returned by `measure_style_sheet`.
+    :param dict|None baseline: a report to compare with, if any.
+    :param float max_slowdown: max fraction each timing may grow over its
+        baseline timing.
+    :param float min_slowdown: seconds a timing may always grow over its
+        baseline timing, so timer noise of fast steps isn't a failure.
+    :param float max_growth: max fraction style sheet size may grow over
+        baseline size.
+    :param float|None max_repolish: max seconds of repolish, if any.
+    :param int|None max_size: max style sheet size in chars, if any.
+    :rtype: list(unicode)
+    :return: description of each exceeded threshold.
+    """
+    failures = []
+    if report['errors']:
+        failures.append('Style sheet has {} errors'.format(report['errors']))
+    timings = report['timings']
+    if max_repolish is not None and timings.get('repolish', 0) > max_repolish:
+        failures.append('Repolish took {:.1f} ms, max is {:.1f} ms'.format(
+            timings['repolish'] * 1000, max_repolish * 1000))
+    if max_size is not None and report['size'] > max_size:
+        failures.append('Style sheet has {} chars, max is {}'.format(
+            report['size'], max_size))
+    if baseline is None:
+        return failures
+
+    for name in TIMINGS:
+        seconds = timings.get(name)
+        base = baseline['timings'].get(name)
+        if seconds is None or base is None:
+            continue
+        limit = max(base * (1 + max_slowdown), base + min_slowdown)
+        if seconds > limit:
+            failures.append(
+                '{} took {:.1f} ms, baseline is {:.1f} ms (+{:.0f}%)'.format(
+                    name.capitalize(), seconds * 1000, base * 1000,
+                    (seconds / base - 1) * 100 if base else float('inf')))
+    if report['size'] > baseline['size'] * (1 + max_growth):
+        failures.append(
+            'Style sheet has {} chars, baseline has {} (+{:.0f}%)'.format(
+                report['size'], baseline['size'],
+                (report['size'] / baseline['size'] - 1) * 100
+                if baseline['size'] else float('inf')))
+    return failures
+
+
+def format_report(report):
+    """
+    :param dict report: as returned by `measure_style_sheet`.
+    :rtype: unicode
+    :return: report as human readable lines.
+    """
+    lines = [
+        '{:.1f} KB, {} rules, {} errors, {} widgets polished'.format(
+            report['size'] / 1024, report['rules'], report['errors'],
+            report['polished']),
+    ]
+    for name in TIMINGS:
+        if name in report['timings']:
+            lines.append('{:>10}: {:.1f} ms'.format(
+                name, report['timings'][name] * 1000))
+    return '\n'.join(lines)
+
+
+def _read_json(path):
+    with io.open(path, encoding='utf-8') as json_file:
+        return json.load(json_file)
+
+
+def _write_json(path, data):
+    with io.open(path, 'w', encoding='utf-8') as json_file:
+        json_file.write(json.dumps(data, indent=2, sort_keys=True))
+
+
+def main(argv=None):
+    """
+    Command line entry point, see `--help`. Runs headless, using Qt
+    offscreen platform unless another one is set in `QT_QPA_PLATFORM`.
+
+    :param list(unicode)|None argv: command line arguments, without program
+        name, by default the ones of `sys.argv`.
+    :rtype: int
+    :return: one of `EXIT_*` codes.
+    """
+    parser = argparse.ArgumentParser(
+        prog='qss-perf-gate', description=__doc__.strip())
+    parser.add_argument('style_sheet', help='.qss file to check')
+    parser.add_argument(
+        '--widgets', type=int, default=1000,
+        help='number of widgets of gallery style sheet is applied to')
+    parser.add_argument(
+        '--classes', default=','.join(DEFAULT_GALLERY_CLASSES),
+        help='comma separated QtWidgets classes of gallery widgets')
+    parser.add_argument(
+        '--depth', type=int, default=1,
+        help='number of frames each group box of gallery is nested in')
+    parser.add_argument(
+        '--repeat', type=int, default=3,
+        help='times each step runs, fastest time is reported')
+    parser.add_argument('--baseline', help='JSON report to compare with')
+    parser.add_argument(
+        '--save-baseline', metavar='PATH',
+        help='write report as a baseline to PATH, thresholds are not checked')
+    parser.add_argument(
+        '--max-slowdown', type=float, default=25,
+        help='max percent each timing may grow over baseline')
+    parser.add_argument(
+        '--min-slowdown-ms', type=float, default=5,
+        help='milliseconds each timing may always grow over baseline')
+    parser.add_argument(
+        '--max-growth', type=float, default=10,
+        help='max percent style sheet size may grow over baseline')
+    parser.add_argument(
+        '--max-repolish-ms', type=float, help='max repolish milliseconds')
+    parser.add_argument(
+        '--max-size-kb', type=float, help='max style sheet size, in KB')
+    parser.add_argument('--output', help='JSON file to write report to')
+    options = parser.parse_args(argv)
+
+    try:
+        with io.open(options.style_sheet, encoding='utf-8') as qss_file:
+            style_sheet = qss_file.read()
+        baseline = None
+        if options.baseline and not options.save_baseline:
+            baseline = _read_json(options.baseline)
+    except (IOError, ValueError) as e:
+        print('Could not read input: {}'.format(e), file=sys.stderr)
+        return EXIT_ERROR
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    try:
+        gallery = build_gallery(
+            options.widgets, options.classes.split(','), options.depth)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return EXIT_ERROR
+    gallery.ensurePolished()
+    try:
+        report = measure_style_sheet(
+            style_sheet, options.repeat)
+    finally:
+        gallery.deleteLater()
+        app.processEvents()
+    report['widgets'] = options.widgets
+    print(format_report(report))
+
+    try:
+        if options.output:
+            _write_json(options.output, report)
+        if options.save_baseline:
+            _write_json(options.save_baseline, report)
+            return EXIT_OK
+    except IOError as e:
+        print('Could not write report: {}'.format(e), file=sys.stderr)
+        return EXIT_ERROR
+
+    failures = check_thresholds(
+        report,
+        baseline,
+        max_slowdown=options.max_slowdown / 100,
+        min_slowdown=options.min_slowdown_ms / 1000,
+        max_growth=options.max_growth / 100,
+        max_repolish=(
+            None if options.max_repolish_ms is None
+            else options.max_repolish_ms / 1000),
+        max_size=(
+            None if options.max_size_kb is None
+            else int(options.max_size_kb * 1024)),
+    )
+    for failure in failures:
+        print('FAILED: {}'.format(failure), file=sys.stderr)
+    return EXIT_THRESHOLD_EXCEEDED if failures else EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
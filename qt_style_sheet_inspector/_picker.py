@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import namedtuple
+
+from PyQt5.QtCore import QEvent, QObject, Qt, pyqtSignal
+from PyQt5.QtWidgets import QAbstractItemView, QDialog, QHeaderView, QLabel, \
+    QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout, qApp
+
+from ._census import widget_path
+from ._selectors import parse_selector, selector_matches, widget_class_names
+
+# Names of Qt properties of widget classes
+_meta_property_names = {}
+
+RuleMatch = namedtuple('RuleMatch', [
+    # Matching rule, a `Rule`
+    'rule',
+    # Selector of rule group that matched with highest specificity
+    'selector',
+    # Specificity of selector, see `Selector.specificity`
+    'specificity',
+])
+
+
+def _property_names(widget):
+    """
+    :param QWidget widget: a widget.
+    :rtype: list(unicode)
+    :return: names of Qt and dynamic properties of widget.
+    """
+    names = _meta_property_names.get(type(widget))
+    if names is None:
+        meta_object = widget.metaObject()
+        names = _meta_property_names[type(widget)] = [
+            meta_object.property(index).name()
+            for index in range(meta_object.propertyCount())]
+    return names + [
+        bytes(name).decode('utf-8') for name in widget.dynamicPropertyNames()]
+
+
+class _IndexedSelector(object):
+    """
+    A distinct selector text of indexed rules.
+    """
+
+    __slots__ = ('selector', 'bucket', 'rules')
+
+    def __init__(self, selector, bucket):
+        # Parsed selector
+        self.selector = selector
+        # Index bucket selector is in, a dict of selector texts
+        self.bucket = bucket
+        # Rules with selector in their group, in no particular order
+        self.rules = set()
+
+
+class SelectorIndex(object):
+    """
+    Index of the rules of a style sheet by what the subjects of their
+    selectors require from a widget: its object name, a property or a class
+    name. Each distinct selector text is in the bucket of its most
+    selective requirement, so looking up the rules of a widget only matches
+    selectors of the buckets of its object name, class names and properties,
+    plus the universal ones, each distinct selector once.
+
+    Rules are indexed by identity: `update` only parses selectors of rules it
+    hasn't indexed yet, and `ParsedStyleSheet` keeps rules that weren't
+    edited, so updating after an edit is cheap.
+    """
+
+    def __init__(self):
+        # Indexed rules to their selector texts
+        self._rules = {}
+        # Selector text to `_IndexedSelector`
+        self._selectors = {}
+        # Buckets, each a dict of selector texts
+        self._by_object_name = {}
+        self._by_class = {}
+        self._by_property = {}
+        self._universal = {}
+        # Rules with a selector that can't be parsed, like ones with template
+        # variables
+        self.unparsed_rules = set()
+
+    def __len__(self):
+        """
+        :rtype: int
+        :return: number of indexed rules.
+        """
+        return len(self._rules)
+
+    def update(self, rules):
+        """
+        Indexes rules of a style sheet, replacing previously indexed ones.
+
+        :param list(Rule) rules: rules of style sheet.
+        :rtype: tuple(int, int)
+        :return: number of rules added and removed from index.
+        """
+        current = set(rules)
+        removed = [rule for rule in self._rules if rule not in current]
+        for rule in removed:
+            for text in self._rules.pop(rule):
+                indexed = self._selectors.get(text)
+                if indexed is None:
+                    # Selector repeated in rule group, already removed
+                    continue
+                indexed.rules.discard(rule)
+                if not indexed.rules:
+                    del self._selectors[text]
+                    del indexed.bucket[text]
+            self.unparsed_rules.discard(rule)
+        added = 0
+        for rule in rules:
+            if rule in self._rules:
+                continue
+            added += 1
+            texts = self._rules[rule] = []
+            for text in rule.selectors():
+                indexed = self._selectors.get(text)
+                if indexed is None:
+                    try:
+                        selector = parse_selector(text)
+                    except ValueError:
+                        self.unparsed_rules.add(rule)
+                        continue
+                    bucket = self._bucketOf(selector.subject)
+                    bucket[text] = True
+                    indexed = self._selectors[text] = _IndexedSelector(
+                        selector, bucket)
+                indexed.rules.add(rule)
+                texts.append(text)
+        return added, len(removed)
+
+    def _bucketOf(self, compound):
+        """
+        :param CompoundSelector compound: subject of a selector.
+        :rtype: dict
+        :return: bucket of compound most selective requirement.
+        """
+        if compound.object_name is not None:
+            return self._by_object_name.setdefault(compound.object_name, {})
+        # Few widgets have a given property, while style sheets often have
+        # many `QPushButton[role="..."]` like selectors
+        if compound.attributes:
+            return self._by_property.setdefault(compound.attributes[0][0], {})
+        for name in (compound.exact_class, compound.type_name):
+            if name not in (None, '*'):
+                return self._by_class.setdefault(name, {})
+        return self._universal
+
+    def matches(self, widget):
+        """
+        :param QWidget widget: a widget.
+        :rtype: list(RuleMatch)
+        :return: indexed rules whose selectors can match widget, ignoring
+            pseudo states it can never be in, in cascade order: the rule
+            that wins conflicts first, like Qt sorts them, by specificity and
+            then by position in style sheet.
+        """
+        class_names = widget_class_names(widget)
+        texts = set(self._universal)
+        texts.update(self._by_object_name.get(widget.objectName(), ()))
+        for name in class_names:
+            texts.update(self._by_class.get(name, ()))
+        for name in _property_names(widget):
+            texts.update(self._by_property.get(name, ()))
+
+        best = {}
+        for text in texts:
+            indexed = self._selectors[text]
+            if not selector_matches(
+                    indexed.selector, widget, class_names,
+                    pseudo_states=True):
+                continue
+            specificity = indexed.selector.specificity()
+            for rule in indexed.rules:
+                match = best.get(rule)
+                if (match is None or match.specificity < specificity or
+                        match.specificity == specificity and
+                        self._firstOf(rule, text, match.selector)):
+                    best[rule] = RuleMatch(rule, text, specificity)
+        return sorted(
+            best.values(),
+            key=lambda match: (match.specificity, match.rule.start),
+            reverse=True)
+
+    def _firstOf(self, rule, text, other):
+        """
+        :rtype: bool
+        :return: if selector text comes before other in rule group, so ties
+            of specificity always show the same selector.
+        """
+        texts = self._rules[rule]
+        return texts.index(text) < texts.index(other)
+
+
+class WidgetPicker(QObject):
+    """
+    Picks the next widget clicked in the app, except in excluded windows
+    like the inspector, through an application wide event filter. The click
+    is not delivered to the picked widget. Escape cancels picking.
+    """
+
+    # Emitted with picked widget
+    picked = pyqtSignal(object)
+    # Emitted when picking ends, whether a widget was picked or not
+    finished = pyqtSignal()
+
+    _MOUSE_EVENT_TYPES = frozenset([
+        QEvent.MouseButtonPress, QEvent.MouseButtonRelease,
+        QEvent.MouseButtonDblClick,
+    ])
+
+    def __init__(self, excluded=None, parent=None):
+        """
+        :param list(QWidget)|None excluded: windows whose widgets can't be
+            picked, clicks on them are delivered as usual.
+        :param QObject parent: parent object.
+        """
+        QObject.__init__(self, parent)
+        self.excluded = list(excluded or [])
+        self._active = False
+        # Release of picking click is swallowed too, after picking ends
+        self._swallow_release = False
+
+    def start(self):
+        """
+        Starts picking, until a widget is clicked or `stop` is called.
+        """
+        if not self._active:
+            self._active = True
+            qApp.installEventFilter(self)
+            qApp.setOverrideCursor(Qt.CrossCursor)
+
+    def stop(self):
+        """
+        Stops picking.
+        """
+        if self._active:
+            self._active = False
+            qApp.restoreOverrideCursor()
+            if not self._swallow_release:
+                qApp.removeEventFilter(self)
+            self.finished.emit()
+
+    def isActive(self):
+        """
+        :rtype: bool
+        """
+        return self._active
+
+    def isExcluded(self, widget):
+        """
+        :param QWidget widget: a widget.
+        :rtype: bool
+        :return: if widget is in an excluded window.
+        """
+        window = widget.window()
+        while window is not None:
+            if window in self.excluded:
+                return True
+            # Dialogs of excluded windows are excluded too
+            parent = window.parentWidget()
+            window = parent.window() if parent is not None else None
+        return False
+
+    def eventFilter(self, watched, event):
+        """
+        Picks the widget under mouse on first press out of excluded windows.
+        """
+        event_type = event.type()
+        if event_type == QEvent.KeyPress and self._active:
+            if event.key() == Qt.Key_Escape:
+                self.stop()
+                return True
+            return False
+        if (event_type not in self._MOUSE_EVENT_TYPES or
+                not watched.isWidgetType()):
+            return False
+        if self._swallow_release:
+            if event_type == QEvent.MouseButtonRelease:
+                self._swallow_release = False
+                if not self._active:
+                    qApp.removeEventFilter(self)
+            return True
+        if not self._active or event_type != QEvent.MouseButtonPress:
+            return False
+        # Disabled widgets don't get mouse events, their parents do
+        widget = qApp.widgetAt(event.globalPos()) or watched
+        if self.isExcluded(widget):
+            return False
+        self._swallow_release = True
+        self.stop()
+        self.picked.emit(widget)
+        return True
+
+
+class PickedRulesDialog(QDialog):
+    """
+    Lists rules matching picked widgets, in cascade order. Pick button emits
+    `pickRequested`, double clicking a rule emits `ruleActivated` with its
+    offsets in style sheet text, unless it was edited since applied.
+    """
+
+    ruleActivated = pyqtSignal(int, int)
+    pickRequested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        """
+        :param QWidget parent: parent widget.
+        """
+        QDialog.__init__(self, parent)
+        self.setWindowTitle('Picked Widget Rules')
+        self.widget = None
+        self.matches = []
+        self.lines = []
+
+        self.widget_label = QLabel(
+            'Click a widget of the app to list its rules', self)
+        self.widget_label.setWordWrap(True)
+        self.pick_button = QPushButton('Pick Widget', self)
+        self.pick_button.clicked.connect(self.pickRequested)
+
+        self.table = QTableWidget(0, 3, self)
+        self.table.setHorizontalHeaderLabels(
+            ['Selector', 'Specificity', 'Line'])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.Stretch)
+        self.table.cellDoubleClicked.connect(self.onCellDoubleClicked)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.widget_label)
+        layout.addWidget(self.table)
+        layout.addWidget(self.pick_button)
+        self.setLayout(layout)
+        self.resize(600, 400)
+
+    def setMatches(self, widget, matches, lines):
+        """
+        Shows rules matching a widget.
+
+        :param QWidget widget: picked widget.
+        :param list(RuleMatch) matches: rules matching widget, see
+            `SelectorIndex.matches`.
+        :param list(int|None) lines: line of each rule in style sheet text,
+            `None` for rules edited since applied.
+        """
+        self.widget = widget
+        self.matches = matches
+        self.lines = lines
+        text = '{}: {} rules, first one wins conflicts'.format(
+            widget_path(widget), len(matches))
+        if widget.styleSheet():
+            text += ' (widget has its own style sheet, which wins over them)'
+        self.widget_label.setText(text)
+        self.table.setRowCount(len(matches))
+        for row, (match, line) in enumerate(zip(matches, lines)):
+            self.table.setItem(row, 0, QTableWidgetItem(match.selector))
+            self.table.setItem(row, 1, QTableWidgetItem(
+                '{},{},{}'.format(*match.specificity)))
+            line_item = QTableWidgetItem(
+                'edited' if line is None else '{}'.format(line))
+            line_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.table.setItem(row, 2, line_item)
+
+    def onCellDoubleClicked(self, row, column):
+        """
+        Emits `ruleActivated` for the rule in clicked row.
+        """
+        if self.lines[row] is not None:
+            rule = self.matches[row].rule
+            self.ruleActivated.emit(rule.start, rule.end)
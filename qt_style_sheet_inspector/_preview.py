@@ -0,0 +1,966 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import importlib
+import os
+import struct
+import sys
+from collections import namedtuple
+
+from PyQt5 import sip
+from PyQt5.QtCore import QByteArray, QDataStream, QIODevice, QObject, \
+    QPoint, QProcess, QProcessEnvironment, QRect, QRectF, Qt, QTimer, \
+    pyqtSignal
+from PyQt5.QtGui import QImage, QPainter, QPixmap, QRegion
+from PyQt5.QtWidgets import QAbstractItemView, QApplication, QComboBox, \
+    QDialog, QHBoxLayout, QHeaderView, QLabel, QPushButton, QScrollArea, \
+    QStyle, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget, qApp
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    # NumPy is optional, without it images are compared by Qt and only tell
+    # if a widget changed, not how many of its pixels did
+    numpy = None
+
+# Widget properties not copied to clones: geometry is copied on its own, and
+# window properties don't apply to child widgets
+_SKIPPED_PROPERTIES = frozenset([
+    'objectName', 'geometry', 'frameGeometry', 'normalGeometry', 'pos',
+    'size', 'rect', 'childrenRect', 'childrenRegion', 'visible', 'x', 'y',
+    'width', 'height', 'font', 'palette', 'windowTitle', 'windowIcon',
+    'windowIconText', 'windowModality', 'windowModified', 'windowOpacity',
+    'windowFilePath', 'windowFlags', 'modal', 'sizeGripEnabled',
+])
+
+# Types of property values copied to clones besides Qt ones, values of other
+# Python types may not be readable in preview process
+_PLAIN_TYPES = (bool, int, float, type(''), bytes)
+
+# Classes of clones by `(module, class names)` of widgets, see
+# `_widget_class`
+_mirror_classes = {}
+# Names of properties copied to clones, by widget class
+_copied_properties_cache = {}
+
+# Messages of preview process are a header with payload size followed by a
+# `QVariantList` payload written by `QDataStream`:
+# * `['widgets', indices, rects, tile count]`: index in subtree snapshot and
+#   visible rect of each visible widget, in tree order.
+# * `['tile', indices, counts]`: changed pixels of visible widgets that
+#   changed in a tile, by index in visible widgets. Without NumPy, counts are
+#   1 for widgets seen changed for the first time.
+# * `['image', image]`: subtree with candidate style sheet, scaled down.
+_HEADER = struct.Struct('>I')
+MESSAGE_WIDGETS = 'widgets'
+MESSAGE_TILE = 'tile'
+MESSAGE_IMAGE = 'image'
+
+WidgetDiff = namedtuple('WidgetDiff', [
+    # Widget of previewed subtree
+    'widget',
+    # Visible rect of widget, relative to subtree root
+    'rect',
+    # Number of pixels of rect that changed, `None` if unknown because NumPy
+    # is not available
+    'changed_pixels',
+])
+
+PreviewResult = namedtuple('PreviewResult', [
+    # `WidgetDiff` of each visible widget that changed, in tree order
+    'diffs',
+    # Number of visible widgets compared
+    'widget_count',
+    # Number of changed pixels, `None` if unknown
+    'changed_pixels',
+    # Size of subtree root
+    'size',
+    # Subtree with candidate style sheet, changed pixels tinted, scaled down
+    # to at most `SandboxPreview.image_width` pixels wide
+    'image',
+])
+
+WidgetSnapshot = namedtuple('WidgetSnapshot', [
+    # Index of parent snapshot in subtree snapshot, -1 for root
+    'parent',
+    # Module of the Qt class of widget
+    'module',
+    # Names of the Qt class of widget and of its Python subclasses down to
+    # widget class
+    'class_names',
+    # Class name of widget meta object
+    'meta_class_name',
+    'object_name',
+    # If widget is an internal child Qt widgets create themselves, like
+    # viewports of scroll areas
+    'internal',
+    'geometry',
+    'hidden',
+    # `[name, value]` of stored and dynamic properties
+    'properties',
+    # Font and palette set on widget, `None` if inherited
+    'font',
+    'palette',
+])
+
+
+class PreviewError(RuntimeError):
+    """
+    Raised when preview process fails.
+    """
+
+
+def _class_names(widget_class):
+    """
+    :param type widget_class: a widget class.
+    :rtype: tuple(unicode, tuple(unicode))
+    :return: module of the Qt class widget class is or derives from, and
+        names of that class and of its subclasses down to widget class.
+    """
+    names = []
+    while not widget_class.__module__.startswith('PyQt5.'):
+        names.append(widget_class.__name__)
+        widget_class = next(
+            base for base in widget_class.__mro__[1:]
+            if issubclass(base, QWidget))
+    names.append(widget_class.__name__)
+    return widget_class.__module__, tuple(reversed(names))
+
+
+def _widget_class(snapshot):
+    """
+    :param WidgetSnapshot snapshot: snapshot of a widget.
+    :rtype: type
+    :return: a widget class that can be constructed with only a parent,
+        with the same Qt class names as the widget class, so type selectors
+        match it alike. Python subclasses are mirrored by empty classes, so
+        their constructors, which may need arguments or have side effects,
+        aren't called.
+    """
+    key = (snapshot.module, snapshot.class_names)
+    widget_class = _mirror_classes.get(key)
+    if widget_class is None:
+        try:
+            widget_class = getattr(
+                importlib.import_module(snapshot.module),
+                snapshot.class_names[0])
+        except (ImportError, AttributeError):
+            widget_class = QWidget
+        for name in snapshot.class_names[1:]:
+            widget_class = type(str(name), (widget_class,), {})
+        _mirror_classes[key] = widget_class
+    return widget_class
+
+
+def _copied_properties(widget):
+    """
+    :rtype: list(unicode)
+    :return: names of properties copied from widget to its clone, the stored
+        and writable ones.
+    """
+    names = _copied_properties_cache.get(type(widget))
+    if names is None:
+        meta_object = widget.metaObject()
+        names = []
+        for index in range(meta_object.propertyCount()):
+            meta_property = meta_object.property(index)
+            name = meta_property.name()
+            if (name not in _SKIPPED_PROPERTIES and
+                    meta_property.isWritable() and
+                    meta_property.isStored()):
+                names.append(name)
+        _copied_properties_cache[type(widget)] = names
+    return names
+
+
+def _copied_value(value):
+    """
+    :rtype: bool
+    :return: if a property value is copied to clones.
+    """
+    # Setting null values can reset other properties, like a null pixmap
+    # clears label text
+    if value is None or (hasattr(value, 'isNull') and value.isNull()):
+        return False
+    return (isinstance(value, _PLAIN_TYPES) or
+            type(value).__module__.startswith('PyQt5.'))
+
+
+def _snapshot_widget(widget, parent=-1):
+    """
+    Takes what style sheets can match or show from a widget: class names,
+    object name, stored properties, dynamic properties and geometry.
+
+    :param QWidget widget: a widget.
+    :param int parent: index of parent snapshot, -1 for subtree root, which
+        is moved to origin and shown.
+    :rtype: WidgetSnapshot
+    """
+    properties = []
+    for name in _copied_properties(widget):
+        value = widget.property(name)
+        if _copied_value(value):
+            properties.append([name, value])
+    for name in widget.dynamicPropertyNames():
+        name = bytes(name).decode('utf-8')
+        # Qt keeps state of style sheets in internal properties
+        if name.startswith('_q_'):
+            continue
+        value = widget.property(name)
+        if _copied_value(value):
+            properties.append([name, value])
+    module, class_names = _class_names(type(widget))
+    root = parent < 0
+    # Style sheets set palette and font of widgets they style, and they are
+    # the ones compared
+    styled = widget.testAttribute(Qt.WA_StyleSheetTarget)
+    return WidgetSnapshot(
+        parent=parent,
+        module=module,
+        class_names=class_names,
+        meta_class_name=widget.metaObject().className(),
+        object_name=widget.objectName(),
+        internal=not root and widget.objectName().startswith('qt_'),
+        geometry=QRect(QPoint(), widget.size()) if root else
+        widget.geometry(),
+        hidden=not root and widget.isHidden(),
+        properties=properties,
+        font=(widget.font() if widget.testAttribute(Qt.WA_SetFont) and
+              not styled else None),
+        palette=(widget.palette() if widget.testAttribute(Qt.WA_SetPalette) and
+                 not styled else None),
+    )
+
+
+def iter_widget_tree(widget):
+    """
+    Walks a widget subtree, windows in it, like popups, are left out.
+
+    Children of a widget are listed when it is reached, so the subtree can
+    change between steps of the walk: widgets deleted before being reached
+    are skipped.
+
+    :param QWidget widget: root of subtree.
+    :rtype: iterator(tuple(QWidget, WidgetSnapshot))
+    :return: each widget of subtree with its snapshot, see
+        `_snapshot_widget`, in tree order.
+    """
+    pending = [(widget, -1)]
+    index = 0
+    while pending:
+        original, parent = pending.pop()
+        if sip.isdeleted(original):
+            continue
+        snapshot = _snapshot_widget(original, parent)
+        pending.extend(reversed([
+            (child, index) for child in original.children()
+            if isinstance(child, QWidget) and not child.isWindow()]))
+        yield original, snapshot
+        index += 1
+
+
+def _create_clone(snapshot, parent):
+    """
+    :rtype: QWidget
+    :return: a widget like the snapshot one, without its children.
+    """
+    widget_class = _widget_class(snapshot)
+    try:
+        clone = widget_class(parent)
+    except TypeError:
+        # Qt classes whose constructors need more arguments are mirrored by
+        # a plain widget with the same class name
+        name = str(snapshot.meta_class_name)
+        widget_class = _mirror_classes.get(name)
+        if widget_class is None:
+            widget_class = _mirror_classes[name] = type(name, (QWidget,), {})
+        clone = widget_class(parent)
+    clone.setObjectName(snapshot.object_name)
+    for name, value in snapshot.properties:
+        if clone.property(name) != value:
+            clone.setProperty(name, value)
+    if snapshot.font is not None:
+        clone.setFont(snapshot.font)
+    if snapshot.palette is not None:
+        clone.setPalette(snapshot.palette)
+    return clone
+
+
+def build_widget_tree(snapshots, parent):
+    """
+    Builds clones of a subtree snapshot. Internal children aren't created
+    again but their geometry is copied.
+
+    Clones have no layouts, they keep the geometry of original widgets.
+
+    :param list(WidgetSnapshot) snapshots: subtree snapshot, in tree order,
+        see `iter_widget_tree`.
+    :param QWidget parent: parent of root clone.
+    :rtype: list(QWidget|None)
+    :return: clone of each snapshot, `None` for internal children their
+        parent clone doesn't have and their descendants.
+    """
+    clones = []
+    for snapshot in snapshots:
+        clone_parent = (
+            parent if snapshot.parent < 0 else clones[snapshot.parent])
+        clone = None
+        if clone_parent is not None:
+            if snapshot.internal:
+                clone = clone_parent.findChild(
+                    QWidget, snapshot.object_name, Qt.FindDirectChildrenOnly)
+            else:
+                clone = _create_clone(snapshot, clone_parent)
+        if clone is not None:
+            clone.setGeometry(snapshot.geometry)
+            clone.setVisible(not snapshot.hidden)
+        clones.append(clone)
+    return clones
+
+
+def clone_widget_tree(widget, parent):
+    """
+    Copies a widget subtree in this process, see `iter_widget_tree` and
+    `build_widget_tree`.
+
+    :param QWidget widget: root of subtree.
+    :param QWidget parent: parent of root clone.
+    :rtype: list(tuple(QWidget, QWidget))
+    :return: each widget of subtree with its clone, in tree order.
+    """
+    originals, snapshots = zip(*iter_widget_tree(widget))
+    return [
+        (original, clone) for original, clone in zip(
+            originals, build_widget_tree(snapshots, parent))
+        if clone is not None]
+
+
+def _write_snapshot(stream, snapshot):
+    """
+    :param QDataStream stream: stream to write to.
+    :param WidgetSnapshot snapshot: snapshot of a widget.
+    """
+    stream.writeQVariant(
+        list(snapshot[:2]) + [list(snapshot.class_names)] + list(snapshot[3:]))
+
+
+def _read_snapshot(stream):
+    """
+    :param QDataStream stream: stream written by `_write_snapshot`.
+    :rtype: WidgetSnapshot
+    """
+    snapshot = WidgetSnapshot(*stream.readQVariant())
+    return snapshot._replace(class_names=tuple(snapshot.class_names))
+
+
+def _inherited_style_sheet(widget):
+    """
+    :rtype: unicode
+    :return: style sheets of ancestors of widget, outermost first, which
+        apply to widget too.
+    """
+    style_sheets = []
+    parent = widget.parentWidget()
+    while parent is not None:
+        if parent.styleSheet():
+            style_sheets.append(parent.styleSheet())
+        parent = parent.parentWidget()
+    return '\n'.join(reversed(style_sheets))
+
+
+def _style_name(style):
+    """
+    :rtype: unicode
+    :return: name of app style, to create it with `QStyleFactory`.
+    """
+    if not style.objectName():
+        # Style sheets wrap app style in a style that owns it
+        base = style.findChild(QStyle)
+        if base is not None:
+            return base.objectName()
+    return style.objectName()
+
+
+class _Sandbox(object):
+    """
+    Hidden copy of a widget subtree, with a style sheet that acts as app
+    style sheet for it, in preview process where app has no style sheet.
+    """
+
+    def __init__(self, snapshots, style_sheet, inherited_style_sheet):
+        size = snapshots[0].geometry.size()
+        self.container = QWidget()
+        self.container.setAttribute(Qt.WA_DontShowOnScreen)
+        self.container.setStyleSheet(style_sheet)
+        # Style sheets of ancestors win over app style sheet, like in the
+        # app
+        holder = QWidget(self.container)
+        holder.setStyleSheet(inherited_style_sheet)
+        self.snapshots = snapshots
+        self.clones = build_widget_tree(snapshots, holder)
+        holder.resize(size)
+        self.container.resize(size)
+        self.container.show()
+
+    def render(self, rect):
+        """
+        :param QRect rect: rect of subtree.
+        :rtype: QImage
+        :return: rect of subtree rendered, one pixel per device independent
+            pixel.
+        """
+        image = QImage(rect.size(), QImage.Format_RGB32)
+        image.fill(Qt.black)
+        self.container.render(image, QPoint(), QRegion(rect))
+        return image
+
+    def visibleRects(self):
+        """
+        :rtype: list(tuple(int, QRect))
+        :return: index in subtree snapshot of widgets visible in sandbox,
+            with the visible part of their rect, clipped by ancestors.
+        """
+        # Root parent is a holder at container origin
+        root = self.clones[0]
+        clips = {root.parentWidget(): self.container.rect()}
+        rects = []
+        for index, clone in enumerate(self.clones):
+            if clone is None:
+                continue
+            # Parents come first, hidden ones have no clip
+            parent_clip = clips.get(clone.parentWidget())
+            if parent_clip is None or clone.isHidden():
+                continue
+            rect = QRect(
+                clone.mapTo(self.container, QPoint()), clone.size()
+            ).intersected(parent_clip)
+            clips[clone] = rect
+            if not rect.isEmpty():
+                rects.append((index, rect))
+        return rects
+
+
+def _image_array(image):
+    """
+    :param QImage image: a `Format_RGB32` image.
+    :rtype: numpy.ndarray
+    :return: copy of image pixels, one `uint32` per pixel.
+    """
+    bits = image.constBits()
+    bits.setsize(image.byteCount())
+    return numpy.frombuffer(bits, numpy.uint32).reshape(
+        image.height(), image.bytesPerLine() // 4)[:, :image.width()].copy()
+
+
+def rect_corners(rects):
+    """
+    :param list(QRect) rects: rects.
+    :rtype: numpy.ndarray
+    :return: left, top, right and bottom edge of each rect, one row per
+        rect, edges are exclusive on the right and bottom.
+    """
+    return numpy.array(
+        [(rect.left(), rect.top(), rect.right() + 1, rect.bottom() + 1)
+         for rect in rects], dtype=numpy.int64).reshape(-1, 4)
+
+
+def count_changed_pixels(before, after, corners):
+    """
+    Compares two images of the same size with NumPy.
+
+    :param QImage before: a `Format_RGB32` image.
+    :param QImage after: a `Format_RGB32` image of the same size.
+    :param numpy.ndarray corners: rects to count changed pixels in, relative
+        to images, as returned by `rect_corners`. Rects may go past images.
+    :rtype: tuple(numpy.ndarray, QImage)
+    :return: number of changed pixels in each rect, and `after` with changed
+        pixels tinted.
+    """
+    after_array = _image_array(after)
+    mask = _image_array(before) != after_array
+    if not mask.any():
+        return numpy.zeros(len(corners), dtype=numpy.int64), after
+
+    # Summed area table of changed pixels, so changed pixels of each rect
+    # are counted from its 4 corners
+    table = numpy.zeros(
+        (mask.shape[0] + 1, mask.shape[1] + 1), dtype=numpy.int64)
+    numpy.cumsum(mask, axis=0, out=table[1:, 1:])
+    numpy.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    x0, x1 = (numpy.clip(corners[:, i], 0, mask.shape[1]) for i in (0, 2))
+    y0, y1 = (numpy.clip(corners[:, i], 0, mask.shape[0]) for i in (1, 3))
+    counts = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+    # Blends changed pixels with red
+    tinted = numpy.where(
+        mask, (after_array & 0xfefefe) // 2 + 0xff7f0000, after_array)
+    tinted = tinted.astype(numpy.uint32)
+    image = QImage(
+        tinted.tobytes(), tinted.shape[1], tinted.shape[0],
+        tinted.shape[1] * 4, QImage.Format_RGB32).copy()
+    return counts, image
+
+
+def _encode(message):
+    """
+    :param list message: a preview process message.
+    :rtype: bytes
+    :return: message framed to be written to a pipe.
+    """
+    data = QByteArray()
+    QDataStream(data, QIODevice.WriteOnly).writeQVariant(message)
+    return _HEADER.pack(data.size()) + bytes(data)
+
+
+def render_preview(settings, snapshots, send):
+    """
+    Renders a subtree snapshot with app style sheet and with candidate style
+    sheet and compares them, in tiles. Runs in preview process, see
+    `SandboxPreview`.
+
+    :param dict settings: `baseline` and `candidate` style sheets,
+        `inherited` style sheets of subtree ancestors, app `style` name,
+        `font` and `palette`, `tile_height`, `image_width` and if pixels
+        are counted (`count_pixels`).
+    :param list(WidgetSnapshot) snapshots: subtree snapshot.
+    :param callable send: called with each message.
+    """
+    if settings['style']:
+        QApplication.setStyle(settings['style'])
+    QApplication.setFont(settings['font'])
+    QApplication.setPalette(settings['palette'])
+    before = _Sandbox(
+        snapshots, settings['baseline'], settings['inherited'])
+    after = _Sandbox(
+        snapshots, settings['candidate'], settings['inherited'])
+    visible = before.visibleRects()
+    rects = [rect for _index, rect in visible]
+    size = snapshots[0].geometry.size()
+    tile_height = settings['tile_height']
+    tile_count = max(1, -(-size.height() // tile_height))
+    send([MESSAGE_WIDGETS, [index for index, _rect in visible], rects,
+          tile_count])
+
+    count_pixels = settings['count_pixels'] and numpy is not None
+    if count_pixels:
+        corners = rect_corners(rects)
+    else:
+        changed = [False] * len(rects)
+    scale = min(1.0, settings['image_width'] / max(1, size.width()))
+    image = QImage(
+        max(1, int(size.width() * scale)),
+        max(1, int(size.height() * scale)), QImage.Format_RGB32)
+    image.fill(Qt.black)
+    for tile_index in range(tile_count):
+        top = tile_index * tile_height
+        tile = QRect(
+            0, top, size.width(), min(tile_height, size.height() - top))
+        indices = []
+        counts = []
+        if not tile.isEmpty():
+            before_tile = before.render(tile)
+            after_tile = after.render(tile)
+            if count_pixels:
+                tile_counts, after_tile = count_changed_pixels(
+                    before_tile, after_tile, corners - (0, top, 0, top))
+                indices = numpy.flatnonzero(tile_counts).tolist()
+                counts = tile_counts[indices].tolist()
+            else:
+                for index, rect in enumerate(rects):
+                    if changed[index] or not rect.intersects(tile):
+                        continue
+                    rect = rect.intersected(tile).translated(0, -top)
+                    if before_tile.copy(rect) != after_tile.copy(rect):
+                        changed[index] = True
+                        indices.append(index)
+                        counts.append(1)
+            painter = QPainter(image)
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            painter.drawImage(QRectF(
+                0, top * scale, tile.width() * scale, tile.height() * scale),
+                after_tile)
+            painter.end()
+        send([MESSAGE_TILE, indices, counts])
+    send([MESSAGE_IMAGE, image])
+
+
+def main():
+    """
+    Entry point of preview process: reads settings and subtree snapshot
+    written by `SandboxPreview` from stdin and writes messages to stdout,
+    see `render_preview`.
+
+    :rtype: int
+    :return: exit code.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    stream = QDataStream(QByteArray(
+        getattr(sys.stdin, 'buffer', sys.stdin).read()))
+    settings = stream.readQVariant()
+    snapshots = [_read_snapshot(stream) for _ in range(stream.readInt32())]
+    output = getattr(sys.stdout, 'buffer', sys.stdout)
+
+    def send(message):
+        output.write(_encode(message))
+        output.flush()
+
+    render_preview(settings, snapshots, send)
+    del app
+    return 0
+
+
+class SandboxPreview(QObject):
+    """
+    Previews a candidate style sheet on a widget subtree without touching
+    the live app: the subtree is copied twice into hidden sandboxes, one
+    with app style sheet and the other with the candidate style sheet in
+    its place, and both are rendered and compared pixel by pixel.
+
+    Qt applies app style sheet to every widget of a process, so sandboxes
+    are built in a preview process of their own, whose app has no style
+    sheet, from a snapshot of the subtree: class names, properties and
+    geometry of its widgets, and app style, font and palette. Rules the
+    candidate drops don't show in its sandbox, but images only found in Qt
+    resources of the app don't show in either. Clones keep the geometry of
+    the original widgets, so preview shows how widgets look, not how layouts
+    move.
+
+    When started with `start`, the snapshot is taken `batch_size` widgets
+    per event loop iteration and the preview process renders subtrees in
+    tiles of `tile_height` pixels, so large subtrees never hold more than a
+    tile of each sandbox in memory nor block the app.
+    """
+
+    # Emitted with number of rendered and total tiles
+    progress = pyqtSignal(int, int)
+    # Emitted with `PreviewResult` once all tiles are compared
+    finished = pyqtSignal(object)
+    # Emitted with error message when preview process fails
+    failed = pyqtSignal(str)
+
+    def __init__(self, widget, style_sheet, parent=None):
+        """
+        :param QWidget widget: root of subtree to preview.
+        :param unicode style_sheet: candidate app style sheet.
+        :param QObject parent: parent object.
+        """
+        QObject.__init__(self, parent)
+        self.widget = widget
+        self.style_sheet = style_sheet
+        self.batch_size = 200
+        self.tile_height = 256
+        self.image_width = 800
+        self.result = None
+        self.error = None
+        self._walk = None
+        self._process = None
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._snapshotNextWidgets)
+
+    def start(self):
+        """
+        Starts taking subtree snapshot in event loop iterations and then
+        preview process, `finished` or `failed` is emitted when done.
+        """
+        self._setUp()
+        self._timer.start(0)
+
+    def run(self):
+        """
+        Takes subtree snapshot and waits for preview process right away.
+
+        :rtype: PreviewResult
+        :raise PreviewError: if preview process fails.
+        """
+        self._setUp()
+        while self._walk is not None:
+            self._snapshotNextWidgets()
+        while self._process is not None:
+            process = self._process
+            if not (process.waitForReadyRead(-1) or
+                    process.waitForFinished(-1)):
+                self._onProcessDone(process)
+        if self.result is None:
+            raise PreviewError(self.error)
+        return self.result
+
+    def cancel(self):
+        """
+        Stops preview, `finished` isn't emitted.
+        """
+        self._tearDown()
+
+    def isRunning(self):
+        """
+        :rtype: bool
+        """
+        return self._walk is not None or self._process is not None
+
+    def _setUp(self):
+        self.cancel()
+        self.result = None
+        self.error = None
+        self._walk = iter_widget_tree(self.widget)
+        self._widgets = []
+        self._snapshots = QByteArray()
+        self._stream = QDataStream(self._snapshots, QIODevice.WriteOnly)
+        self._size = self.widget.size()
+        self._count_pixels = numpy is not None
+
+    def _tearDown(self):
+        self._timer.stop()
+        self._walk = self._stream = None
+        process = self._process
+        if process is not None:
+            self._process = None
+            process.kill()
+            process.waitForFinished()
+            process.deleteLater()
+
+    def _snapshotNextWidgets(self):
+        count = 0
+        for widget, snapshot in self._walk:
+            self._widgets.append(widget)
+            _write_snapshot(self._stream, snapshot)
+            count += 1
+            if count == self.batch_size:
+                return
+        self._timer.stop()
+        self._walk = None
+        self._startProcess()
+
+    def _startProcess(self):
+        settings = QByteArray()
+        stream = QDataStream(settings, QIODevice.WriteOnly)
+        stream.writeQVariant({
+            'baseline': qApp.styleSheet(),
+            'candidate': self.style_sheet,
+            'inherited': _inherited_style_sheet(self.widget),
+            'style': _style_name(qApp.style()),
+            'font': qApp.font(),
+            'palette': qApp.palette(),
+            'tile_height': self.tile_height,
+            'image_width': self.image_width,
+            'count_pixels': self._count_pixels,
+        })
+        stream.writeInt32(len(self._widgets))
+        self._stream = None
+        self._buffer = b''
+        self._changed = None
+
+        environment = QProcessEnvironment.systemEnvironment()
+        environment.insert('QT_QPA_PLATFORM', 'offscreen')
+        # Package may only be importable from paths of this process
+        python_path = os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__)))
+        if environment.value('PYTHONPATH'):
+            python_path += os.pathsep + environment.value('PYTHONPATH')
+        environment.insert('PYTHONPATH', python_path)
+        process = self._process = QProcess(self)
+        process.setProcessEnvironment(environment)
+        process.readyReadStandardOutput.connect(
+            lambda: self._onProcessOutput(process))
+        process.finished.connect(lambda *args: self._onProcessDone(process))
+        process.errorOccurred.connect(
+            lambda error: self._onProcessError(process, error))
+        process.start(
+            sys.executable, ['-m', 'qt_style_sheet_inspector._preview'])
+        process.write(settings + self._snapshots)
+        process.closeWriteChannel()
+        self._snapshots = None
+
+    def _onProcessOutput(self, process):
+        if process is not self._process:
+            return
+        self._buffer += bytes(process.readAllStandardOutput())
+        while len(self._buffer) >= _HEADER.size:
+            size, = _HEADER.unpack_from(self._buffer)
+            end = _HEADER.size + size
+            if len(self._buffer) < end:
+                break
+            message = QDataStream(
+                QByteArray(self._buffer[_HEADER.size:end])).readQVariant()
+            self._buffer = self._buffer[end:]
+            self._onMessage(message)
+            if process is not self._process:
+                return
+
+    def _onMessage(self, message):
+        kind = message[0]
+        if kind == MESSAGE_WIDGETS:
+            _kind, indices, self._rects, self._tile_count = message
+            self._widgets = [self._widgets[index] for index in indices]
+            self._changed = [0] * len(indices)
+            self._tile_index = 0
+        elif kind == MESSAGE_TILE:
+            for index, count in zip(message[1], message[2]):
+                self._changed[index] += count
+            self._tile_index += 1
+            self.progress.emit(self._tile_index, self._tile_count)
+        elif kind == MESSAGE_IMAGE:
+            self._finish(message[1])
+
+    def _finish(self, image):
+        self._tearDown()
+        counted = self._count_pixels
+        changed = self._changed
+        self.result = PreviewResult(
+            diffs=[
+                WidgetDiff(widget, rect, count if counted else None)
+                for widget, rect, count in zip(
+                    self._widgets, self._rects, changed)
+                if count
+            ],
+            widget_count=len(self._widgets),
+            # Root rect covers all visible widgets
+            changed_pixels=changed[0] if counted and changed else None,
+            size=self._size,
+            image=image,
+        )
+        self.finished.emit(self.result)
+
+    def _onProcessError(self, process, error):
+        # Other errors end with the process finishing
+        if error == QProcess.FailedToStart:
+            self._onProcessDone(process)
+
+    def _onProcessDone(self, process):
+        if process is not self._process:
+            return
+        self._onProcessOutput(process)
+        if process is not self._process:
+            return
+        lines = bytes(process.readAllStandardError()).decode(
+            'utf-8', 'replace').strip().splitlines()
+        self.error = 'Preview failed: {}'.format(
+            lines[-1] if lines else process.errorString())
+        self._tearDown()
+        self.failed.emit(self.error)
+
+
+def _describe_widget(widget):
+    """
+    :rtype: unicode
+    :return: widget class name and object name, like a selector.
+    """
+    text = widget.metaObject().className()
+    if widget.objectName():
+        text += '#' + widget.objectName()
+    return text
+
+
+class SandboxPreviewDialog(QDialog):
+    """
+    Previews a candidate style sheet on a chosen app window, see
+    `SandboxPreview`, and lists widgets that look different with it.
+    """
+
+    def __init__(self, widgets, style_sheet, parent=None):
+        """
+        :param list(QWidget) widgets: widgets that can be previewed, usually
+            app windows.
+        :param unicode style_sheet: candidate app style sheet.
+        :param QWidget parent: parent widget.
+        """
+        QDialog.__init__(self, parent)
+        self.setWindowTitle('Sandbox Preview')
+        self.widgets = widgets
+        self.style_sheet = style_sheet
+        self.sandbox_preview = None
+
+        self.widget_combo = QComboBox(self)
+        for widget in widgets:
+            title = widget.windowTitle()
+            self.widget_combo.addItem(
+                '{} ({})'.format(title, _describe_widget(widget))
+                if title else _describe_widget(widget))
+        self.preview_button = QPushButton('Preview', self)
+        self.preview_button.setEnabled(bool(widgets))
+        self.preview_button.clicked.connect(self.preview)
+        self.summary_label = QLabel(
+            'Choose a window to preview style sheet on' if widgets
+            else 'No window to preview style sheet on', self)
+
+        self.table = QTableWidget(0, 2, self)
+        self.table.setHorizontalHeaderLabels(['Widget', 'Changed Pixels'])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.Stretch)
+        self.image_label = QLabel(self)
+        self.image_label.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        image_area = QScrollArea(self)
+        image_area.setWidget(self.image_label)
+        image_area.setWidgetResizable(True)
+
+        choose_layout = QHBoxLayout()
+        choose_layout.addWidget(self.widget_combo, 1)
+        choose_layout.addWidget(self.preview_button)
+        result_layout = QHBoxLayout()
+        result_layout.addWidget(self.table, 1)
+        result_layout.addWidget(image_area, 1)
+        layout = QVBoxLayout(self)
+        layout.addLayout(choose_layout)
+        layout.addWidget(self.summary_label)
+        layout.addLayout(result_layout)
+        self.setLayout(layout)
+        self.resize(900, 500)
+
+    def preview(self, checked=False):
+        """
+        Starts previewing style sheet on chosen widget, results are shown
+        when all tiles are rendered.
+
+        :rtype: SandboxPreview
+        """
+        if self.sandbox_preview is not None:
+            self.sandbox_preview.cancel()
+        widget = self.widgets[self.widget_combo.currentIndex()]
+        self.sandbox_preview = SandboxPreview(widget, self.style_sheet, self)
+        self.sandbox_preview.progress.connect(self.onProgress)
+        self.sandbox_preview.finished.connect(self.showResult)
+        self.sandbox_preview.failed.connect(self.summary_label.setText)
+        self.summary_label.setText('Copying window...')
+        self.sandbox_preview.start()
+        return self.sandbox_preview
+
+    def onProgress(self, rendered, total):
+        self.summary_label.setText(
+            'Rendering {} of {} tiles...'.format(rendered, total))
+
+    def showResult(self, result):
+        """
+        :param PreviewResult result: result of a preview.
+        """
+        text = '{} of {} visible widgets look different'.format(
+            len(result.diffs), result.widget_count)
+        if result.changed_pixels is not None:
+            text += ' ({:.1f}% of pixels)'.format(
+                100 * result.changed_pixels /
+                max(1, result.size.width() * result.size.height()))
+        self.summary_label.setText(text)
+        self.table.setRowCount(len(result.diffs))
+        for row, diff in enumerate(result.diffs):
+            self.table.setItem(
+                row, 0, QTableWidgetItem(_describe_widget(diff.widget)))
+            pixels_item = QTableWidgetItem(
+                'changed' if diff.changed_pixels is None
+                else '{}'.format(diff.changed_pixels))
+            pixels_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.table.setItem(row, 1, pixels_item)
+        self.image_label.setPixmap(QPixmap.fromImage(result.image))
+
+    def done(self, result):
+        """
+        Overridden to stop rendering when dialog closes.
+        """
+        if self.sandbox_preview is not None:
+            self.sandbox_preview.cancel()
+        QDialog.done(self, result)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import namedtuple
+
+from PyQt5.QtCore import QObject, Qt, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QAbstractItemView, QDialog, QHeaderView, QLabel, \
+    QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout, qApp
+
+from ._metrics import set_app_style_sheet
+from ._qss import rule_spans
+from ._selectors import WidgetIndex, parse_selector, split_selector_group
+
+RuleProfile = namedtuple('RuleProfile', [
+    # Selector text of rule
+    'selector',
+    # Offsets of rule in style sheet text
+    'start',
+    'end',
+    # Line of rule in style sheet text, starting at 1
+    'line',
+    # Number of widgets any selector of rule matches, pseudo states are
+    # assumed to match
+    'matched_count',
+    # Seconds an apply of style sheet takes longer with this rule than
+    # without it, `None` when rule wasn't timed
+    'cost',
+])
+
+
+def profile_rules(style_sheet, widgets=None, timed_rules=0, repeat=1):
+    """
+    Profiles how much each rule of a style sheet costs.
+
+    Each rule is matched against widgets, the more widgets a rule matches the
+    more work Qt does to polish them. Optionally, rules matching most widgets
+    are also timed right away, see `RuleTimer`, which leaves the complete
+    style sheet applied at the end.
+
+    :param unicode style_sheet: style sheet text.
+    :param list(QWidget)|None widgets: widgets to match, by default all app
+        widgets.
+    :param int timed_rules: number of rules to time.
+    :param int repeat: number of times each apply is timed, the fastest one
+        is used.
+    :rtype: list(RuleProfile)
+    :return: profile of each rule, costliest first.
+    :raise ValueError: if style sheet can't be parsed.
+    """
+    if widgets is None:
+        widgets = qApp.allWidgets()
+    index = WidgetIndex(widgets)
+    spans = rule_spans(style_sheet)
+
+    profiles = []
+    for selector_group, _declarations, start, end in spans:
+        matched = set()
+        for text in split_selector_group(selector_group):
+            try:
+                selector = parse_selector(text)
+            except ValueError:
+                continue
+            matched.update(id(widget) for widget in index.matches(selector))
+        profiles.append(RuleProfile(
+            selector=selector_group,
+            start=start,
+            end=end,
+            line=style_sheet.count('\n', 0, start) + 1,
+            matched_count=len(matched),
+            cost=None,
+        ))
+
+    if timed_rules > 0:
+        return RuleTimer(style_sheet, profiles, timed_rules, repeat).run()
+    profiles.sort(key=_cost_order)
+    return profiles
+
+
+def _cost_order(profile):
+    return -(profile.cost or 0.0), -profile.matched_count
+
+
+class RuleTimer(QObject):
+    """
+    Times rules matching most widgets: the style sheet is applied to the app
+    once complete and once with each timed rule removed, and the cost of a
+    rule is how much longer the complete apply takes. Each apply repolishes
+    the whole app, so when started with `start` there is one apply per event
+    loop iteration, and timing can be cancelled.
+
+    The `restore` style sheet is applied back when timing ends or is
+    cancelled.
+    """
+
+    # Emitted with number of done and total applies
+    progress = pyqtSignal(int, int)
+    # Emitted with profiles, costliest first, once all rules are timed
+    finished = pyqtSignal(object)
+
+    def __init__(self, style_sheet, profiles, timed_rules, repeat=1,
+                 restore=None, parent=None):
+        """
+        :param unicode style_sheet: profiled style sheet text.
+        :param list(RuleProfile) profiles: untimed profiles of style sheet
+            rules, as returned by `profile_rules`.
+        :param int timed_rules: number of rules to time.
+        :param int repeat: number of times each apply is timed, the fastest
+            one is used.
+        :param unicode|None restore: style sheet applied when done, by
+            default the profiled one.
+        :param QObject parent: parent object.
+        """
+        QObject.__init__(self, parent)
+        self.style_sheet = style_sheet
+        self.profiles = list(profiles)
+        self.repeat = repeat
+        self.restore = style_sheet if restore is None else restore
+        self.result = None
+        self._timed = sorted(
+            range(len(self.profiles)),
+            key=lambda i: -self.profiles[i].matched_count)[:timed_rules]
+        self._step = None
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._timeNext)
+
+    def start(self):
+        """
+        Starts timing in event loop iterations, `finished` is emitted when
+        done.
+        """
+        self._setUp()
+        self._timer.start(0)
+
+    def run(self):
+        """
+        Times all rules right away.
+
+        :rtype: list(RuleProfile)
+        """
+        self._setUp()
+        while self.result is None:
+            self._timeNext()
+        return self.result
+
+    def cancel(self):
+        """
+        Stops timing and applies `restore` style sheet, `finished` isn't
+        emitted.
+        """
+        if self.isRunning():
+            self._timer.stop()
+            self._step = None
+            set_app_style_sheet(self.restore)
+
+    def isRunning(self):
+        """
+        :rtype: bool
+        """
+        return self._step is not None
+
+    def _setUp(self):
+        self.cancel()
+        self.result = None
+        self._step = 0
+        self._baseline = None
+        self._costs = {}
+
+    def _timeApply(self, style_sheet):
+        return min(
+            set_app_style_sheet(style_sheet)[0] for _ in range(self.repeat))
+
+    def _timeNext(self):
+        if self._step == 0:
+            self._baseline = self._timeApply(self.style_sheet)
+        else:
+            index = self._timed[self._step - 1]
+            profile = self.profiles[index]
+            cost = self._baseline - self._timeApply(
+                self.style_sheet[:profile.start] +
+                self.style_sheet[profile.end:])
+            self._costs[index] = max(cost, 0.0)
+        self._step += 1
+        total = len(self._timed) + 1
+        self.progress.emit(self._step, total)
+        if self._step < total:
+            return
+
+        self._timer.stop()
+        self._step = None
+        set_app_style_sheet(self.restore)
+        self.result = [
+            profile._replace(cost=self._costs[index])
+            if index in self._costs else profile
+            for index, profile in enumerate(self.profiles)
+        ]
+        self.result.sort(key=_cost_order)
+        self.finished.emit(self.result)
+
+
+class RuleProfileDialog(QDialog):
+    """
+    Shows a ranked table of rule profiles. Double clicking a rule emits
+    `ruleActivated` with the rule offsets in style sheet text.
+    """
+
+    ruleActivated = pyqtSignal(int, int)
+
+    def __init__(self, profiles, parent=None):
+        """
+        :param list(RuleProfile) profiles: as returned by `profile_rules`.
+        :param QWidget parent: parent widget.
+        """
+        QDialog.__init__(self, parent)
+        self.setWindowTitle('Rule Profile')
+        self.profiles = profiles
+        self.timer = None
+
+        self.table = QTableWidget(0, 4, self)
+        self.table.setHorizontalHeaderLabels(
+            ['Selector', 'Widgets', 'Cost (ms)', 'Line'])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.Stretch)
+        self.table.cellDoubleClicked.connect(self.onCellDoubleClicked)
+        self.setProfiles(profiles)
+
+        self.timing_label = QLabel(self)
+        self.cancel_button = QPushButton('Cancel Timing', self)
+        self.cancel_button.clicked.connect(self.cancelTiming)
+        self.timing_label.hide()
+        self.cancel_button.hide()
+        self.finished.connect(lambda result: self.cancelTiming())
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addWidget(self.timing_label)
+        layout.addWidget(self.cancel_button)
+        self.setLayout(layout)
+        self.resize(600, 400)
+
+    def setProfiles(self, profiles):
+        """
+        Shows rule profiles.
+
+        :param list(RuleProfile) profiles: as returned by `profile_rules`.
+        """
+        self.profiles = profiles
+        self.table.setRowCount(len(profiles))
+        for row, profile in enumerate(profiles):
+            cost = '' if profile.cost is None else '{:.2f}'.format(
+                profile.cost * 1000)
+            values = [profile.selector, profile.matched_count, cost,
+                      profile.line]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem('{}'.format(value))
+                if column > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+    def timeRules(self, timer):
+        """
+        Starts timing rules, showing progress, and shows timed profiles once
+        done. Timing is cancelled when dialog is closed.
+
+        :param RuleTimer timer: timer of shown profiles.
+        """
+        self.cancelTiming()
+        self.timer = timer
+        timer.progress.connect(self.onTimingProgress)
+        timer.finished.connect(self.onTimingFinished)
+        self.timing_label.show()
+        self.cancel_button.show()
+        timer.start()
+
+    def cancelTiming(self):
+        """
+        Cancels timing rules, if running.
+        """
+        if self.timer is not None and self.timer.isRunning():
+            self.timer.cancel()
+            self.timing_label.setText('Timing cancelled')
+            self.cancel_button.hide()
+
+    def onTimingProgress(self, done, total):
+        """
+        Shows timing progress.
+        """
+        self.timing_label.setText(
+            'Timing rules: {} of {} applies'.format(done, total))
+
+    def onTimingFinished(self, profiles):
+        """
+        Shows timed profiles.
+        """
+        self.setProfiles(profiles)
+        self.timing_label.hide()
+        self.cancel_button.hide()
+
+    def onCellDoubleClicked(self, row, column):
+        """
+        Emits `ruleActivated` for the rule in clicked row.
+        """
+        profile = self.profiles[row]
+        self.ruleActivated.emit(profile.start, profile.end)
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import re
+from collections import namedtuple
+
+from ._history import compute_delta
+from ._selectors import split_selector_group
+
+# Kinds of tokens returned by `tokenize`
+TOKEN_COMMENT = 'comment'
+TOKEN_STRING = 'string'
+TOKEN_OPEN = 'open'
+TOKEN_CLOSE = 'close'
+TOKEN_SEMICOLON = 'semicolon'
+TOKEN_COLON = 'colon'
+
+# Unterminated comments run until end of text and unterminated strings until
+# end of line, like Qt does
+_TOKEN_RE = re.compile(r'''
+    (?P<comment>/\*.*?(?:\*/|\Z)) |
+    (?P<string>"(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?) |
+    (?P<open>\{) |
+    (?P<close>\}) |
+    (?P<semicolon>;) |
+    (?P<colon>:)
+''', re.VERBOSE | re.DOTALL)
+
+
+def strip_comments(text):
+    """
+    Blanks out all `/* ... */` comments from style sheet text, keeping line
+    breaks so offsets in stripped text are the same as in original text.
+
+    :param unicode text: style sheet text.
+    :rtype: unicode
+    """
+    if '/*' not in text:
+        return text
+    return _TOKEN_RE.sub(_blank_comment, text)
+
+
+def _blank_comment(match):
+    if match.lastgroup != TOKEN_COMMENT:
+        return match.group()
+    return ''.join('\n' if char == '\n' else ' ' for char in match.group())
+
+
+def split_rules(text):
+    """
+    Splits style sheet text in its top level rules, normalizing whitespace so
+    that rules that only differ in formatting compare equal.
+
+    :param unicode text: style sheet text.
+    :rtype: list(tuple(unicode, unicode))
+    :return: a `(selector, declarations)` pair for each rule, in source order.
+    :raise ValueError: if text can't be split in rules, like when braces are
+        unbalanced.
+    """
+    return [
+        (selector, declarations)
+        for selector, declarations, _start, _end in rule_spans(text)
+    ]
+
+
+def rule_spans(text):
+    """
+    Like `split_rules`, but also returns where each rule is in text.
+
+    :param unicode text: style sheet text.
+    :rtype: list(tuple(unicode, unicode, int, int))
+    :return: `(selector, declarations, start, end)` for each rule, where
+        `text[start:end]` is the rule source, from its selector to its
+        closing brace.
+    :raise ValueError: see `split_rules`.
+    """
+    parsed = ParsedStyleSheet(text)
+    if parsed.errors:
+        raise ValueError(parsed.errors[0].message)
+    return [
+        (rule.selector, rule.body, rule.start, rule.end)
+        for rule in parsed.rules
+    ]
+
+
+def tokenize(text, start=0, end=None):
+    """
+    Finds tokens that give style sheet text its structure: comments, quoted
+    strings, braces, semicolons and colons. Text between tokens (selectors,
+    property names and values) isn't returned.
+
+    :param unicode text: style sheet text.
+    :param int start: offset where tokenizing starts.
+    :param int|None end: offset where tokenizing stops, by default end of
+        text. A token crossing it is still returned whole.
+    :rtype: iterator(tuple(unicode, int, int))
+    :return: `(kind, start, end)` of each token, where kind is one of
+        `TOKEN_*`.
+    """
+    if end is None:
+        end = len(text)
+    for match in _TOKEN_RE.finditer(text, start):
+        if match.start() >= end:
+            return
+        yield match.lastgroup, match.start(), match.end()
+
+
+ParseError = namedtuple('ParseError', ['start', 'end', 'message'])
+
+
+class Declaration(object):
+    """
+    A `name: value` declaration of a rule. Offsets are relative to the start
+    of its rule, so they stay valid when text before the rule is edited.
+    """
+
+    __slots__ = ('name', 'value', 'start', 'end')
+
+    def __init__(self, name, value, start, end):
+        self.name = name
+        self.value = value
+        self.start = start
+        self.end = end
+
+
+class Rule(object):
+    """
+    A parsed rule, like `QLabel { color: red; }`.
+
+    `selector` and `body` are whitespace normalized, without comments, so
+    rules that only differ in formatting compare equal. `text[start:end]` is
+    the rule source, from its selector to its closing brace, and
+    `body_start` the offset of its opening brace, relative to `start`.
+
+    `problems` caches validation problems of rule, see `validate_rules`.
+    """
+
+    __slots__ = (
+        'selector', 'body', 'declarations', 'start', 'end', 'body_start',
+        'problems',
+    )
+
+    def __init__(self, selector, body, declarations, start, end,
+                 body_start=0):
+        self.selector = selector
+        self.body = body
+        self.declarations = declarations
+        self.start = start
+        self.end = end
+        self.body_start = body_start
+        self.problems = None
+
+    def selectors(self):
+        """
+        :rtype: list(unicode)
+        :return: each selector of rule selector group.
+        """
+        return split_selector_group(self.selector)
+
+
+class ParsedStyleSheet(object):
+    """
+    Rules of a style sheet text, kept up to date as text is edited.
+
+    Parsing never fails, problems are reported in `errors` and the parser
+    recovers at the next rule. On edits only rules around the edit are parsed
+    again: parsing restarts at the rule before the edit and stops as soon as
+    it reaches a rule end that was also a rule end before the edit, since
+    everything after it is the same text parsed from the same state.
+    """
+
+    def __init__(self, text=''):
+        self.text = ''
+        self.rules = []
+        # Sorted by start offset
+        self.errors = []
+        self.version = 0
+        self.setText(text)
+
+    def setText(self, text):
+        """
+        Replaces the whole text. Only the range that differs from current
+        text is parsed again, so reloading a slightly different text is
+        cheap.
+
+        :param unicode text: new text.
+        :rtype: tuple(int, int, int)
+        :return: see `update`.
+        """
+        prefix, suffix, middle = compute_delta(self.text, text)
+        return self.update(
+            prefix, len(self.text) - prefix - suffix, middle)
+
+    def update(self, position, removed, added_text):
+        """
+        Updates rules after an edit in text.
+
+        :param int position: where the edit happened.
+        :param int removed: number of chars removed at position.
+        :param unicode added_text: text inserted at position.
+        :rtype: tuple(int, int, int)
+        :return: `(index, removed_count, added_count)`, meaning that
+            `removed_count` rules starting at `index` were replaced by
+            `added_count` new rules.
+        """
+        old_text = self.text
+        old_rules = self.rules
+        text = self.text = (
+            old_text[:position] + added_text + old_text[position + removed:])
+        self.version += 1
+        shift = len(added_text) - removed
+        edit_end = position + removed
+
+        # Rules ending before edit are kept, except last one: it may be
+        # unterminated and completed by the edit.
+        first = self._ruleEndingBefore(position)
+        if first == len(old_rules) and first > 0:
+            first -= 1
+        restart = old_rules[first - 1].end if first > 0 else 0
+
+        rules = []
+        errors = [error for error in self.errors if error.start < restart]
+        resync = None
+        for rule, rule_errors in _parse_rules(text, restart):
+            errors.extend(rule_errors)
+            if rule is None:
+                break
+            rules.append(rule)
+            old_end = rule.end - shift
+            if old_end >= edit_end:
+                index = self._ruleEndingBefore(old_end, first)
+                if (index > 0 and old_rules[index - 1].end == old_end and
+                        old_end < len(old_text)):
+                    resync = index
+                    break
+
+        if resync is None:
+            resync = len(old_rules)
+        else:
+            resync_offset = old_rules[resync - 1].end
+            for rule in old_rules[resync:]:
+                rule.start += shift
+                rule.end += shift
+            errors.extend(
+                error._replace(
+                    start=error.start + shift, end=error.end + shift)
+                for error in self.errors if error.start >= resync_offset)
+        self.rules[first:resync] = rules
+        self.errors = errors
+        return first, resync - first, len(rules)
+
+    def ruleAt(self, position):
+        """
+        :param int position: offset in text.
+        :rtype: int|None
+        :return: index of rule whose source contains position, if any.
+        """
+        index = self._ruleEndingBefore(position)
+        if index < len(self.rules) and self.rules[index].start <= position:
+            return index
+        return None
+
+    def _ruleEndingBefore(self, position, low=0):
+        """
+        :rtype: int
+        :return: number of rules ending at or before position.
+        """
+        rules = self.rules
+        high = len(rules)
+        while low < high:
+            middle = (low + high) // 2
+            if rules[middle].end <= position:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+def _parse_rules(text, pos):
+    """
+    Parses rules of text starting at `pos`, which must be outside any rule.
+
+    :rtype: iterator(tuple(Rule|None, list(ParseError)))
+    :return: each rule with errors found while parsing it. After last rule,
+        `None` is returned with errors of any trailing text.
+    """
+    tokens = _TOKEN_RE.finditer(text, pos)
+    while True:
+        errors = []
+        open_pos = -1
+        for match in tokens:
+            kind = match.lastgroup
+            if kind == TOKEN_OPEN:
+                open_pos = match.start()
+                break
+            if kind == TOKEN_CLOSE:
+                errors.append(ParseError(
+                    match.start(), match.end(), 'Unexpected closing brace'))
+                pos = match.end()
+            elif (kind == TOKEN_SEMICOLON and strip_comments(
+                    text[pos:match.start()]).lstrip().startswith('@')):
+                # At-rule statements, like `@import "base.qss";`, are skipped
+                # like Qt does
+                pos = match.end()
+        if open_pos == -1:
+            trailing = strip_comments(text[pos:])
+            if trailing.strip():
+                start = pos + len(trailing) - len(trailing.lstrip())
+                errors.append(ParseError(
+                    start, len(text), 'Unexpected text after last rule'))
+            yield None, errors
+            return
+
+        prelude = strip_comments(text[pos:open_pos])
+        start = pos + len(prelude) - len(prelude.lstrip())
+        selector = ' '.join(prelude.split())
+        if not selector:
+            errors.append(ParseError(
+                open_pos, open_pos + 1, 'Rule without selector'))
+
+        end = -1
+        declaration_start = open_pos + 1
+        bounds = []
+        for match in tokens:
+            kind = match.lastgroup
+            if kind == TOKEN_SEMICOLON:
+                bounds.append((declaration_start, match.start()))
+                declaration_start = match.end()
+            elif kind == TOKEN_CLOSE:
+                end = match.end()
+                bounds.append((declaration_start, match.start()))
+                break
+            elif kind == TOKEN_OPEN:
+                errors.append(ParseError(
+                    match.start(), match.end(), 'Unexpected opening brace'))
+        if end == -1:
+            errors.append(ParseError(start, len(text), 'Unterminated rule'))
+            end = len(text)
+            bounds.append((declaration_start, end))
+
+        declarations = []
+        normalized_declarations = []
+        for declaration_start, declaration_end in bounds:
+            normalized = ' '.join(strip_comments(
+                text[declaration_start:declaration_end]).split())
+            if not normalized:
+                continue
+            normalized_declarations.append(normalized)
+            name, colon, value = normalized.partition(':')
+            if not colon:
+                errors.append(ParseError(
+                    declaration_start, declaration_end,
+                    'Declaration without value'))
+            declarations.append(Declaration(
+                name.strip(), value.strip(), declaration_start - start,
+                declaration_end - start))
+        body = ';'.join(normalized_declarations)
+
+        yield Rule(
+            selector, body, declarations, start, end, open_pos - start
+        ), errors
+        pos = end
+
+
+def diff_rules(old_rules, new_rules):
+    """
+    Finds which rules differ between two rule lists. Common leading and
+    trailing rules are skipped, so the cascade order of the remaining rules is
+    respected.
+
+    :param list(tuple(unicode, unicode)) old_rules: as returned by
+        `split_rules`.
+    :param list(tuple(unicode, unicode)) new_rules: as returned by
+        `split_rules`.
+    :rtype: tuple(list, list)
+    :return: rules removed from old rules and rules added in new rules.
+    """
+    max_prefix = min(len(old_rules), len(new_rules))
+    prefix = 0
+    while prefix < max_prefix and old_rules[prefix] == new_rules[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < max_prefix - prefix and
+           old_rules[-suffix - 1] == new_rules[-suffix - 1]):
+        suffix += 1
+    return (
+        old_rules[prefix:len(old_rules) - suffix],
+        new_rules[prefix:len(new_rules) - suffix],
+    )
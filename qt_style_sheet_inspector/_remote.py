@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import json
+import struct
+import sys
+import zlib
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtNetwork import QAbstractSocket, QLocalServer, QLocalSocket
+from PyQt5.QtWidgets import qApp
+
+from ._history import apply_delta, compute_delta
+from ._metrics import ACTION_APPLY, set_app_style_sheet
+
+# Default name of the local server an agent listens on
+DEFAULT_SERVER_NAME = 'qt_style_sheet_inspector'
+
+# Milliseconds to wait for a server when checking if it is still running
+_PROBE_TIMEOUT = 1000
+
+# Messages are a header with payload size and flags, followed by a JSON
+# payload, zlib compressed when bigger than `_COMPRESS_SIZE` bytes
+_HEADER = struct.Struct('>IB')
+_FLAG_COMPRESSED = 1
+_COMPRESS_SIZE = 1024
+
+# Message types. Style sheet text is always sent as a delta against the last
+# text both sides agreed on, see `compute_delta`:
+# * `load`: inspector asks for app style sheet, agent answers with `sheet`.
+# * `sheet`: agent sends app style sheet delta `d`.
+# * `apply`: inspector sends style sheet delta `d` to apply, with its
+#   action `a`, agent answers with `metrics`.
+# * `metrics`: agent sends seconds `r` app took to apply style sheet, number
+#   of widgets `c` repolished and action `a` applied.
+MESSAGE_LOAD = 'load'
+MESSAGE_SHEET = 'sheet'
+MESSAGE_APPLY = 'apply'
+MESSAGE_METRICS = 'metrics'
+
+
+def encode_message(message):
+    """
+    :param dict message: message, JSON serializable.
+    :rtype: bytes
+    :return: message framed to be written to a socket.
+    """
+    payload = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    flags = 0
+    if len(payload) > _COMPRESS_SIZE:
+        payload = zlib.compress(payload, 1)
+        flags |= _FLAG_COMPRESSED
+    return _HEADER.pack(len(payload), flags) + payload
+
+
+class MessageBuffer(object):
+    """
+    Splits bytes read from a socket in messages, see `encode_message`.
+    """
+
+    def __init__(self):
+        self._data = b''
+
+    def feed(self, data):
+        """
+        :param bytes data: bytes read from socket.
+        :rtype: list(dict)
+        :return: messages completed by data.
+        """
+        self._data += data
+        messages = []
+        pos = 0
+        while len(self._data) - pos >= _HEADER.size:
+            size, flags = _HEADER.unpack_from(self._data, pos)
+            end = pos + _HEADER.size + size
+            if len(self._data) < end:
+                break
+            payload = self._data[pos + _HEADER.size:end]
+            if flags & _FLAG_COMPRESSED:
+                payload = zlib.decompress(payload)
+            messages.append(json.loads(payload.decode('utf-8')))
+            pos = end
+        self._data = self._data[pos:]
+        return messages
+
+
+def server_running(name):
+    """
+    :param unicode name: local server name.
+    :rtype: bool
+    :return: if a server accepts connections with name.
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    running = socket.waitForConnected(_PROBE_TIMEOUT)
+    socket.abort()
+    return running
+
+
+class StyleSheetAgent(QObject):
+    """
+    Exposes app style sheet to inspectors running in other processes, over a
+    local socket (see `RemoteStyleSheet`).
+
+    The agent only keeps the last style sheet text sent to each inspector,
+    so edits, search, undo tape and analyses all happen in the inspector
+    process and never stall the app. Style sheet text is sent both ways as
+    deltas, so small edits of large style sheets are small messages.
+    """
+
+    # Emitted with the action of each style sheet applied by an inspector
+    styleSheetApplied = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        """
+        :param QObject parent: parent object.
+        """
+        QObject.__init__(self, parent)
+        self._server = QLocalServer(self)
+        self._server.newConnection.connect(self._onNewConnection)
+        # Connected sockets with their message buffer and last style sheet
+        # text sent to or received from them
+        self._clients = {}
+
+    def listen(self, name=DEFAULT_SERVER_NAME):
+        """
+        Starts listening for inspectors, of the same user only. A server left
+        behind by a crashed app with the same name is removed, while the one
+        of an app still running is kept.
+
+        :param unicode name: local server name.
+        :rtype: bool
+        :return: if agent is listening.
+        """
+        # With socket options, Qt replaces an existing server of the same
+        # name instead of failing
+        if server_running(name):
+            return False
+        self._server.setSocketOptions(QLocalServer.UserAccessOption)
+        if self._server.listen(name):
+            return True
+        if self._server.serverError() == QAbstractSocket.AddressInUseError:
+            QLocalServer.removeServer(name)
+            return self._server.listen(name)
+        return False
+
+    def serverName(self):
+        """
+        :rtype: unicode
+        :return: local server name, empty if not listening.
+        """
+        return self._server.serverName()
+
+    def close(self):
+        """
+        Stops listening and disconnects inspectors.
+        """
+        self._server.close()
+        for socket in list(self._clients):
+            socket.disconnectFromServer()
+
+    def _onNewConnection(self):
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            self._clients[socket] = [MessageBuffer(), '']
+            socket.readyRead.connect(
+                lambda socket=socket: self._onReadyRead(socket))
+            socket.disconnected.connect(
+                lambda socket=socket: self._onDisconnected(socket))
+
+    def _onDisconnected(self, socket):
+        if self._clients.pop(socket, None) is not None:
+            socket.deleteLater()
+
+    def _onReadyRead(self, socket):
+        client = self._clients.get(socket)
+        if client is None:
+            return
+        buffer_, synced = client
+        for message in buffer_.feed(bytes(socket.readAll())):
+            kind = message.get('t')
+            if kind == MESSAGE_LOAD:
+                style_sheet = qApp.styleSheet()
+                socket.write(encode_message({
+                    't': MESSAGE_SHEET,
+                    'd': compute_delta(synced, style_sheet),
+                }))
+                synced = style_sheet
+            elif kind == MESSAGE_APPLY:
+                synced = apply_delta(synced, message['d'])
+                repolish_time, polished_count = set_app_style_sheet(synced)
+                action = message.get('a', ACTION_APPLY)
+                socket.write(encode_message({
+                    't': MESSAGE_METRICS,
+                    'a': action,
+                    'r': repolish_time,
+                    'c': polished_count,
+                }))
+                self.styleSheetApplied.emit(action)
+        client[1] = synced
+        socket.flush()
+
+
+class RemoteStyleSheet(QObject):
+    """
+    Style sheet of an app in another process, exposed by a
+    `StyleSheetAgent`. Like `AppStyleSheet`, it can be given to an inspector
+    to edit it.
+
+    Calls block until the agent answers, which only stalls the inspector
+    process.
+    """
+
+    is_local = False
+
+    # Emitted with `(action, repolish time, polished count)` received from
+    # agent after each apply
+    metricsReceived = pyqtSignal(str, float, int)
+
+    def __init__(self, parent=None):
+        """
+        :param QObject parent: parent object.
+        """
+        QObject.__init__(self, parent)
+        # Milliseconds to wait for agent
+        self.timeout = 30000
+        self._socket = QLocalSocket(self)
+        self._buffer = MessageBuffer()
+        self._synced = ''
+
+    def connectToAgent(self, name=DEFAULT_SERVER_NAME):
+        """
+        :param unicode name: local server name agent listens on.
+        :raise IOError: if agent can't be reached.
+        """
+        self._socket.connectToServer(name)
+        if not self._socket.waitForConnected(self.timeout):
+            raise IOError('Could not attach to "{}": {}'.format(
+                name, self._socket.errorString()))
+        self._buffer = MessageBuffer()
+        self._synced = ''
+
+    def isConnected(self):
+        """
+        :rtype: bool
+        """
+        return self._socket.state() == QLocalSocket.ConnectedState
+
+    def styleSheet(self):
+        """
+        :rtype: unicode
+        :return: current app style sheet.
+        :raise IOError: if agent doesn't answer.
+        """
+        self._send({'t': MESSAGE_LOAD})
+        message = self._receive(MESSAGE_SHEET)
+        self._synced = apply_delta(self._synced, message['d'])
+        return self._synced
+
+    def setStyleSheet(self, style_sheet, action=ACTION_APPLY):
+        """
+        Applies a style sheet to app.
+
+        :param unicode style_sheet: style sheet text.
+        :param unicode action: one of `ACTION_*`, what is applied.
+        :rtype: tuple(float, int)
+        :return: seconds app took to set style sheet and number of widgets
+            repolished, like `set_app_style_sheet`.
+        :raise IOError: if agent doesn't answer.
+        """
+        self._send({
+            't': MESSAGE_APPLY,
+            'a': action,
+            'd': compute_delta(self._synced, style_sheet),
+        })
+        message = self._receive(MESSAGE_METRICS)
+        # Agent only has style sheet once it answers
+        self._synced = style_sheet
+        self.metricsReceived.emit(message['a'], message['r'], message['c'])
+        return message['r'], message['c']
+
+    def _send(self, message):
+        if not self.isConnected():
+            raise IOError('Not attached to an app')
+        self._socket.write(encode_message(message))
+        self._socket.flush()
+
+    def _receive(self, kind):
+        """
+        :rtype: dict
+        :return: next message, which must be of given kind.
+        :raise IOError: if agent doesn't answer in time.
+        """
+        while True:
+            messages = self._buffer.feed(bytes(self._socket.readAll()))
+            if messages:
+                # Requests are answered one at a time, in order
+                message, = messages
+                if message.get('t') != kind:
+                    raise IOError(
+                        'Unexpected message from app: {}'.format(
+                            message.get('t')))
+                return message
+            if not self._socket.waitForReadyRead(self.timeout):
+                raise IOError('App did not answer: {}'.format(
+                    self._socket.errorString()))
+
+
+def main(argv=None):
+    """
+    Runs an inspector attached to an app with a `StyleSheetAgent`, in its
+    own process.
+
+    :param list(unicode)|None argv: command line arguments, the only one is
+        the local server name of agent.
+    :rtype: int
+    :return: exit code.
+    """
+    from PyQt5.QtWidgets import QApplication
+    from ._inspector import StyleSheetInspector
+
+    if argv is None:
+        argv = sys.argv
+    app = QApplication(argv)
+    name = argv[1] if len(argv) > 1 else DEFAULT_SERVER_NAME
+    remote = RemoteStyleSheet()
+    try:
+        remote.connectToAgent(name)
+    except IOError as e:
+        print(e, file=sys.stderr)
+        return 1
+    inspector = StyleSheetInspector(app_style_sheet=remote)
+    inspector.setWindowTitle('{} - {}'.format(inspector.windowTitle(), name))
+    inspector.show()
+    return app.exec_()
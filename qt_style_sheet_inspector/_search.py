@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import threading
+from bisect import bisect_left
+
+from PyQt5.QtCore import QObject, QRegularExpression, QRunnable, \
+    QThreadPool, pyqtSignal
+
+
+class SearchIndex(object):
+    """
+    Index of case insensitive literal occurrences in a text.
+
+    Occurrences of a query are computed once per text version and kept up to
+    date when the text is edited, by shifting hits after the edited range and
+    only searching again around the edit.
+    """
+
+    # Max number of queries whose hits are kept
+    MAX_CACHED_QUERIES = 8
+
+    def __init__(self, text=''):
+        self._text = _lower(text)
+        # Query to sorted list of start offsets of its occurrences
+        self._hits = {}
+        self.version = 0
+
+    def __len__(self):
+        return len(self._text)
+
+    def setText(self, text):
+        """
+        Replaces the whole indexed text.
+
+        :param unicode text: new text.
+        """
+        self._text = _lower(text)
+        self._hits.clear()
+        self.version += 1
+
+    def update(self, position, removed, added_text):
+        """
+        Updates index after an edit in text.
+
+        :param int position: where the edit happened.
+        :param int removed: number of chars removed at position.
+        :param unicode added_text: text inserted at position.
+        """
+        text = self._text
+        added_text = _lower(added_text)
+        self._text = text[:position] + added_text + text[position + removed:]
+        self.version += 1
+        shift = len(added_text) - removed
+        for query, hits in self._hits.items():
+            size = len(query)
+            # Hits touching the edited range must be searched again
+            first = bisect_left(hits, position - size + 1)
+            last = bisect_left(hits, position + removed)
+            start = max(0, position - size + 1)
+            end = position + len(added_text) + size - 1
+            hits[first:] = self._search(query, start, end) + [
+                hit + shift for hit in hits[last:]]
+
+    def find(self, query):
+        """
+        :param unicode query: text to search.
+        :rtype: list(int)
+        :return: sorted start offsets of all occurrences of query.
+        """
+        query = _lower(query)
+        if not query:
+            return []
+        hits = self._hits.get(query)
+        if hits is None:
+            if len(self._hits) >= self.MAX_CACHED_QUERIES:
+                self._hits.clear()
+            hits = self._hits[query] = self._search(query, 0, len(self._text))
+        return hits
+
+    def _search(self, query, start, end):
+        hits = []
+        find = self._text.find
+        pos = find(query, start, end)
+        while pos != -1:
+            hits.append(pos)
+            pos = find(query, pos + 1, end)
+        return hits
+
+
+def _lower(text):
+    """
+    Lower cases text keeping its length, so offsets in lower cased text are
+    valid in original text. Chars whose lower case form has a different
+    length, like 'İ', are kept as is.
+
+    :param unicode text: text.
+    :rtype: unicode
+    """
+    lower = text.lower()
+    if len(lower) == len(text):
+        return lower
+    return ''.join(
+        char.lower() if len(char.lower()) == 1 else char for char in text)
+
+
+def next_hit(hits, position):
+    """
+    :param list(int) hits: sorted offsets.
+    :param int position: cursor position.
+    :rtype: int|None
+    :return: index of first hit starting at or after position, cycling back to
+        first hit. `None` if there are no hits.
+    """
+    if not hits:
+        return None
+    index = bisect_left(hits, position)
+    return index if index < len(hits) else 0
+
+
+def previous_hit(hits, position):
+    """
+    :param list(int) hits: sorted offsets.
+    :param int position: cursor position.
+    :rtype: int|None
+    :return: index of last hit starting before position, cycling to last hit.
+        `None` if there are no hits.
+    """
+    if not hits:
+        return None
+    index = bisect_left(hits, position) - 1
+    return index if index >= 0 else len(hits) - 1
+
+
+class RegexSearcher(QObject):
+    """
+    Runs regular expression searches in a worker thread, so slow or
+    pathological patterns never block the GUI thread.
+
+    Searches run on a snapshot of the text in Qt global thread pool. Starting
+    a new search cancels the running one, and only results of the latest
+    search are emitted.
+
+    Uses `QRegularExpression`, which releases the GIL while matching and has a
+    match limit for patterns with catastrophic backtracking.
+    """
+
+    # Emitted with sorted start offsets and respective end offsets of hits
+    finished = pyqtSignal(object, object)
+    # Emitted with error message when pattern is invalid
+    failed = pyqtSignal(str)
+
+    # Number of matches, hits or not, between checks for cancellation
+    CANCEL_CHECK_INTERVAL = 256
+
+    def __init__(self, parent=None):
+        QObject.__init__(self, parent)
+        self._state = _SearchState()
+        # Results are emitted through a relay shared with the tasks, not owned
+        # by this object, so it outlives any task still running when the
+        # searcher is destroyed. When the searcher is gone, Qt drops the
+        # connection and late results are ignored.
+        self._relay = _SearchRelay()
+        self._relay.finished.connect(self._onTaskFinished)
+        self.destroyed.connect(self._state.cancel)
+
+    def search(self, text, pattern, regex=True, case_sensitive=False,
+               whole_words=False):
+        """
+        Starts searching pattern in text, cancelling any running search.
+
+        :param unicode text: text to search in.
+        :param unicode pattern: pattern to search.
+        :param bool regex: if pattern is a regular expression, otherwise it is
+            searched literally.
+        :param bool case_sensitive: if search is case sensitive.
+        :param bool whole_words: if only whole words can match.
+        """
+        generation = self._state.cancel()
+        if not regex:
+            pattern = QRegularExpression.escape(pattern)
+        if whole_words:
+            pattern = r'\b(?:{})\b'.format(pattern)
+        options = QRegularExpression.NoPatternOption
+        if not case_sensitive:
+            options |= QRegularExpression.CaseInsensitiveOption
+        expression = QRegularExpression(pattern, options)
+        if not expression.isValid():
+            self.failed.emit(expression.errorString())
+            return
+        self._state.taskStarted()
+        task = _SearchTask(
+            self._state, generation, text, expression, self._relay)
+        QThreadPool.globalInstance().start(task)
+
+    def cancel(self):
+        """
+        Cancels running search, if any.
+        """
+        self._state.cancel()
+
+    def isRunning(self):
+        """
+        :rtype: bool
+        :return: if there is any search task still running, including
+            cancelled ones.
+        """
+        return self._state.running > 0
+
+    def _onTaskFinished(self, generation, starts, ends):
+        if generation == self._state.generation:
+            self.finished.emit(starts, ends)
+
+
+class _SearchState(object):
+    """
+    State shared between `RegexSearcher` and its worker threads.
+    """
+
+    def __init__(self):
+        self.generation = 0
+        self.running = 0
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.generation += 1
+            return self.generation
+
+    def taskStarted(self):
+        with self._lock:
+            self.running += 1
+
+    def taskDone(self):
+        with self._lock:
+            self.running -= 1
+
+
+class _SearchRelay(QObject):
+    finished = pyqtSignal(int, object, object)
+
+
+class _SearchTask(QRunnable):
+
+    def __init__(self, state, generation, text, expression, relay):
+        QRunnable.__init__(self)
+        self._state = state
+        self._generation = generation
+        self._text = text
+        self._expression = expression
+        self._relay = relay
+
+    def run(self):
+        try:
+            result = self._search()
+            if result is not None:
+                self._relay.finished.emit(self._generation, *result)
+        finally:
+            self._state.taskDone()
+
+    def _search(self):
+        starts = []
+        ends = []
+        iterator = self._expression.globalMatch(self._text)
+        check_interval = RegexSearcher.CANCEL_CHECK_INTERVAL
+        # Matches are counted apart from hits, since empty matches aren't
+        # hits
+        count = 0
+        while iterator.hasNext():
+            if (count % check_interval == 0 and
+                    self._state.generation != self._generation):
+                return None
+            count += 1
+            match = iterator.next()
+            if match.capturedLength() > 0:
+                starts.append(match.capturedStart())
+                ends.append(match.capturedEnd())
+        if self._state.generation != self._generation:
+            return None
+        return starts, ends
@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import re
+
+_TOKEN_RE = re.compile(r'''
+    (?P<child>\s*>\s*) |
+    (?P<descendant>\s+) |
+    (?P<type>\*|[\w-]+) |
+    (?P<exact>\.[\w-]+) |
+    (?P<id>\#[\w-]+) |
+    (?P<attribute>\[\s*(?P<attr_name>[\w-]+)\s*
+        (?:(?P<attr_op>[~|]?=)\s*
+           (?:"(?P<attr_dq>[^"]*)"|'(?P<attr_sq>[^']*)'|(?P<attr_bare>[\w-]+))
+        \s*)?\]) |
+    (?P<subcontrol>::[\w-]+) |
+    (?P<pseudo>:!?[\w-]+)
+''', re.VERBOSE)
+
+DESCENDANT = ' '
+CHILD = '>'
+
+
+class CompoundSelector(object):
+    """
+    A sequence of simple selectors not separated by combinators, like
+    `QPushButton#ok[flat="true"]:hover`.
+    """
+
+    __slots__ = (
+        'type_name', 'exact_class', 'object_name', 'attributes',
+        'pseudo_states', 'subcontrol',
+    )
+
+    def __init__(self):
+        self.type_name = None
+        self.exact_class = None
+        self.object_name = None
+        self.attributes = ()
+        self.pseudo_states = ()
+        self.subcontrol = None
+
+    def isUniversal(self):
+        """
+        :rtype: bool
+        :return: if this compound selector can match widgets of any class
+            with any object name.
+        """
+        return (
+            self.type_name in (None, '*') and
+            self.exact_class is None and
+            self.object_name is None
+        )
+
+
+class Selector(object):
+    """
+    A parsed complex selector, like `QDialog > QPushButton#ok`.
+
+    `parts` is a list of `(combinator, CompoundSelector)`, from the leftmost
+    compound to the subject of the selector. The combinator of the first part
+    is always `None`.
+    """
+
+    __slots__ = ('text', 'parts')
+
+    def __init__(self, text, parts):
+        self.text = text
+        self.parts = parts
+
+    @property
+    def subject(self):
+        """
+        :rtype: CompoundSelector
+        :return: the rightmost compound selector, which matches the styled
+            widget itself.
+        """
+        return self.parts[-1][1]
+
+    def specificity(self):
+        """
+        :rtype: tuple(int, int, int)
+        :return: CSS2 specificity, as used by Qt to sort conflicting rules.
+        """
+        ids = others = types = 0
+        for _combinator, compound in self.parts:
+            if compound.object_name is not None:
+                ids += 1
+            if compound.type_name not in (None, '*'):
+                types += 1
+            if compound.exact_class is not None:
+                others += 1
+            others += len(compound.attributes) + len(compound.pseudo_states)
+        return ids, others, types
+
+
+def split_selector_group(text):
+    """
+    Splits a selector group like `QLabel, QLineEdit` in its selectors.
+
+    :param unicode text: selector text of a rule.
+    :rtype: list(unicode)
+    """
+    if ',' not in text:
+        text = text.strip()
+        return [text] if text else []
+    selectors = []
+    quote = None
+    depth = 0
+    start = 0
+    for index, char in enumerate(text):
+        if quote is not None:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '[(':
+            depth += 1
+        elif char in '])':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(text[start:index].strip())
+            start = index + 1
+    selectors.append(text[start:].strip())
+    return [selector for selector in selectors if selector]
+
+
+def parse_selector(text):
+    """
+    Parses a single selector (not a group).
+
+    :param unicode text: selector text.
+    :rtype: Selector
+    :raise ValueError: if text is not a valid selector.
+    """
+    text = text.strip()
+    parts = []
+    combinator = None
+    compound = None
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:
+            raise ValueError('Invalid selector: {!r}'.format(text))
+        pos = match.end()
+        kind = match.lastgroup
+        if kind in ('child', 'descendant'):
+            if compound is None:
+                raise ValueError('Invalid selector: {!r}'.format(text))
+            parts.append((combinator, compound))
+            combinator = CHILD if kind == 'child' else DESCENDANT
+            compound = None
+            continue
+        if compound is None:
+            compound = CompoundSelector()
+        value = match.group(kind)
+        if kind == 'type':
+            if compound.type_name is not None:
+                raise ValueError('Invalid selector: {!r}'.format(text))
+            compound.type_name = value
+        elif kind == 'exact':
+            compound.exact_class = value[1:]
+        elif kind == 'id':
+            compound.object_name = value[1:]
+        elif kind == 'subcontrol':
+            compound.subcontrol = value[2:]
+        elif kind == 'pseudo':
+            compound.pseudo_states += (value[1:],)
+        else:
+            attribute_value = match.group('attr_dq')
+            if attribute_value is None:
+                attribute_value = match.group('attr_sq')
+            if attribute_value is None:
+                attribute_value = match.group('attr_bare')
+            compound.attributes += ((
+                match.group('attr_name'),
+                match.group('attr_op'),
+                attribute_value,
+            ),)
+    if compound is None:
+        raise ValueError('Invalid selector: {!r}'.format(text))
+    parts.append((combinator, compound))
+    return Selector(text, parts)
+
+
+def widget_class_names(widget):
+    """
+    :param QWidget widget: a widget.
+    :rtype: list(unicode)
+    :return: class name of widget followed by all its super classes' names,
+        as known by Qt meta object system.
+    """
+    names = []
+    meta_object = widget.metaObject()
+    while meta_object is not None:
+        names.append(meta_object.className().replace('::', '--'))
+        meta_object = meta_object.superClass()
+    return names
+
+
+def _property_text(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return '{}'.format(value)
+
+
+def _attribute_matches(widget, name, operator, expected):
+    value = widget.property(name)
+    if value is None:
+        return False
+    if operator is None:
+        return True
+    if operator == '~=':
+        if isinstance(value, (list, tuple)):
+            return expected in [_property_text(item) for item in value]
+        return expected in _property_text(value).split()
+    if operator == '|=':
+        text = _property_text(value)
+        return text == expected or text.startswith(expected + '-')
+    return _property_text(value) == expected
+
+
+# Pseudo states a widget can only be in when it has a property enabled, like
+# `:read-only` for read only line edits. Other pseudo states depend on runtime
+# state, like `:hover`, and are assumed to be possible.
+_PSEUDO_STATE_PROPERTIES = {
+    'editable': 'editable',
+    'read-only': 'readOnly',
+    'flat': 'flat',
+}
+
+# Pseudo states of buttons that need them to be checkable. Other widgets use
+# them for other states, like `QComboBox:on` for an open popup.
+_CHECK_PSEUDO_STATES = frozenset([
+    'checked', 'unchecked', 'indeterminate', 'on', 'off'])
+
+# Classes whose check pseudo states need `checkable` property enabled
+_CHECKABLE_CLASSES = frozenset(['QAbstractButton', 'QGroupBox'])
+
+
+def pseudo_state_possible(state, widget, class_names=None):
+    """
+    :param unicode state: pseudo state, like `checked` or `!hover`.
+    :param QWidget widget: a widget.
+    :param list(unicode)|None class_names: class names of widget, as returned
+        by `widget_class_names`, when already known.
+    :rtype: bool
+    :return: if widget can be in pseudo state, given its current
+        properties. Negated and runtime pseudo states are always possible.
+    """
+    if state in _CHECK_PSEUDO_STATES:
+        if class_names is None:
+            class_names = widget_class_names(widget)
+        if _CHECKABLE_CLASSES.isdisjoint(class_names):
+            return True
+        property_name = 'checkable'
+    else:
+        property_name = _PSEUDO_STATE_PROPERTIES.get(state)
+    return property_name is None or bool(widget.property(property_name))
+
+
+def compound_matches(compound, widget, class_names=None,
+                     pseudo_states=False):
+    """
+    Checks if a compound selector can match a widget. Sub-controls depend on
+    runtime state and are assumed to match, like pseudo states unless
+    `pseudo_states` is enabled.
+
+    :param CompoundSelector compound: compound selector.
+    :param QWidget widget: widget to match.
+    :param list(unicode)|None class_names: class names of widget, as returned
+        by `widget_class_names`, when already known.
+    :param bool pseudo_states: if pseudo states widget can never be in, like
+        `:checked` for a button that isn't checkable, don't match, see
+        `pseudo_state_possible`. Pseudo states of sub-controls are assumed
+        to be possible.
+    :rtype: bool
+    """
+    if (compound.object_name is not None and
+            widget.objectName() != compound.object_name):
+        return False
+    if compound.type_name not in (None, '*') or compound.exact_class:
+        if class_names is None:
+            class_names = widget_class_names(widget)
+        if (compound.type_name not in (None, '*') and
+                compound.type_name not in class_names):
+            return False
+        if (compound.exact_class is not None and
+                class_names[0] != compound.exact_class):
+            return False
+    for name, operator, expected in compound.attributes:
+        if not _attribute_matches(widget, name, operator, expected):
+            return False
+    # Pseudo states of sub-controls are the ones of items or parts of
+    # widget, like `QMenu::item:checked`, not of widget itself
+    if pseudo_states and compound.subcontrol is None:
+        for state in compound.pseudo_states:
+            if not pseudo_state_possible(state, widget, class_names):
+                return False
+    return True
+
+
+def selector_matches(selector, widget, class_names=None,
+                     pseudo_states=False):
+    """
+    Checks if a selector can match a widget, considering its ancestors for
+    descendant and child combinators.
+
+    :param Selector selector: selector.
+    :param QWidget widget: widget to match.
+    :param list(unicode)|None class_names: see `compound_matches`.
+    :param bool pseudo_states: see `compound_matches`.
+    :rtype: bool
+    """
+    if not compound_matches(
+            selector.subject, widget, class_names, pseudo_states):
+        return False
+    return _ancestors_match(
+        selector.parts, len(selector.parts) - 1, widget, pseudo_states)
+
+
+def _ancestors_match(parts, index, widget, pseudo_states=False):
+    combinator = parts[index][0]
+    if combinator is None:
+        return True
+    compound = parts[index - 1][1]
+    ancestor = widget.parentWidget()
+    while ancestor is not None:
+        if compound_matches(compound, ancestor, pseudo_states=pseudo_states):
+            if _ancestors_match(parts, index - 1, ancestor, pseudo_states):
+                return True
+        if combinator == CHILD:
+            return False
+        ancestor = ancestor.parentWidget()
+    return False
+
+
+class WidgetIndex(object):
+    """
+    Index of widgets by class names and object name, used to match selectors
+    against many widgets without checking every widget for every selector.
+    """
+
+    def __init__(self, widgets):
+        """
+        :param iterable(QWidget) widgets: widgets to index.
+        """
+        self.widgets = list(widgets)
+        self._class_names = {}
+        self._by_class = {}
+        self._by_object_name = {}
+        for widget in self.widgets:
+            class_names = widget_class_names(widget)
+            self._class_names[id(widget)] = class_names
+            for name in class_names:
+                self._by_class.setdefault(name, []).append(widget)
+            self._by_object_name.setdefault(
+                widget.objectName(), []).append(widget)
+
+    def candidates(self, compound):
+        """
+        :param CompoundSelector compound: compound selector.
+        :rtype: list(QWidget)
+        :return: smallest indexed set of widgets that can match compound,
+            they still must be checked with `compound_matches`.
+        """
+        candidates = self.widgets
+        if compound.object_name is not None:
+            candidates = self._by_object_name.get(compound.object_name, [])
+        for name in (compound.type_name, compound.exact_class):
+            if name not in (None, '*'):
+                by_class = self._by_class.get(name, [])
+                if len(by_class) < len(candidates):
+                    candidates = by_class
+        return candidates
+
+    def matches(self, selector, pseudo_states=False):
+        """
+        :param Selector selector: selector.
+        :param bool pseudo_states: see `compound_matches`.
+        :rtype: list(QWidget)
+        :return: indexed widgets selector can match.
+        """
+        return [
+            widget
+            for widget in self.candidates(selector.subject)
+            if selector_matches(
+                selector, widget, self._class_names[id(widget)],
+                pseudo_states)
+        ]
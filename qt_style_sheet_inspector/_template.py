@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import io
+import os
+import re
+from collections import namedtuple
+
+from ._qss import TOKEN_COMMENT, ParsedStyleSheet, strip_comments, \
+    tokenize
+
+# Top level at-rule statements: `@name: value;` defines a variable and
+# `@import "file.qss";` includes a file
+_STATEMENT_RE = re.compile(r'@([\w-]+)\s*(:?)\s*([^;]*);')
+# References to variables, `@` inside words (like `icon@2x.png`) isn't one
+_REFERENCE_RE = re.compile(r'(?<![\w@])@([A-Za-z_][\w-]*)')
+_IMPORT_RE = re.compile(
+    r'''^(?:"([^"]*)"|'([^']*)'|url\(\s*["']?([^"')]*)["']?\s*\))$''')
+
+CompiledTemplate = namedtuple('CompiledTemplate', [
+    # Plain QSS text
+    'text',
+    # `(selector, declarations)` of each rule of text, as returned by
+    # `split_rules`
+    'rules',
+])
+
+
+class TemplateError(ValueError):
+    """
+    Raised when a style sheet template can't be compiled.
+    """
+
+
+class StyleSheetTemplate(object):
+    """
+    Compiles style sheet templates to plain QSS.
+
+    Templates are style sheets with top level at-rule statements, which Qt
+    itself would skip:
+
+    * `@name: value;` defines a variable, used as `@name` in rules or in
+      values of other variables. Variables are global, the last definition
+      wins.
+    * `@import "file.qss";` (or `@import url(file.qss);`) includes the rules
+      and variables of a template file, searched in the directory of the
+      including file and in `include_paths`.
+
+    Each rule is a fragment compiled on its own and memoized by its text and
+    the values of the variables it references, so a compile only substitutes
+    rules whose text or variables changed since previous compile. Included
+    files are read again only when their modification time changes, and
+    compiling the same text with the same included files again returns the
+    previous result right away.
+    """
+
+    def __init__(self, include_paths=None):
+        """
+        :param list(unicode)|None include_paths: directories where imported
+            files are searched, by default the current directory.
+        """
+        self.include_paths = list(include_paths or [os.curdir])
+        # `(fragment, values)` to `(text, (selector, declarations))`, only
+        # fragments of latest compile are kept
+        self._fragments = {}
+        # Fragment to names of variables it references
+        self._references = {}
+        # Path to `(modification time, ParsedStyleSheet)` of imported files
+        self._files = {}
+        # Modification time of files imported by current compile, by path
+        self._imports = {}
+        # Text, imports and result of previous compile
+        self._previous = (None, None, None)
+
+    def compile(self, text, rules=None):
+        """
+        :param unicode text: template text.
+        :param list(Rule)|None rules: parsed rules of text, if already known,
+            see `ParsedStyleSheet`.
+        :rtype: CompiledTemplate
+        :raise TemplateError: if a variable is not defined, a variable
+            definition or an import is circular, or an imported file can't
+            be read.
+        """
+        previous_text, previous_imports, previous_result = self._previous
+        if text == previous_text and all(
+                self._mtime(path) == mtime
+                for path, mtime in previous_imports.items()):
+            return previous_result
+
+        if rules is None:
+            rules = ParsedStyleSheet(text).rules
+        variables = {}
+        fragments = []
+        self._imports = {}
+        self._collect(text, rules, None, variables, fragments, [])
+        values = {}
+        for name in variables:
+            self._resolve(name, variables, values, [])
+
+        compiled_fragments = {}
+        references = {}
+        texts = []
+        compiled_rules = []
+        for fragment, rule in fragments:
+            names = self._references.get(fragment)
+            if names is None:
+                names = tuple(sorted(set(
+                    _REFERENCE_RE.findall(strip_comments(fragment)))))
+            references[fragment] = names
+            if not names:
+                texts.append(fragment)
+                compiled_rules.append((rule.selector, rule.body))
+                continue
+            for name in names:
+                if name not in values:
+                    raise TemplateError(
+                        'Undefined variable "@{}"'.format(name))
+            key = (fragment, tuple(values[name] for name in names))
+            compiled = self._fragments.get(key)
+            if compiled is None:
+                compiled = self._compileFragment(fragment, rule, values)
+            compiled_fragments[key] = compiled
+            texts.append(compiled[0])
+            compiled_rules.append(compiled[1])
+        self._fragments = compiled_fragments
+        self._references = references
+        result = CompiledTemplate('\n'.join(texts), compiled_rules)
+        self._previous = (text, self._imports, result)
+        return result
+
+    def _collect(self, text, rules, directory, variables, fragments,
+                 importing):
+        """
+        Collects variables and rule fragments of a template, following
+        imports.
+
+        :param unicode text: template text.
+        :param list(Rule) rules: parsed rules of text.
+        :param unicode|None directory: directory of template file, if any.
+        :param dict variables: collected variable definitions.
+        :param list fragments: collected `(rule text, Rule)` pairs.
+        :param list(unicode) importing: paths of files being imported.
+        """
+        start = 0
+        for rule in rules + [None]:
+            end = len(text) if rule is None else rule.start
+            gap = text[start:end]
+            if '@' in gap:
+                self._collectStatements(
+                    strip_comments(gap), directory, variables, fragments,
+                    importing)
+            if rule is not None:
+                fragments.append((text[rule.start:rule.end], rule))
+                start = rule.end
+
+    def _collectStatements(self, text, directory, variables, fragments,
+                           importing):
+        """
+        Collects variables and imports of text between rules.
+        """
+        for match in _STATEMENT_RE.finditer(text):
+            name, colon, value = match.groups()
+            if colon:
+                variables[name] = value.strip()
+            elif name == 'import':
+                self._import(
+                    value.strip(), directory, variables, fragments, importing)
+
+    def _import(self, argument, directory, variables, fragments, importing):
+        match = _IMPORT_RE.match(argument)
+        if match is None:
+            raise TemplateError('Invalid import: {}'.format(argument))
+        name = next(group for group in match.groups() if group is not None)
+        directories = self.include_paths
+        if directory is not None:
+            directories = [directory] + directories
+        for include_path in directories:
+            path = os.path.abspath(os.path.join(include_path, name))
+            if os.path.isfile(path):
+                break
+        else:
+            raise TemplateError('Imported file not found: {}'.format(name))
+        if path in importing:
+            raise TemplateError('Circular import: {}'.format(name))
+
+        try:
+            mtime = self._imports[path] = os.path.getmtime(path)
+            cached = self._files.get(path)
+            if cached is None or cached[0] != mtime:
+                with io.open(path, encoding='utf-8') as template_file:
+                    cached = (mtime, ParsedStyleSheet(template_file.read()))
+                self._files[path] = cached
+        except (IOError, OSError) as e:
+            raise TemplateError('Could not import {}: {}'.format(name, e))
+        parsed = cached[1]
+        self._collect(
+            parsed.text, parsed.rules, os.path.dirname(path), variables,
+            fragments, importing + [path])
+
+    def _resolve(self, name, variables, values, resolving):
+        """
+        :rtype: unicode
+        :return: value of variable, with references to other variables
+            replaced by their values.
+        """
+        if name in values:
+            return values[name]
+        if name not in variables:
+            raise TemplateError('Undefined variable "@{}"'.format(name))
+        if name in resolving:
+            raise TemplateError('Circular variable "@{}"'.format(name))
+        value = _REFERENCE_RE.sub(
+            lambda match: self._resolve(
+                match.group(1), variables, values, resolving + [name]),
+            variables[name])
+        values[name] = value
+        return value
+
+    def _compileFragment(self, fragment, rule, values):
+        """
+        :rtype: tuple(unicode, tuple(unicode, unicode))
+        :return: fragment text with variables replaced, and its rule as
+            `(selector, declarations)`.
+        """
+        def substitute(text):
+            return _REFERENCE_RE.sub(
+                lambda match: values[match.group(1)], text)
+
+        def replace(text):
+            # Comments are kept as they are, references in them are just
+            # text
+            pieces = []
+            start = 0
+            for kind, token_start, token_end in tokenize(text):
+                if kind == TOKEN_COMMENT:
+                    pieces.append(substitute(text[start:token_start]))
+                    pieces.append(text[token_start:token_end])
+                    start = token_end
+            pieces.append(substitute(text[start:]))
+            return ''.join(pieces)
+
+        return replace(fragment), (
+            ' '.join(replace(rule.selector).split()),
+            ' '.join(replace(rule.body).split()),
+        )
+
+    def _mtime(self, path):
+        """
+        :rtype: float|None
+        :return: modification time of file, `None` if it doesn't exist.
+        """
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import time
+from collections import namedtuple
+
+from ._selectors import parse_selector
+
+# Severities of problems. Qt refuses a whole style sheet with errors, while
+# warnings are silently ignored by it.
+SEVERITY_ERROR = 'error'
+SEVERITY_WARNING = 'warning'
+
+Problem = namedtuple('Problem', [
+    # Offsets of problem in style sheet text
+    'start',
+    'end',
+    # One of `SEVERITY_*`
+    'severity',
+    'message',
+])
+
+# Properties supported by Qt style sheets, see "Qt Style Sheets Reference"
+QSS_PROPERTIES = frozenset([
+    'alternate-background-color', 'background', 'background-attachment',
+    'background-clip', 'background-color', 'background-image',
+    'background-origin', 'background-position', 'background-repeat',
+    'border', 'border-bottom', 'border-bottom-color',
+    'border-bottom-left-radius', 'border-bottom-right-radius',
+    'border-bottom-style', 'border-bottom-width', 'border-color',
+    'border-image', 'border-left', 'border-left-color', 'border-left-style',
+    'border-left-width', 'border-radius', 'border-right',
+    'border-right-color', 'border-right-style', 'border-right-width',
+    'border-style', 'border-top', 'border-top-color',
+    'border-top-left-radius', 'border-top-right-radius', 'border-top-style',
+    'border-top-width', 'border-width', 'bottom', 'button-layout', 'color',
+    'dialogbuttonbox-buttons-have-icons', 'font', 'font-family', 'font-size',
+    'font-style', 'font-weight', 'gridline-color', 'height', 'icon',
+    'icon-size', 'image', 'image-position', 'left',
+    'lineedit-password-character', 'lineedit-password-mask-delay', 'margin',
+    'margin-bottom', 'margin-left', 'margin-right', 'margin-top',
+    'max-height', 'max-width', 'messagebox-text-interaction-flags',
+    'min-height', 'min-width', 'opacity', 'outline',
+    'outline-bottom-left-radius', 'outline-bottom-right-radius',
+    'outline-color', 'outline-offset', 'outline-radius', 'outline-style',
+    'outline-top-left-radius', 'outline-top-right-radius', 'padding',
+    'padding-bottom', 'padding-left', 'padding-right', 'padding-top',
+    'paint-alternating-row-colors-for-empty-area', 'placeholder-text-color',
+    'position', 'right', 'selection-background-color', 'selection-color',
+    'show-decoration-selected', 'spacing', 'subcontrol-origin',
+    'subcontrol-position', 'text-align', 'text-decoration',
+    'titlebar-show-tooltips-on-buttons', 'top', 'widget-animation-duration',
+    'width',
+])
+# Prefixes of properties that can't be listed: widget Qt properties and Qt
+# extensions
+QSS_PROPERTY_PREFIXES = ('qproperty-', '-qt-')
+
+# Pseudo states supported by Qt style sheets, see "Qt Style Sheets Reference"
+QSS_PSEUDO_STATES = frozenset([
+    'active', 'adjoins-item', 'alternate', 'bottom', 'checked', 'closable',
+    'closed', 'default', 'disabled', 'edit-focus', 'editable', 'enabled',
+    'exclusive', 'first', 'flat', 'floatable', 'focus', 'has-children',
+    'has-siblings', 'horizontal', 'hover', 'indeterminate', 'last', 'left',
+    'maximized', 'middle', 'minimized', 'movable', 'next-selected',
+    'no-frame', 'non-exclusive', 'off', 'on', 'only-one', 'open', 'pressed',
+    'previous-selected', 'read-only', 'right', 'selected', 'top',
+    'unchecked', 'vertical', 'window',
+])
+
+
+def rule_problems(rule, text):
+    """
+    Validates selectors and declarations of a rule.
+
+    Unknown properties and pseudo states are warnings, like selectors the
+    inspector can't parse, since Qt may still support them. Declarations
+    without property are errors.
+
+    :param Rule rule: a parsed rule.
+    :param unicode text: style sheet text of rule.
+    :rtype: list(Problem)
+    :return: problems of rule, with offsets relative to rule start.
+    """
+    problems = []
+    for selector_text in rule.selectors():
+        try:
+            selector = parse_selector(selector_text)
+        except ValueError as e:
+            problems.append(Problem(
+                0, rule.body_start, SEVERITY_WARNING, '{}'.format(e)))
+            continue
+        for _combinator, compound in selector.parts:
+            for state in compound.pseudo_states:
+                if state.lstrip('!') not in QSS_PSEUDO_STATES:
+                    problems.append(Problem(
+                        0, rule.body_start, SEVERITY_WARNING,
+                        'Unknown pseudo state ":{}"'.format(state)))
+
+    for declaration in rule.declarations:
+        # Leading and trailing white space is left out of problems, so they
+        # point to the declaration itself
+        source = text[rule.start + declaration.start:
+                      rule.start + declaration.end]
+        start = declaration.start + len(source) - len(source.lstrip())
+        end = declaration.start + len(source.rstrip())
+        name = declaration.name
+        if not name:
+            problems.append(Problem(
+                start, end, SEVERITY_ERROR, 'Declaration without property'))
+        elif (name.lower() not in QSS_PROPERTIES and
+                not name.startswith(QSS_PROPERTY_PREFIXES)):
+            problems.append(Problem(
+                start, end, SEVERITY_WARNING,
+                'Unknown property "{}"'.format(name)))
+    return problems
+
+
+def validate_rules(rules, text, deadline=None):
+    """
+    Validates rules that weren't validated yet, caching their problems in
+    `Rule.problems`. Rules keep their problems while they aren't edited, so
+    only edited rules are validated again.
+
+    :param list(Rule) rules: parsed rules.
+    :param unicode text: style sheet text of rules.
+    :param float|None deadline: `time.perf_counter()` when validation stops.
+    :rtype: bool
+    :return: if all rules are validated.
+    """
+    count = 0
+    for rule in rules:
+        if rule.problems is not None:
+            continue
+        rule.problems = rule_problems(rule, text)
+        count += 1
+        if (deadline is not None and count % 64 == 0 and
+                time.perf_counter() > deadline):
+            return False
+    return True
+
+
+def style_sheet_problems(parsed_style_sheet):
+    """
+    :param ParsedStyleSheet parsed_style_sheet: parsed style sheet text.
+    :rtype: list(Problem)
+    :return: parse errors and rule problems of style sheet, sorted by
+        offset.
+    """
+    validate_rules(parsed_style_sheet.rules, parsed_style_sheet.text)
+    problems = [
+        Problem(error.start, error.end, SEVERITY_ERROR, error.message)
+        for error in parsed_style_sheet.errors
+    ]
+    for rule in parsed_style_sheet.rules:
+        for problem in rule.problems:
+            problems.append(problem._replace(
+                start=problem.start + rule.start,
+                end=problem.end + rule.start))
+    problems.sort()
+    return problems
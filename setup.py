@@ -25,7 +25,16 @@ setup(
     package_dir={'qt_style_sheet_inspector':
                  'qt_style_sheet_inspector'},
     include_package_data=True,
+    entry_points={
+        'console_scripts': [
+            'qss-perf-gate = qt_style_sheet_inspector._perf_gate:main',
+        ],
+    },
     install_requires=requirements,
+    extras_require={
+        # Counts changed pixels of sandbox previews
+        'preview': ['numpy'],
+    },
     license="MIT license",
     zip_safe=False,
     keywords='qt_style_sheet_inspector',
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in app with a `StyleSheetAgent`, run in its own process by tests.
+Prints "ready" once agent listens.
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import sys
+
+from PyQt5.QtWidgets import QApplication, QLabel, QPushButton, QWidget
+from qt_style_sheet_inspector import StyleSheetAgent
+
+
+def main():
+    app = QApplication(sys.argv)
+    app.setStyleSheet('QLabel { color: red; }')
+    root = QWidget()
+    QLabel('label', root)
+    QPushButton('button', root)
+    root.show()
+    agent = StyleSheetAgent()
+    if not agent.listen(sys.argv[1]):
+        return 1
+    print('ready')
+    sys.stdout.flush()
+    return app.exec_()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from PyQt5.QtWidgets import QLabel, QPushButton, QWidget
+from qt_style_sheet_inspector._census import StyleSheetCensus, \
+    StyleSheetCensusDialog, widget_path
+
+
+def paths(census):
+    return [(entry.path, entry.size) for entry in census.entries()]
+
+
+def test_census(qtbot):
+    root = QWidget()
+    root.setObjectName('root')
+    qtbot.addWidget(root)
+    label = QLabel(root)
+    label.setStyleSheet('color: red;')
+    excluded = QWidget()
+    qtbot.addWidget(excluded)
+    QPushButton(excluded).setStyleSheet('color: blue;')
+    assert widget_path(label) == 'QWidget#root/QLabel'
+
+    census = StyleSheetCensus(excluded=excluded)
+    try:
+        assert paths(census) == [('QWidget#root/QLabel', 11)]
+
+        # Changes are followed without walking widget tree again
+        button = QPushButton(root)
+        button.setObjectName('ok')
+        button.setStyleSheet('color: green; margin: 0px;')
+        label.setStyleSheet('')
+        assert paths(census) == [('QWidget#root/QPushButton#ok', 26)]
+
+        child = QWidget()
+        QLabel(child).setStyleSheet('border: 0px;')
+        child.setParent(root)
+        assert paths(census) == [
+            ('QWidget#root/QPushButton#ok', 26),
+            ('QWidget#root/QWidget/QLabel', 12),
+        ]
+
+        # Detached subtrees are dropped, and added back when reattached
+        child.setParent(None)
+        assert paths(census) == [('QWidget#root/QPushButton#ok', 26)]
+        child.setParent(root)
+        assert len(paths(census)) == 2
+
+        child.deleteLater()
+        button.deleteLater()
+        qtbot.waitUntil(lambda: paths(census) == [])
+
+        census.stop()
+        census.excluded = None
+        dialog = StyleSheetCensusDialog([
+            entry for entry in census.entries()
+            if entry.widget.parentWidget() is excluded])
+        assert dialog.summary_label.text() == '1 widgets, 0.0 KB'
+        assert dialog.table.item(0, 0).text() == 'QWidget/QPushButton'
+    finally:
+        census.stop()
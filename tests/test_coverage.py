@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from PyQt5.QtWidgets import QComboBox, QLabel, QMenu, QPushButton, \
+    QTreeView, QWidget
+from qt_style_sheet_inspector._coverage import RuleCoverageDialog, \
+    prune_style_sheet, rule_coverage
+from qt_style_sheet_inspector._qss import ParsedStyleSheet
+
+STYLE_SHEET = """\
+QPushButton { color: red; }
+/* dead */
+QPushButton:flat { margin: 1px; }
+QPushButton:checked, QLabel:!checked { margin: 2px; }
+#missing { margin: 3px; }
+QLabel[ { margin: 4px; }
+QWidget#root > QLabel { margin: 5px; }
+"""
+
+
+def _make_widgets(qtbot):
+    root = QWidget()
+    root.setObjectName('root')
+    qtbot.addWidget(root)
+    QLabel(root)
+    QLabel(root)
+    button = QPushButton(root)
+    return root, button
+
+
+def test_rule_coverage(qtbot):
+    root, button = _make_widgets(qtbot)
+    widgets = root.findChildren(QWidget) + [root]
+    parsed = ParsedStyleSheet(STYLE_SHEET)
+    coverage = rule_coverage(parsed, widgets)
+    assert [(c.selector, c.line, c.matched_count) for c in coverage] == [
+        ('QPushButton', 1, 1),
+        ('QPushButton:flat', 3, 0),
+        ('QPushButton:checked, QLabel:!checked', 4, 2),
+        ('#missing', 5, 0),
+        ('QLabel[', 6, None),
+        ('QWidget#root > QLabel', 7, 2),
+    ]
+
+    # Checked state is possible once button is checkable
+    button.setCheckable(True)
+    coverage = rule_coverage(parsed, widgets)
+    assert coverage[2].matched_count == 3
+
+    assert prune_style_sheet(STYLE_SHEET, coverage) == """\
+QPushButton { color: red; }
+/* dead */
+QPushButton:checked, QLabel:!checked { margin: 2px; }
+QLabel[ { margin: 4px; }
+QWidget#root > QLabel { margin: 5px; }
+"""
+
+
+def test_rule_coverage_item_states(qtbot):
+    root = QWidget()
+    qtbot.addWidget(root)
+    QMenu(root)
+    QTreeView(root)
+    QComboBox(root)
+    QLabel(root)
+    parsed = ParsedStyleSheet("""\
+QMenu::item:checked { color: red; }
+QTreeView::indicator:checked { color: red; }
+QComboBox:on { color: red; }
+QGroupBox:checked { color: red; }
+""")
+    coverage = rule_coverage(parsed, root.findChildren(QWidget))
+    # Sub-control and non button states aren't known to be impossible
+    assert [c.matched_count for c in coverage] == [1, 1, 1, 0]
+
+
+def test_rule_coverage_dialog(qtbot):
+    root, _button = _make_widgets(qtbot)
+    coverage = rule_coverage(
+        ParsedStyleSheet(STYLE_SHEET), root.findChildren(QWidget))
+    dialog = RuleCoverageDialog(coverage, STYLE_SHEET)
+    qtbot.addWidget(dialog)
+    assert dialog.summary_label.text().startswith('2 of 6 rules')
+    assert dialog.table.rowCount() == 2
+    assert dialog.table.item(1, 0).text() == '#missing'
+    assert dialog.table.item(1, 1).text() == '5'
+    with qtbot.waitSignal(dialog.ruleActivated) as blocker:
+        dialog.table.cellDoubleClicked.emit(1, 0)
+    start, end = blocker.args
+    assert STYLE_SHEET[start:end] == '#missing { margin: 3px; }'
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import io
+import os
+
+import pytest
+from qt_style_sheet_inspector._files import StyleSheetFiles
+
+
+def write(path, text):
+    with io.open(path, 'w', encoding='utf-8') as qss_file:
+        qss_file.write(text)
+
+
+@pytest.fixture
+def qss_paths(tmpdir):
+    paths = [str(tmpdir.join('a.qss')), str(tmpdir.join('b.qss'))]
+    write(paths[0], 'QLabel { color: red; }')
+    write(paths[1], 'QLineEdit { color: blue; }')
+    return paths
+
+
+def test_link(qtbot, qss_paths):
+    files = StyleSheetFiles()
+    with qtbot.waitSignal(files.changed, timeout=100):
+        files.link(qss_paths)
+    assert files.paths() == qss_paths
+    assert files.styleSheet() == \
+        'QLabel { color: red; }\nQLineEdit { color: blue; }'
+
+    with qtbot.assertNotEmitted(files.changed):
+        files.link(qss_paths[:1])
+
+    with qtbot.waitSignal(files.changed, timeout=100):
+        files.unlink(qss_paths[:1])
+    assert files.styleSheet() == 'QLineEdit { color: blue; }'
+
+
+def test_link_missing_file(qss_paths):
+    files = StyleSheetFiles()
+    with pytest.raises(IOError):
+        files.link(qss_paths + [qss_paths[0] + '.missing'])
+    assert files.paths() == []
+
+
+def test_reload(qtbot, qss_paths, monkeypatch):
+    files = StyleSheetFiles()
+    files.reload_delay = 50
+    files.link(qss_paths)
+    read_paths = []
+    original_read = files._read
+
+    def read(path):
+        read_paths.append(path)
+        return original_read(path)
+
+    monkeypatch.setattr(files, '_read', read)
+
+    # A burst of writes is read once, and only changed file is read
+    with qtbot.waitSignal(files.changed):
+        for i in range(5):
+            write(qss_paths[1], 'QLineEdit {{ margin: {}px; }}'.format(i))
+    assert read_paths == [qss_paths[1]]
+    assert files.styleSheet().endswith('QLineEdit { margin: 4px; }')
+
+    # Files replaced by editors are still watched
+    replacement = qss_paths[0] + '.tmp'
+    write(replacement, 'QLabel { color: green; }')
+    with qtbot.waitSignal(files.changed):
+        os.replace(replacement, qss_paths[0])
+    assert files.styleSheet().startswith('QLabel { color: green; }')
+    with qtbot.waitSignal(files.changed):
+        write(qss_paths[0], 'QLabel { color: black; }')
+    assert files.styleSheet().startswith('QLabel { color: black; }')
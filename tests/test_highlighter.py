@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QTextEdit
+from qt_style_sheet_inspector._highlighter import SPAN_COMMENT, \
+    SPAN_PROPERTY, SPAN_PUNCTUATION, SPAN_SELECTOR, SPAN_STRING, SPAN_VALUE, \
+    STATE_IN_COMMENT, STATE_PROPERTY, STATE_SELECTOR, STATE_VALUE, \
+    StyleSheetHighlighter, highlight_line
+
+
+def spans_text(text, spans):
+    return [
+        (text[start:start + length], kind) for start, length, kind in spans]
+
+
+def test_highlight_line():
+    text = 'QLabel:hover { color: "red"; /* x */'
+    state, spans = highlight_line(text, STATE_SELECTOR)
+    assert state == STATE_PROPERTY
+    assert spans_text(text, spans) == [
+        ('QLabel', SPAN_SELECTOR),
+        (':', SPAN_SELECTOR),
+        ('hover ', SPAN_SELECTOR),
+        ('{', SPAN_PUNCTUATION),
+        (' color', SPAN_PROPERTY),
+        (':', SPAN_PUNCTUATION),
+        (' ', SPAN_VALUE),
+        ('"red"', SPAN_STRING),
+        (';', SPAN_PUNCTUATION),
+        (' ', SPAN_PROPERTY),
+        ('/* x */', SPAN_COMMENT),
+    ]
+
+    state, spans = highlight_line('  margin: 0px /* a', STATE_PROPERTY)
+    assert state == STATE_VALUE | STATE_IN_COMMENT
+    state, spans = highlight_line('b */ }', state)
+    assert state == STATE_SELECTOR
+    assert spans_text('b */ }', spans)[0] == ('b */', SPAN_COMMENT)
+
+
+def block_formats(text_edit, number):
+    block = text_edit.document().findBlockByNumber(number)
+    return [
+        (block.text()[r.start:r.start + r.length],
+         r.format.foreground().color().name())
+        for r in block.layout().formats()
+    ]
+
+
+def test_highlighter(qtbot):
+    text_edit = QTextEdit()
+    qtbot.addWidget(text_edit)
+    text_edit.resize(300, 100)
+    text_edit.show()
+    highlighter = StyleSheetHighlighter(text_edit)
+    highlighter.IDLE_BATCH_TIME = 0.0
+    text_edit.setPlainText(''.join(
+        'QLabel#l{} {{\n    color: red;\n}}\n'.format(i) for i in range(200)))
+
+    # Visible blocks are highlighted first, the remaining ones in idle time
+    qtbot.waitUntil(lambda: block_formats(text_edit, 0) != [])
+    assert not highlighter.isFinished()
+    qtbot.waitUntil(highlighter.isFinished)
+    comment = highlighter.formats[SPAN_COMMENT].foreground().color().name()
+    last_block = text_edit.document().blockCount() - 2
+    assert block_formats(text_edit, last_block)[0][1] != comment
+
+    # Opening a comment changes highlight of all following blocks
+    cursor = QTextCursor(text_edit.document())
+    cursor.insertText('/*')
+    qtbot.waitUntil(highlighter.isFinished)
+    assert block_formats(text_edit, last_block) == [('}', comment)]
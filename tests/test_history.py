@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import pytest
+from qt_style_sheet_inspector._history import HistoryLog, \
+    StyleSheetHistory, apply_delta, compute_delta
+
+
+def _make_states(count):
+    base = ''.join(
+        'QLabel#label{} {{ margin: {}px; }}\n'.format(i, i)
+        for i in range(2000))
+    return [base.replace('margin: 7px', 'margin: {}em'.format(i))
+            for i in range(count)]
+
+
+@pytest.mark.parametrize('old, new', [
+    ('', ''),
+    ('abc', 'abc'),
+    ('abc', 'abxc'),
+    ('abc', ''),
+    ('aaaa', 'aa'),
+    ('x' * 10000 + 'y', 'x' * 10000 + 'z' + 'x' * 5000),
+])
+def test_delta(old, new):
+    delta = compute_delta(old, new)
+    assert apply_delta(old, delta) == new
+    assert len(delta[2]) <= len(new)
+
+
+def test_history():
+    states = _make_states(40)
+    history = StyleSheetHistory(snapshot_interval=8)
+    for state in states:
+        assert history.append(state) == 0
+    assert len(history) == len(states)
+    assert [history[i] for i in range(len(states))] == states
+    assert [history[i] for i in reversed(range(len(states)))] == \
+        list(reversed(states))
+    assert history[-1] == states[-1]
+
+    # Deltas keep history a lot smaller than a list of copies
+    assert history.memoryUsage() < sum(len(s) for s in states) // 4
+
+    history.truncate(10)
+    assert len(history) == 10
+    assert history[-1] == states[9]
+
+
+def test_history_dedupe():
+    states = _make_states(2)
+    history = StyleSheetHistory(snapshot_interval=1)
+    history.append(states[0])
+    memory = history.memoryUsage()
+    history.append(states[1])
+    history.append(states[0])
+    assert history.memoryUsage() < 3 * memory
+    assert history[2] == states[0]
+
+
+def test_history_eviction():
+    states = _make_states(20)
+    history = StyleSheetHistory(snapshot_interval=4)
+    history.append(states[0])
+    history.max_memory = history.memoryUsage() * 2
+    evicted = sum(history.append(state) for state in states[1:])
+    assert evicted > 0
+    assert len(history) == len(states) - evicted
+    assert history.memoryUsage() <= history.max_memory
+    assert [history[i] for i in range(len(history))] == states[evicted:]
+
+
+def test_history_log(tmpdir):
+    path = str(tmpdir.join('history.log'))
+    states = _make_states(10)
+    log = HistoryLog(path, snapshot_interval=4)
+    parent = -1
+    for i, state in enumerate(states):
+        parent = log.appendState(
+            state, parent, log.text(parent) if parent != -1 else None,
+            {'tape_pos': i})
+    assert log.tape() == (list(range(10)), 9)
+
+    # Any state is read from index and a few records, deltas are small
+    log = HistoryLog(path, snapshot_interval=4)
+    assert [log.text(i) for i in reversed(range(10))] == \
+        list(reversed(states))
+    assert log.metrics(3) == {'tape_pos': 3}
+    assert log.timestamp(9) >= log.timestamp(0)
+    assert tmpdir.join('history.log').size() < len(states[0])
+
+    # Undo, then a new state replaces the redo part of tape
+    log.appendMove(7)
+    assert log.tape() == (list(range(10)), 7)
+    log.appendState(states[0], 7)
+    assert log.tape() == (list(range(8)) + [11], 8)
+
+    # Records of an interrupted write are dropped
+    with open(log.index_path, 'ab') as index_file:
+        index_file.write(b'\0' * 5)
+    with open(path, 'ab') as data_file:
+        data_file.write(b'garbage')
+    log = HistoryLog(path)
+    assert len(log) == 12
+    log.appendMove(11)
+    assert HistoryLog(path).tape() == (list(range(8)) + [11], 8)
+    assert HistoryLog(path).text(11) == states[0]
+
+
+def test_history_attach_log(tmpdir):
+    path = str(tmpdir.join('history.log'))
+    states = _make_states(5)
+    history = StyleSheetHistory(snapshot_interval=2)
+    assert history.attachLog(HistoryLog(path)) == -1
+    for state in states[:4]:
+        history.append(state)
+    history.markCurrent(1)
+
+    # Restored entries are only read when accessed
+    history = StyleSheetHistory(snapshot_interval=2)
+    assert history.attachLog(HistoryLog(path)) == 1
+    assert len(history) == 4
+    assert history.memoryUsage() < 1000
+    assert [history[i] for i in range(4)] == states[:4]
+
+    # Truncated entries are left out of log tape by next append
+    history.truncate(2)
+    history.append(states[4])
+    assert HistoryLog(path).tape() == ([0, 1, 5], 2)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import io
+
+from PyQt5.QtWidgets import qApp
+from qt_style_sheet_inspector import _optimizer
+from qt_style_sheet_inspector._optimizer import OptimizeDialog, \
+    measure_apply_time, optimize_style_sheet
+from qt_style_sheet_inspector._qss import ParsedStyleSheet, split_rules
+
+
+def test_optimize_style_sheet():
+    optimized, stats = optimize_style_sheet(ParsedStyleSheet("""\
+/* comment */ @import "base.qss";
+QLabel  >  QPushButton , QLineEdit {
+    color : red ;
+    color: blue;
+    font-family: "Segoe  UI", Arial;
+}
+QLabel { border: 1px  solid  rgb( 1, 2, 3 ); }
+QFrame { margin: 1px; }
+QLabel { border-color: red; }
+QSlider { margin: 1px }
+"""))
+    assert optimized == (
+        'QLabel>QPushButton,QLineEdit'
+        '{color:blue;font-family:"Segoe  UI",Arial}\n'
+        'QLabel{border:1px solid rgb(1,2,3);border-color:red}\n'
+        'QFrame,QSlider{margin:1px}'
+    )
+    assert stats == (5, 3, 1, 1, 1)
+    # Optimizing again changes nothing
+    assert optimize_style_sheet(ParsedStyleSheet(optimized))[0] == optimized
+
+
+def test_optimize_keeps_cascade():
+    optimized, stats = optimize_style_sheet(ParsedStyleSheet("""\
+QLabel { border-color: red; }
+QFrame { border: 1px solid; }
+QWidget { margin: 0px; }
+QFrame { color: blue; }
+QLabel { color: red; }
+QPushButton { color: red; }
+QLineEdit { color: blue; }
+QSlider { color: red; }
+QLabel { color: green; color: blue !important; color: black; }
+QLabel[ { color: red; }
+QDial { color: red; }
+"""))
+    # Moving QLabel `border-color` after QFrame `border` would change it, and
+    # QSlider `color` after QLineEdit one. Rules with invalid selectors
+    # aren't grouped.
+    assert split_rules(optimized) == [
+        ('QLabel', 'border-color:red'),
+        ('QWidget', 'margin:0px'),
+        ('QFrame', 'border:1px solid;color:blue'),
+        ('QLabel,QPushButton', 'color:red'),
+        ('QLineEdit', 'color:blue'),
+        ('QSlider', 'color:red'),
+        ('QLabel', 'color:blue !important;color:black'),
+        ('QLabel[', 'color:red'),
+        ('QDial', 'color:red'),
+    ]
+    assert stats == (11, 9, 1, 1, 1)
+
+
+def test_optimize_dialog(qtbot, tmpdir):
+    dialog = OptimizeDialog(
+        'QLabel { color: red; }', 'QLabel{color:red}',
+        optimize_style_sheet(ParsedStyleSheet('QLabel { color: red; }'))[1],
+        apply_times=(0.002, 0.001))
+    qtbot.addWidget(dialog)
+    assert '(23% smaller)' in dialog.summary_label.text()
+    assert 'Apply: 2.0 ms -> 1.0 ms' in dialog.summary_label.text()
+    assert dialog.text_edit.toPlainText() == 'QLabel{color:red}'
+
+    path = str(tmpdir.join('optimized.qss'))
+    assert dialog.exportStyleSheet(path)
+    with io.open(path, encoding='utf-8') as qss_file:
+        assert qss_file.read() == 'QLabel{color:red}'
+    assert not dialog.exportStyleSheet(str(tmpdir.join('missing', 'a.qss')))
+    assert 'Could not export' in dialog.summary_label.text()
+
+
+def test_measure_apply_time(qtbot, monkeypatch):
+    # Style sheets app had when each timed apply started
+    previous = []
+
+    def set_app_style_sheet(style_sheet):
+        previous.append(qApp.styleSheet())
+        qApp.setStyleSheet(style_sheet)
+        return len(previous), 0
+
+    monkeypatch.setattr(_optimizer, 'set_app_style_sheet', set_app_style_sheet)
+    qApp.setStyleSheet('QLabel { color: red; }')
+    try:
+        assert measure_apply_time('QLabel { color: blue; }', repeat=2) == 1
+        # Timed applies repolish widgets already styled by style sheet
+        assert previous == ['QLabel { color: blue; }'] * 2
+    finally:
+        qApp.setStyleSheet('')
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import random
+
+from PyQt5.QtCore import QModelIndex
+from qt_style_sheet_inspector._outline import RuleOutlineModel, outline_key
+from qt_style_sheet_inspector._qss import ParsedStyleSheet
+
+
+def outline(model):
+    """
+    :rtype: list(tuple(unicode, list(unicode)))
+    :return: all fetched group and selector texts of model.
+    """
+    groups = []
+    for row in range(model.rowCount()):
+        parent = model.index(row, 0)
+        groups.append((model.data(parent), [
+            model.data(model.index(child, 0, parent))
+            for child in range(model.rowCount(parent))
+        ]))
+    return groups
+
+
+def fetch_all(model):
+    while model.canFetchMore(QModelIndex()):
+        model.fetchMore(QModelIndex())
+    for row in range(model.rowCount()):
+        parent = model.index(row, 0)
+        while model.canFetchMore(parent):
+            model.fetchMore(parent)
+
+
+def test_outline_key():
+    assert outline_key('QLabel') == 'QLabel'
+    assert outline_key('QDialog > QPushButton#ok:hover') == 'QPushButton'
+    assert outline_key('.QPushButton') == 'QPushButton'
+    assert outline_key('QDialog #ok') == '#ok'
+    assert outline_key('QDialog *[flat="true"]') == '*'
+    assert outline_key(':hover') == '*'
+
+
+def test_lazy_fetch(qtmodeltester):
+    parsed = ParsedStyleSheet(''.join(
+        'QLabel#l{0}, QPushButton#b{0} {{}}\n'.format(i) for i in range(10)))
+    model = RuleOutlineModel(parsed)
+    model.FETCH_SIZE = 4
+    assert model.rowCount() == 0
+    assert model.canFetchMore(QModelIndex())
+    model.fetchMore(QModelIndex())
+    assert model.rowCount() == 2
+    labels = model.index(0, 0)
+    assert model.data(labels) == 'QLabel (10)'
+    assert model.rowCount(labels) == 0
+    model.fetchMore(labels)
+    assert model.rowCount(labels) == 4
+    assert model.data(model.index(1, 0, labels)) == 'QLabel#l1'
+    assert model.ruleAt(model.index(1, 0, labels)) is parsed.rules[1]
+    assert model.ruleAt(labels) is None
+    qtmodeltester.check(model)
+
+
+def test_edits_match_rebuilt_model():
+    pieces = ['QLabel', 'QPushButton', '#ok', ' > ', ', ', ' {}\n', ':hover']
+    rnd = random.Random(0)
+
+    def random_text(size):
+        return ''.join(rnd.choice(pieces) for _ in range(size))
+
+    parsed = ParsedStyleSheet(random_text(60))
+    model = RuleOutlineModel(parsed)
+    model.FETCH_SIZE = 3
+    for _ in range(100):
+        if rnd.random() < 0.5:
+            fetch_all(model)
+        position = rnd.randint(0, len(parsed.text))
+        removed = rnd.randint(0, min(10, len(parsed.text) - position))
+        model.onRulesChanged(*parsed.update(
+            position, removed, random_text(rnd.randint(0, 3))))
+        rebuilt = RuleOutlineModel(parsed)
+        fetch_all(model)
+        fetch_all(rebuilt)
+        assert outline(model) == outline(rebuilt)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import json
+
+import pytest
+from PyQt5.QtCore import QEvent
+from PyQt5.QtWidgets import QFrame, QGroupBox, QLabel, QPushButton, qApp
+from qt_style_sheet_inspector import _metrics
+from qt_style_sheet_inspector._perf_gate import EXIT_ERROR, EXIT_OK, \
+    EXIT_THRESHOLD_EXCEEDED, build_gallery, check_thresholds, main, \
+    measure_style_sheet
+
+
+def test_build_gallery(qtbot):
+    gallery = build_gallery(25, ['QLabel', 'QPushButton'], depth=2)
+    qtbot.addWidget(gallery)
+    assert len(gallery.findChildren(QLabel)) == 13
+    assert len(gallery.findChildren(QPushButton)) == 12
+    assert len(gallery.findChildren(QGroupBox)) == 2
+    assert len(gallery.findChildren(QFrame, 'frame1')) == 2
+
+    with pytest.raises(ValueError):
+        build_gallery(1, ['QLabel', 'QNothing'])
+    with pytest.raises(ValueError):
+        build_gallery(1, ['QApplication'])
+
+
+def test_measure_style_sheet(qtbot, monkeypatch):
+    qApp.sendPostedEvents(None, QEvent.DeferredDelete)
+    gallery = build_gallery(10)
+    qtbot.addWidget(gallery)
+    # Style sheets app had when each apply started
+    previous = []
+
+    def set_app_style_sheet(style_sheet):
+        previous.append(qApp.styleSheet())
+        qApp.setStyleSheet(style_sheet)
+        return 0.0, len(qApp.allWidgets())
+
+    monkeypatch.setattr(
+        _metrics, 'set_app_style_sheet', set_app_style_sheet)
+    report = measure_style_sheet('QLabel { color: red; }', repeat=2)
+    assert report['size'] == 22
+    assert report['rules'] == 1
+    assert report['errors'] == 0
+    # Widgets of StyleSheetWidget applying style sheet aren't counted
+    qApp.sendPostedEvents(None, QEvent.DeferredDelete)
+    assert report['polished'] == len(qApp.allWidgets())
+    # Timed applies repolish widgets already styled by style sheet
+    assert previous == [''] + ['QLabel { color: red; }'] * 2
+    monkeypatch.undo()
+    assert sorted(report['timings']) == ['parse', 'repolish', 'validate']
+    assert qApp.styleSheet() == ''
+
+    report = measure_style_sheet('QLabel { color red; }', repeat=1)
+    assert report['errors'] == 1
+    assert 'repolish' not in report['timings']
+
+
+def test_check_thresholds():
+    baseline = {
+        'size': 1000, 'errors': 0,
+        'timings': {'parse': 0.001, 'validate': 0.001, 'repolish': 0.1},
+    }
+    assert check_thresholds(baseline, baseline) == []
+
+    # Fast steps may grow up to `min_slowdown`
+    report = dict(baseline, size=1050, timings={
+        'parse': 0.004, 'validate': 0.001, 'repolish': 0.12})
+    assert check_thresholds(report, baseline) == []
+
+    report = dict(baseline, size=1200, timings={
+        'parse': 0.001, 'validate': 0.001, 'repolish': 0.2})
+    assert check_thresholds(report, baseline) == [
+        'Repolish took 200.0 ms, baseline is 100.0 ms (+100%)',
+        'Style sheet has 1200 chars, baseline has 1000 (+20%)',
+    ]
+    assert check_thresholds(report, max_repolish=0.15, max_size=1100) == [
+        'Repolish took 200.0 ms, max is 150.0 ms',
+        'Style sheet has 1200 chars, max is 1100',
+    ]
+
+
+def test_main(qtbot, tmpdir, capsys):
+    qss = tmpdir.join('app.qss')
+    qss.write('QLabel { color: red; }\n')
+    baseline = tmpdir.join('baseline.json')
+    output = tmpdir.join('report.json')
+    options = [str(qss), '--widgets', '20', '--repeat', '1']
+
+    assert main(options + ['--save-baseline', str(baseline)]) == EXIT_OK
+    assert json.loads(baseline.read())['rules'] == 1
+    assert '1 rules, 0 errors' in capsys.readouterr().out
+
+    assert main(options + [
+        '--baseline', str(baseline), '--output', str(output),
+        '--max-slowdown', '1000', '--min-slowdown-ms', '1000']) == EXIT_OK
+    assert json.loads(output.read())['widgets'] == 20
+
+    qss.write('QLabel { color: red; }\n' * 2)
+    assert main(options + [
+        '--baseline', str(baseline), '--min-slowdown-ms', '1000',
+        '--max-slowdown', '1000']) == EXIT_THRESHOLD_EXCEEDED
+    assert 'FAILED: Style sheet has 46 chars' in capsys.readouterr().err
+
+    assert main([str(tmpdir.join('missing.qss'))]) == EXIT_ERROR
+    assert main(options + ['--classes', 'QNothing']) == EXIT_ERROR
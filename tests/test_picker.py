@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QCheckBox, QLabel, QMenu, QPushButton, \
+    QTreeView, QVBoxLayout, QWidget
+from qt_style_sheet_inspector._picker import SelectorIndex, WidgetPicker
+from qt_style_sheet_inspector._qss import ParsedStyleSheet
+
+STYLE_SHEET = """\
+QLabel { color: red; }
+#title { color: blue; }
+QWidget QLabel { margin: 1px; }
+[level="1"] { padding: 2px; }
+QPushButton:checked, QLabel:hover { color: green; }
+QPushButton, QLabel#title { border: none; }
+* { font-size: 12px; }
+QLabel { color: black; }
+QLabel @broken { }
+"""
+
+
+def _selectors(matches):
+    return [match.selector for match in matches]
+
+
+def test_selector_index(qtbot):
+    parent = QWidget()
+    qtbot.addWidget(parent)
+    title = QLabel(parent)
+    title.setObjectName('title')
+    title.setProperty('level', 1)
+    button = QPushButton(parent)
+
+    parsed = ParsedStyleSheet(STYLE_SHEET)
+    index = SelectorIndex()
+    assert index.update(parsed.rules) == (9, 0)
+    assert len(index) == 9
+    assert index.unparsed_rules == {parsed.rules[8]}
+
+    # Highest specificity first, later rules first on ties
+    assert _selectors(index.matches(title)) == [
+        'QLabel#title', '#title', 'QLabel:hover', '[level="1"]',
+        'QWidget QLabel', 'QLabel', 'QLabel', '*',
+    ]
+    matches = index.matches(title)
+    assert matches[0].specificity == (1, 0, 1)
+    assert [match.rule.start for match in matches[-3:-1]] == [
+        parsed.rules[7].start, parsed.rules[0].start]
+    assert _selectors(index.matches(button)) == ['QPushButton', '*']
+    assert _selectors(index.matches(parent)) == ['*']
+
+    # Only edited rules are indexed again
+    position = STYLE_SHEET.index('#title')
+    edits = [
+        parsed.update(position, len('#title'), '#subtitle'),
+        parsed.update(0, 0, 'QCheckBox { }\n'),
+    ]
+    assert index.update(parsed.rules) == (
+        sum(added for _, _, added in edits),
+        sum(removed for _, removed, _ in edits))
+    assert len(index) == len(parsed.rules)
+    assert '#title' not in _selectors(index.matches(title))
+    assert _selectors(index.matches(QCheckBox(parent))) == [
+        'QCheckBox', '*']
+
+    assert index.update([]) == (0, len(parsed.rules))
+    assert index.matches(title) == []
+    assert index.unparsed_rules == set()
+
+
+def test_selector_index_subcontrols(qtbot):
+    parent = QWidget()
+    qtbot.addWidget(parent)
+    menu = QMenu(parent)
+    tree_view = QTreeView(parent)
+    index = SelectorIndex()
+    index.update(ParsedStyleSheet("""\
+QMenu::item:checked, QMenu:hover { color: red; }
+QTreeView::indicator:checked { color: red; }
+QAbstractButton:checked { color: red; }
+""").rules)
+    # Pseudo states of items are possible whatever widget properties are,
+    # ties show first selector of group
+    assert _selectors(index.matches(menu)) == ['QMenu::item:checked']
+    assert _selectors(index.matches(tree_view)) == [
+        'QTreeView::indicator:checked']
+
+
+def test_widget_picker(qtbot):
+    window = QWidget()
+    qtbot.addWidget(window)
+    layout = QVBoxLayout(window)
+    button = QPushButton('Click', window)
+    disabled = QLabel('Disabled', window)
+    disabled.setEnabled(False)
+    layout.addWidget(button)
+    layout.addWidget(disabled)
+    excluded = QWidget()
+    qtbot.addWidget(excluded)
+    excluded_button = QPushButton('Excluded', excluded)
+    # Windows must not overlap, picked widget is the one under mouse
+    excluded.move(window.geometry().right() + 100, 0)
+    for widget in (window, excluded):
+        widget.show()
+        qtbot.waitExposed(widget)
+
+    picker = WidgetPicker(excluded=[excluded])
+    picked = []
+    picker.picked.connect(picked.append)
+    clicks = []
+    button.clicked.connect(lambda: clicks.append(button))
+    excluded_button.clicked.connect(lambda: clicks.append(excluded_button))
+
+    picker.start()
+    assert picker.isActive()
+    qtbot.mouseClick(excluded_button, Qt.LeftButton)
+    assert clicks == [excluded_button]
+    assert picked == []
+    with qtbot.waitSignal(picker.finished):
+        qtbot.mouseClick(button, Qt.LeftButton)
+    assert picked == [button]
+    # Picking click isn't delivered
+    assert clicks == [excluded_button]
+    assert not picker.isActive()
+    qtbot.mouseClick(button, Qt.LeftButton)
+    assert clicks == [excluded_button, button]
+
+    picker.start()
+    qtbot.mouseClick(disabled, Qt.LeftButton)
+    assert picked == [button, disabled]
+
+    picker.start()
+    with qtbot.waitSignal(picker.finished):
+        qtbot.keyClick(button, Qt.Key_Escape)
+    assert not picker.isActive()
+    assert picked == [button, disabled]
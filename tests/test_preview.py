@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import sys
+
+import pytest
+from PyQt5.QtCore import QEvent, QRect, Qt
+from PyQt5.QtGui import QImage
+from PyQt5.QtWidgets import QLabel, QPushButton, QScrollArea, QVBoxLayout, \
+    QWidget, qApp
+from qt_style_sheet_inspector import _preview
+from qt_style_sheet_inspector._preview import PreviewError, SandboxPreview, \
+    clone_widget_tree, count_changed_pixels, rect_corners
+
+
+class _TitleButton(QPushButton):
+
+    def __init__(self, title, parent):
+        QPushButton.__init__(self, title.upper(), parent)
+
+
+@pytest.fixture
+def window(qtbot):
+    """
+    :return: a shown window with a label, a custom button and a scroll area.
+    """
+    window = QWidget()
+    qtbot.addWidget(window)
+    layout = QVBoxLayout(window)
+    label = QLabel('Title', window)
+    label.setObjectName('title')
+    label.setProperty('level', 1)
+    layout.addWidget(label)
+    layout.addWidget(_TitleButton('ok', window))
+    hidden = QLabel('Hidden', window)
+    hidden.hide()
+    scroll_area = QScrollArea(window)
+    scroll_area.setWidget(QLabel('Contents'))
+    layout.addWidget(scroll_area)
+    window.resize(200, 300)
+    window.show()
+    qtbot.waitExposed(window)
+    return window
+
+
+def test_clone_widget_tree(window):
+    parent = QWidget()
+    pairs = clone_widget_tree(window, parent)
+    clones = dict(pairs)
+    assert len(pairs) == len(window.findChildren(QWidget)) + 1
+    assert pairs[0] == (window, parent.children()[0])
+
+    label = window.findChild(QLabel, 'title')
+    assert clones[label].text() == 'Title'
+    assert clones[label].property('level') == 1
+    assert clones[label].geometry() == label.geometry()
+
+    button = window.findChild(_TitleButton)
+    # Constructor isn't called, class name is kept
+    assert clones[button].metaObject().className() == '_TitleButton'
+    assert isinstance(clones[button], QPushButton)
+    assert clones[button].text() == 'OK'
+
+    hidden = [widget for widget in window.findChildren(QLabel)
+              if widget.text() == 'Hidden'][0]
+    assert clones[hidden].isHidden()
+
+    # Internal children are reused, user widgets in them are copied
+    scroll_area = window.findChild(QScrollArea)
+    viewport = clones[scroll_area.viewport()]
+    assert viewport is clones[scroll_area].viewport()
+    assert clones[scroll_area.widget()].parentWidget() is viewport
+    parent.deleteLater()
+
+
+def test_count_changed_pixels():
+    numpy = pytest.importorskip('numpy')
+    before = QImage(10, 10, QImage.Format_RGB32)
+    before.fill(Qt.white)
+    after = before.copy()
+    counts, image = count_changed_pixels(
+        before, after, rect_corners([QRect(0, 0, 10, 10)]))
+    assert counts.tolist() == [0]
+    assert image == after
+
+    after.fill(Qt.black)
+    for x in range(2, 6):
+        after.setPixel(x, 3, before.pixel(x, 3))
+    rects = [QRect(0, 0, 10, 10), QRect(2, 2, 4, 2), QRect(8, 8, 5, 5)]
+    counts, image = count_changed_pixels(before, after, rect_corners(rects))
+    assert counts.tolist() == [96, 4, 4]
+    assert isinstance(counts, numpy.ndarray)
+    assert image.pixel(0, 0) != after.pixel(0, 0)
+    assert image.pixel(2, 3) == after.pixel(2, 3)
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_sandbox_preview(window, use_numpy, monkeypatch):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(_preview, 'numpy', None)
+    qApp.sendPostedEvents(None, QEvent.DeferredDelete)
+    widget_count = len(qApp.allWidgets())
+    qApp.setStyleSheet('QLabel { color: blue; }')
+    try:
+        preview = SandboxPreview(
+            window, 'QLabel { color: blue; } #title { color: red; }')
+        preview.tile_height = 50
+        preview.image_width = 100
+        result = preview.run()
+        assert qApp.styleSheet() == 'QLabel { color: blue; }'
+    finally:
+        qApp.setStyleSheet('')
+
+    label = window.findChild(QLabel, 'title')
+    assert [diff.widget for diff in result.diffs] == [window, label]
+    assert result.diffs[1].rect == label.geometry()
+    assert result.image.size() == result.size / 2
+    # Hidden widgets, like scroll bars that aren't needed, aren't compared
+    scroll_area = window.findChild(QScrollArea)
+    assert result.widget_count == len([
+        window, label, window.findChild(_TitleButton), scroll_area,
+        scroll_area.viewport(), scroll_area.widget()])
+    if use_numpy:
+        assert result.changed_pixels > 0
+        assert result.diffs[1].changed_pixels == result.changed_pixels
+    else:
+        assert result.changed_pixels is None
+        assert result.diffs[1].changed_pixels is None
+
+    # Sandboxes aren't built in this process
+    qApp.sendPostedEvents(None, QEvent.DeferredDelete)
+    assert len(qApp.allWidgets()) == widget_count
+
+
+def test_sandbox_preview_dropped_rules(window):
+    qApp.setStyleSheet('QPushButton { color: red; } QLabel { color: blue; }')
+    try:
+        result = SandboxPreview(window, 'QLabel { color: blue; }').run()
+    finally:
+        qApp.setStyleSheet('')
+    # App style sheet doesn't apply to candidate sandbox
+    assert [diff.widget for diff in result.diffs] == [
+        window, window.findChild(_TitleButton)]
+
+
+def test_sandbox_preview_batches(window, qtbot):
+    preview = SandboxPreview(window, 'QPushButton { color: red; }')
+    preview.tile_height = 100
+    progress = []
+    preview.progress.connect(lambda *args: progress.append(args))
+    with qtbot.waitSignal(preview.finished) as blocker:
+        preview.start()
+        assert preview.isRunning()
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    assert not preview.isRunning()
+    assert [diff.widget for diff in blocker.args[0].diffs] == [
+        window, window.findChild(_TitleButton)]
+
+    preview.start()
+    preview.cancel()
+    assert not preview.isRunning()
+    assert preview.result is None
+
+
+def test_sandbox_preview_snapshot_batches(window, qtbot):
+    preview = SandboxPreview(window, '')
+    preview.batch_size = 3
+    copied = []
+    preview._timer.timeout.connect(
+        lambda: copied.append(len(preview._widgets)))
+    with qtbot.waitSignal(preview.finished) as blocker:
+        preview.start()
+        assert preview._widgets == []
+    assert copied[:2] == [3, 6]
+    assert copied[-1] == len(window.findChildren(QWidget)) + 1
+    assert blocker.args[0].diffs == []
+
+
+def test_sandbox_preview_failed(window, qtbot, monkeypatch):
+    monkeypatch.setattr(sys, 'executable', '/nonexistent/python')
+    preview = SandboxPreview(window, '')
+    with pytest.raises(PreviewError):
+        preview.run()
+    assert not preview.isRunning()
+
+    with qtbot.waitSignal(preview.failed) as blocker:
+        preview.start()
+    assert blocker.args[0].startswith('Preview failed: ')
+    assert not preview.isRunning()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from PyQt5.QtCore import QEvent
+from PyQt5.QtWidgets import QLabel, QPushButton, QWidget, qApp
+from qt_style_sheet_inspector import StyleSheetInspector
+from qt_style_sheet_inspector._profiler import RuleTimer, profile_rules
+
+STYLE_SHEET = """\
+QPushButton { color: red; }
+/* many labels */
+QLabel { margin: 1px; }
+#missing { margin: 2px; }
+"""
+
+
+def _make_widgets(qtbot):
+    parent = QWidget()
+    qtbot.addWidget(parent)
+    for i in range(3):
+        QLabel(parent)
+    QPushButton(parent)
+    return parent, parent.findChildren(QWidget)
+
+
+def test_profile_rules(qtbot):
+    _parent, widgets = _make_widgets(qtbot)
+    profiles = profile_rules(STYLE_SHEET, widgets)
+    assert [(p.selector, p.matched_count, p.line) for p in profiles] == [
+        ('QLabel', 3, 3),
+        ('QPushButton', 1, 1),
+        ('#missing', 0, 4),
+    ]
+    label_rule = profiles[0]
+    assert STYLE_SHEET[label_rule.start:label_rule.end] == \
+        'QLabel { margin: 1px; }'
+    assert all(p.cost is None for p in profiles)
+
+
+def test_profile_rules_timed(qtbot):
+    _parent, widgets = _make_widgets(qtbot)
+    profiles = profile_rules(STYLE_SHEET, widgets, timed_rules=2)
+    timed = [p for p in profiles if p.cost is not None]
+    assert sorted(p.selector for p in timed) == ['QLabel', 'QPushButton']
+    assert all(p.cost >= 0 for p in timed)
+    assert qApp.styleSheet() == STYLE_SHEET
+
+
+def test_rule_timer(qtbot):
+    parent, widgets = _make_widgets(qtbot)
+    qApp.setStyleSheet('')
+    profiles = profile_rules(STYLE_SHEET, widgets)
+    timer = RuleTimer(STYLE_SHEET, profiles, 2, restore='QLabel { }')
+    progress = []
+    timer.progress.connect(lambda *args: progress.append(args))
+    with qtbot.waitSignal(timer.finished) as blocker:
+        timer.start()
+        assert timer.isRunning()
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    assert [p.cost is not None for p in blocker.args[0]] == [
+        True, True, False]
+    assert qApp.styleSheet() == 'QLabel { }'
+
+    # Cancelling restores style sheet right away
+    timer.start()
+    timer.cancel()
+    assert not timer.isRunning()
+    assert timer.result is None
+    assert qApp.styleSheet() == 'QLabel { }'
+    qApp.setStyleSheet('')
+
+
+def test_profile_dialog(qtbot):
+    # Widgets of previous tests would be matched too
+    qApp.sendPostedEvents(None, QEvent.DeferredDelete)
+    _parent, _widgets = _make_widgets(qtbot)
+    qApp.setStyleSheet(STYLE_SHEET)
+    inspector = StyleSheetInspector()
+    qtbot.addWidget(inspector)
+    inspector.widget.profile_timed_rules = 0
+
+    dialog = inspector.widget.onProfileRules()
+    qtbot.addWidget(dialog)
+    assert dialog.table.rowCount() == 3
+    assert dialog.table.item(0, 0).text() == 'QLabel'
+    # Inspector widgets aren't matched
+    assert dialog.profiles[0].matched_count == 3
+
+    dialog.onCellDoubleClicked(0, 0)
+    cursor = inspector.widget.style_text_edit.textCursor()
+    assert cursor.selectedText() == 'QLabel { margin: 1px; }'
+
+
+def test_profile_dialog_template(qtbot):
+    qApp.setStyleSheet('')
+    inspector = StyleSheetInspector()
+    qtbot.addWidget(inspector)
+    widget = inspector.widget
+    widget.profile_timed_rules = 1
+    widget.template_check_box.setChecked(True)
+    widget.style_text_edit.setPlainText('@c: red;\nQLabel { color: @c; }')
+    widget.applyStyleSheet()
+    applied = qApp.styleSheet()
+    assert applied == 'QLabel { color: red; }'
+
+    dialog = widget.onProfileRules()
+    qtbot.addWidget(dialog)
+    with qtbot.waitSignal(widget._rule_timer.finished):
+        assert dialog.cancel_button.isVisible()
+    # Compiled style sheet is profiled and stays applied
+    assert dialog.table.item(0, 0).text() == 'QLabel'
+    assert dialog.profiles[0].cost is not None
+    assert qApp.styleSheet() == applied
+    assert not dialog.cancel_button.isVisible()
+
+    widget.style_text_edit.setPlainText('QLabel { color: @missing; }')
+    assert widget.onProfileRules() is None
+    assert 'Undefined variable' in widget.status_label.text()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import random
+
+from qt_style_sheet_inspector._qss import ParsedStyleSheet, TOKEN_CLOSE, \
+    TOKEN_COMMENT, TOKEN_OPEN, TOKEN_STRING, strip_comments, tokenize
+
+
+def rules_state(parsed):
+    return [
+        (rule.selector, rule.body, rule.start, rule.end, [
+            (declaration.name, declaration.value, declaration.start,
+             declaration.end)
+            for declaration in rule.declarations
+        ])
+        for rule in parsed.rules
+    ], parsed.errors
+
+
+def test_tokenize():
+    text = 'A /* { */ { b: "}"; }'
+    assert [(kind, text[start:end]) for kind, start, end in tokenize(text)] \
+        == [
+            (TOKEN_COMMENT, '/* { */'),
+            (TOKEN_OPEN, '{'),
+            ('colon', ':'),
+            (TOKEN_STRING, '"}"'),
+            ('semicolon', ';'),
+            (TOKEN_CLOSE, '}'),
+        ]
+    assert strip_comments('a /* b\nc */ d') == 'a     \n     d'
+    assert strip_comments('a "/* b */"') == 'a "/* b */"'
+
+
+def test_parse():
+    text = 'QLabel, #ok { color: red; /* x */ margin:0px }\nQWidget {}'
+    parsed = ParsedStyleSheet(text)
+    assert parsed.errors == []
+    label, widget = parsed.rules
+    assert label.selector == 'QLabel, #ok'
+    assert label.selectors() == ['QLabel', '#ok']
+    assert label.body == 'color: red;margin:0px'
+    assert text[label.start:label.end] == text.splitlines()[0]
+    assert [(d.name, d.value) for d in label.declarations] == [
+        ('color', 'red'), ('margin', '0px')]
+    declaration = label.declarations[1]
+    assert text[label.start + declaration.start:
+                label.start + declaration.end].strip() == '/* x */ margin:0px'
+    assert widget.selector == 'QWidget'
+    assert widget.declarations == []
+    assert parsed.ruleAt(0) == 0
+    assert parsed.ruleAt(len(text) - 1) == 1
+    assert parsed.ruleAt(text.index('\n')) is None
+
+
+def test_parse_errors():
+    parsed = ParsedStyleSheet('} A { b } C { d: e')
+    assert [error.message for error in parsed.errors] == [
+        'Unexpected closing brace',
+        'Declaration without value',
+        'Unterminated rule',
+    ]
+    assert [rule.selector for rule in parsed.rules] == ['A', 'C']
+    assert parsed.rules[1].end == len(parsed.text)
+
+    parsed = ParsedStyleSheet('A {} B')
+    assert [error.message for error in parsed.errors] == [
+        'Unexpected text after last rule']
+    assert [(e.start, e.end) for e in parsed.errors] == [(5, 6)]
+
+
+def test_update():
+    parsed = ParsedStyleSheet('A { a: 1 }\nB { b: 2 }\nC { c: 3 }\n')
+    assert parsed.update(parsed.text.index('2'), 1, '22') == (1, 1, 1)
+    assert parsed.rules[1].body == 'b: 22'
+    assert parsed.rules[2].start == parsed.text.index('C')
+    # Opening a comment comments out following rules
+    assert parsed.update(parsed.text.index('B'), 0, '/*') == (1, 2, 0)
+    assert [rule.selector for rule in parsed.rules] == ['A']
+    # Last rule is always parsed again, the edit may have terminated it
+    assert parsed.setText('A { a: 1 }\nB { b: 2 }\nC { c: 3 }\n') == (
+        0, 1, 3)
+
+
+def test_update_matches_full_parse():
+    pieces = ['QLabel', ' ', '{', '}', ';', ':', 'color', 'red', '/*', '*/',
+              '"', "'", '\n', '#ok']
+    rnd = random.Random(0)
+
+    def random_text(size):
+        return ''.join(rnd.choice(pieces) for _ in range(size))
+
+    for _ in range(300):
+        parsed = ParsedStyleSheet(random_text(rnd.randint(0, 40)))
+        for _ in range(5):
+            position = rnd.randint(0, len(parsed.text))
+            removed = rnd.randint(0, min(5, len(parsed.text) - position))
+            parsed.update(position, removed, random_text(rnd.randint(0, 4)))
+            assert rules_state(parsed) == rules_state(
+                ParsedStyleSheet(parsed.text))
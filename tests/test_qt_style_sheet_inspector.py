@@ -5,8 +5,10 @@ from __future__ import absolute_import, division, print_function, \
     unicode_literals
 
 import pytest
-from PyQt5.QtWidgets import qApp
-from qt_style_sheet_inspector import StyleSheetInspector
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QPalette
+from PyQt5.QtWidgets import QLabel, qApp
+from qt_style_sheet_inspector import StyleSheetInspector, _inspector
 
 
 def test_load_style_sheet(inspector):
@@ -32,7 +34,7 @@ def test_apply(inspector):
     assert not inspector.widget.apply_button.isEnabled()
 
 
-def test_search_hit(inspector):
+def test_search_hit(inspector, qtbot):
     """
     :type inspector: qt_style_sheet_inspector.StyleSheetInspector
     """
@@ -43,7 +45,8 @@ def test_search_hit(inspector):
 
     # there are 3 occurrences of "0px" in style sheet, after that it should
     # cycle back to first occurrence
-    inspector.widget.search_bar.setText("0px")
+    with qtbot.waitSignal(inspector.widget.searchFinished):
+        inspector.widget.search_bar.setText("0px")
     assert inspector.widget.search_bar.styleSheet() == "color: green;"
     assert inspector.widget.style_text_edit.textCursor().position() == 35
 
@@ -58,9 +61,21 @@ def test_search_hit(inspector):
     inspector.widget.onNextSearchHit()
     assert inspector.widget.search_bar.styleSheet() == "color: green;"
     assert inspector.widget.style_text_edit.textCursor().position() == 35
+    assert inspector.widget.search_hits_label.text() == "1 of 3"
+
+    inspector.widget.onPreviousSearchHit()
+    assert inspector.widget.style_text_edit.textCursor().position() == 86
+    assert inspector.widget.search_hits_label.text() == "3 of 3"
+    assert len(inspector.widget.style_text_edit.extraSelections()) == 3
+
+    # Hits are kept up to date when style sheet text is edited
+    cursor = inspector.widget.style_text_edit.textCursor()
+    cursor.setPosition(0)
+    cursor.insertText("QLabel { margin: 10px; }")
+    assert inspector.widget.search_hits_label.text() == "4 of 4"
 
 
-def test_search_miss(inspector):
+def test_search_miss(inspector, qtbot):
     """
     :type inspector: qt_style_sheet_inspector.StyleSheetInspector
     """
@@ -69,7 +84,8 @@ def test_search_miss(inspector):
 
     assert inspector.widget.style_text_edit.textCursor().position() == 0
 
-    inspector.widget.search_bar.setText("INVALID")
+    with qtbot.waitSignal(inspector.widget.searchFinished):
+        inspector.widget.search_bar.setText("INVALID")
     assert inspector.widget.search_bar.styleSheet() == "color: red;"
     assert inspector.widget.style_text_edit.textCursor().position() == 0
 
@@ -78,6 +94,48 @@ def test_search_miss(inspector):
     assert inspector.widget.style_text_edit.textCursor().position() == 0
 
 
+def test_regex_search(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    widget = inspector.widget
+    widget.search_delay = 0
+    widget.regex_check_box.setChecked(True)
+
+    with qtbot.waitSignal(widget.searchFinished):
+        widget.search_bar.setText("[a-z]+: 0")
+    assert widget.search_bar.styleSheet() == "color: green;"
+    assert widget.search_hits_label.text() == "1 of 3"
+    cursor = widget.style_text_edit.textCursor()
+    assert cursor.selectedText() == "margin: 0"
+
+    widget.onNextSearchHit()
+    assert widget.style_text_edit.textCursor().selectedText() == "padding: 0"
+
+    with qtbot.waitSignal(widget.searchFinished):
+        widget.search_bar.setText("(")
+    assert widget.search_bar.styleSheet() == "color: red;"
+    assert widget.search_bar.toolTip()
+
+
+def test_search_debounce(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    widget = inspector.widget
+    with qtbot.waitSignal(widget.searchFinished):
+        for text in ("0", "0p", "0px"):
+            widget.search_bar.setText(text)
+            # Nothing is searched while user is typing
+            assert widget.search_hits == []
+    assert widget.search_hits_label.text() == "1 of 3"
+
+    # Going to next hit right after typing uses current text
+    widget.search_bar.setText("margin")
+    widget.onNextSearchHit()
+    assert widget.style_text_edit.textCursor().selectedText() == "margin"
+
+
 def test_focus_search_bar(inspector, mocker):
     """
     :type inspector: qt_style_sheet_inspector.StyleSheetInspector
@@ -146,6 +204,421 @@ def test_undo_redo(inspector):
     assert inspector.widget.style_text_edit.toPlainText() == style_sheets[-1]
 
 
+def test_incremental_apply(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    from PyQt5.QtWidgets import QLabel
+    label = QLabel()
+    label.setObjectName('title')
+    qtbot.addWidget(label)
+
+    widget = inspector.widget
+    widget.incremental_apply = True
+    widget.count_affected_widgets = True
+
+    # Only comments and formatting changed, apply is skipped
+    widget.style_text_edit.setPlainText(
+        '/* comment */' + qApp.styleSheet().replace('    ', '  '))
+    widget.applyStyleSheet()
+    assert widget.last_apply_scope == 'skipped'
+    assert widget.last_repolish_count == 0
+    assert len(widget.tape) == 2
+
+    widget.style_text_edit.setPlainText(
+        qApp.styleSheet() + 'QLabel#title { font-size: 14px; }')
+    widget.applyStyleSheet()
+    assert widget.last_apply_scope == 'scoped'
+    assert widget.last_affected_count == 1
+    assert qApp.styleSheet() == widget.style_text_edit.toPlainText()
+
+    widget.count_affected_widgets = False
+    widget.style_text_edit.setPlainText(
+        qApp.styleSheet() + 'QLabel#title { image: url("a{b}.png"); }')
+    widget.applyStyleSheet()
+    assert widget.last_apply_scope == 'scoped'
+    assert widget.last_affected_count is None
+
+    widget.style_text_edit.setPlainText(
+        qApp.styleSheet() + '* { color: red; }')
+    widget.applyStyleSheet()
+    assert widget.last_apply_scope == 'full'
+    assert widget.last_repolish_count == len(qApp.allWidgets())
+
+
+def test_undo_redo_minimal_edit(inspector, qtbot, monkeypatch):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    widget = inspector.widget
+    widget.resize(300, 200)
+    widget.show()
+    style_sheet = qApp.styleSheet() + ''.join(
+        'QLabel#label{} {{ color: red; }}\n'.format(i) for i in range(100))
+    widget.style_text_edit.setPlainText(style_sheet)
+    widget.applyStyleSheet()
+    edited = style_sheet.replace(
+        '#label99 { color: red', '#label99 { color: blue')
+    widget.style_text_edit.setPlainText(edited)
+    widget.applyStyleSheet()
+
+    cursor = widget.style_text_edit.textCursor()
+    cursor.setPosition(100)
+    widget.style_text_edit.setTextCursor(cursor)
+    scroll_bar = widget.style_text_edit.verticalScrollBar()
+    scroll_bar.setValue(scroll_bar.maximum() // 2)
+
+    # Rules of full applies are kept, applied style sheet isn't parsed again
+    def split_rules(text):
+        raise AssertionError('Applied style sheet parsed again')
+
+    monkeypatch.setattr(_inspector, 'split_rules', split_rules)
+    changes = []
+    widget.style_text_edit.document().contentsChange.connect(
+        lambda *args: changes.append(args))
+    widget.onUndo()
+    assert widget.style_text_edit.toPlainText() == style_sheet
+    assert changes == [(edited.index('blue'), 4, 3)]
+    assert widget.last_apply_scope == 'scoped'
+    assert widget.style_text_edit.textCursor().position() == 100
+    assert scroll_bar.value() == scroll_bar.maximum() // 2
+    assert qApp.styleSheet() == style_sheet
+
+    widget.onRedo()
+    assert widget.style_text_edit.toPlainText() == edited
+    assert qApp.styleSheet() == edited
+
+
+def test_undo_redo_after_eviction(qtbot, initial_qss):
+    qApp.setStyleSheet(initial_qss)
+    # Enough memory for a few states of the small style sheet
+    inspector = StyleSheetInspector(
+        history_max_memory=1000, history_snapshot_interval=2)
+    qtbot.addWidget(inspector)
+    widget = inspector.widget
+
+    style_sheets = [qApp.styleSheet()]
+    for size in range(1, 11):
+        style_sheets.append(
+            initial_qss + 'QLabel {{ font-size: {}px; }}'.format(size))
+        widget.style_text_edit.setPlainText(style_sheets[-1])
+        widget.applyStyleSheet()
+
+    assert 1 < len(widget.tape) < len(style_sheets)
+    assert widget.tape.memoryUsage() <= 1000
+    assert widget.tape_pos == len(widget.tape) - 1
+
+    kept = style_sheets[-len(widget.tape):]
+    for style_sheet in reversed(kept[:-1]):
+        widget.onUndo()
+        assert widget.style_text_edit.toPlainText() == style_sheet
+        assert qApp.styleSheet() == style_sheet
+    # Oldest states were evicted, undo has no effect
+    widget.onUndo()
+    assert widget.style_text_edit.toPlainText() == kept[0]
+
+    for style_sheet in kept[1:]:
+        widget.onRedo()
+        assert widget.style_text_edit.toPlainText() == style_sheet
+    widget.onRedo()
+    assert widget.style_text_edit.toPlainText() == style_sheets[-1]
+
+
+def test_apply_metrics(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    widget = inspector.widget
+    assert widget.applyMetrics() == []
+
+    widget.style_text_edit.setPlainText(
+        qApp.styleSheet() + 'QLabel { font-size: 14px; }')
+    with qtbot.waitSignal(widget.styleSheetApplied) as blocker:
+        widget.applyStyleSheet()
+    metrics = blocker.args[0]
+    assert metrics.size == len(qApp.styleSheet())
+    assert metrics.repolish_time > 0
+    assert metrics.polished_count == len(qApp.allWidgets())
+    assert metrics.tape_pos == 1
+    assert metrics.scope == 'full'
+    assert widget.applyMetrics() == [metrics]
+    assert 'widgets repolished' in widget.status_label.text()
+
+    widget.incremental_apply = True
+    widget.applyStyleSheet()
+    assert widget.applyMetrics(1)[0].scope == 'skipped'
+    assert len(widget.applyMetrics()) == 2
+
+
+def test_parsed_style_sheet(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    widget = inspector.widget
+    assert [rule.selector for rule in widget.parsed_style_sheet.rules] == [
+        '*']
+
+    cursor = widget.style_text_edit.textCursor()
+    cursor.movePosition(cursor.End)
+    with qtbot.waitSignal(widget.rulesChanged) as blocker:
+        cursor.insertText('QLabel { color: red; }')
+    assert blocker.args == [0, 1, 2]
+    assert widget.parsed_style_sheet.text == \
+        widget.style_text_edit.toPlainText()
+    assert widget.parsed_style_sheet.rules[1].body == 'color: red'
+
+    # Replacing whole text is diffed against previous text, unchanged rules
+    # are kept
+    rules = list(widget.parsed_style_sheet.rules)
+    changes = []
+    widget.rulesChanged.connect(lambda *args: changes.append(args))
+    widget.style_text_edit.setPlainText(
+        widget.style_text_edit.toPlainText().replace('red', 'blue'))
+    assert changes == [(1, 1, 1)]
+    assert widget.parsed_style_sheet.rules[0] is rules[0]
+    assert widget.parsed_style_sheet.rules[1].body == 'color: blue'
+
+    # Removing whole text is handled too
+    changes = []
+    widget.style_text_edit.clear()
+    assert changes == [(0, 2, 0)]
+    assert widget.parsed_style_sheet.text == ''
+    assert len(widget.search_index) == 0
+
+
+def test_outline(inspector):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    widget = inspector.widget
+    widget.style_text_edit.setPlainText(
+        qApp.styleSheet() + 'QLabel { color: red; }')
+    model = widget.outline_model
+    assert [model.data(model.index(row, 0))
+            for row in range(model.rowCount())] == ['* (1)', 'QLabel (1)']
+
+    labels = model.index(1, 0)
+    model.fetchMore(labels)
+    widget.onOutlineActivated(model.index(0, 0, labels))
+    cursor = widget.style_text_edit.textCursor()
+    assert cursor.selectedText() == 'QLabel { color: red; }'
+
+
+@pytest.mark.parametrize('read_only', [False, True])
+def test_large_document(qtbot, initial_qss, read_only):
+    style_sheet = initial_qss + ''.join(
+        'QLabel#label{} {{ color: red; }}\n'.format(i) for i in range(100))
+    qApp.setStyleSheet(style_sheet)
+    inspector = StyleSheetInspector(
+        large_document_size=1000, large_document_read_only=read_only)
+    qtbot.addWidget(inspector)
+    widget = inspector.widget
+    assert widget.large_document
+    widget.load_chunk_size = 500
+    widget.loadStyleSheet()
+    assert widget.isLoading()
+    assert widget.style_text_edit.isReadOnly()
+
+    with qtbot.waitSignal(widget.styleSheetLoaded):
+        pass
+    assert not widget.isLoading()
+    assert widget.style_text_edit.toPlainText() == style_sheet
+    assert widget.style_text_edit.isReadOnly() == read_only
+    assert not widget.apply_button.isEnabled()
+    assert len(widget.parsed_style_sheet.rules) == 101
+    assert widget.outline_model.rowCount() == 2
+
+    widget.search_bar.setText('#label42')
+    widget.onNextSearchHit()
+    assert widget.style_text_edit.textCursor().selectedText() == '#label42'
+
+    # Applying while loading loads remaining text first
+    widget.loadStyleSheet()
+    assert widget.isLoading()
+    widget.applyStyleSheet()
+    assert not widget.isLoading()
+    assert qApp.styleSheet() == style_sheet
+
+    cursor = widget.style_text_edit.textCursor()
+    cursor.insertText('QLineEdit { color: blue; }\n')
+    widget.applyStyleSheet()
+    widget.onUndo()
+    assert widget.style_text_edit.toPlainText() == style_sheet
+
+
+def test_style_sheet_census(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    label = QLabel()
+    qtbot.addWidget(label)
+    label.setStyleSheet('color: red;')
+    # Inspector own style sheets are left out
+    inspector.widget.search_bar.setStyleSheet('color: green;')
+
+    dialog = inspector.widget.onStyleSheetCensus()
+    assert dialog.table.rowCount() == 1
+    assert dialog.table.item(0, 0).text() == 'QLabel'
+
+
+def test_live_apply(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    widget = inspector.widget
+    widget.live_apply_delay = 10
+    widget.live_apply_check_box.setChecked(True)
+    initial = qApp.styleSheet()
+    cursor = widget.style_text_edit.textCursor()
+    cursor.movePosition(cursor.End)
+
+    # Incomplete rules aren't applied
+    cursor.insertText('QLabel { color: red;')
+    qtbot.waitUntil(lambda: 'waiting' in widget.status_label.text())
+    assert qApp.styleSheet() == initial
+
+    with qtbot.waitSignal(widget.styleSheetApplied) as blocker:
+        cursor.insertText(' }')
+    assert blocker.args[0].live
+    assert 'Live:' in widget.status_label.text()
+    assert qApp.styleSheet() == widget.style_text_edit.toPlainText()
+    assert len(widget.tape) == 2
+
+    # Consecutive live applies share a tape entry
+    with qtbot.waitSignal(widget.styleSheetApplied):
+        cursor.insertText('\nQLineEdit { color: blue; }')
+    assert len(widget.tape) == 2
+    assert widget.tape[1] == qApp.styleSheet()
+    widget.onUndo()
+    assert qApp.styleSheet() == initial
+
+    # Undo is applied right away, live apply has nothing left to do
+    with qtbot.assertNotEmitted(widget.styleSheetApplied, wait=50):
+        pass
+    assert widget.tape_pos == 0
+
+
+def test_validation(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    # Problems are only underlined in visible text
+    inspector.show()
+    widget = inspector.widget
+    widget.validation_delay = 0
+    initial = qApp.styleSheet()
+    metrics_count = len(widget.applyMetrics())
+    cursor = widget.style_text_edit.textCursor()
+    cursor.movePosition(cursor.End)
+
+    # Sheets with errors are refused, without touching app style sheet
+    cursor.insertText('QLabel {\n  : red;\n}\n')
+    widget.applyStyleSheet()
+    assert qApp.styleSheet() == initial
+    assert len(widget.applyMetrics()) == metrics_count
+    line = initial.count('\n') + 2
+    assert widget.status_label.text() == (
+        'Style sheet not applied. '
+        'Line {}, column 3: Declaration without property'.format(line))
+    assert widget._extra_selections['problems']
+
+    # Warnings are shown, but don't prevent applies
+    cursor.insertText('QLabel:hovr { colr: red; }\n')
+    qtbot.waitUntil(lambda: len(widget.style_sheet_problems) == 3)
+    cursor.setPosition(
+        widget.style_text_edit.toPlainText().index(': red;'))
+    cursor.insertText('color')
+    qtbot.waitUntil(lambda: len(widget.style_sheet_problems) == 2)
+    assert not any(
+        problem.severity == 'error'
+        for problem in widget.style_sheet_problems)
+    widget.applyStyleSheet()
+    assert qApp.styleSheet() == widget.style_text_edit.toPlainText()
+
+
+def test_linked_files(inspector, qtbot, tmpdir):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    widget = inspector.widget
+    widget.style_sheet_files.reload_delay = 10
+    qss_file = tmpdir.join('app.qss')
+    qss_file.write('QLabel { color: red; }')
+
+    with qtbot.waitSignal(widget.styleSheetApplied):
+        assert widget.linkStyleSheetFiles([str(qss_file)])
+    assert qApp.styleSheet() == 'QLabel { color: red; }'
+    assert widget.style_text_edit.toPlainText() == qApp.styleSheet()
+
+    with qtbot.waitSignal(widget.styleSheetApplied):
+        qss_file.write('QLabel { color: blue; }')
+    assert qApp.styleSheet() == 'QLabel { color: blue; }'
+    assert len(widget.tape) == 3
+    widget.onUndo()
+    assert qApp.styleSheet() == 'QLabel { color: red; }'
+
+    assert not widget.linkStyleSheetFiles([str(tmpdir.join('missing.qss'))])
+    assert 'Could not link files' in widget.status_label.text()
+
+
+def test_history_log(qtbot, tmpdir, initial_qss):
+    path = str(tmpdir.join('history.log'))
+    qApp.setStyleSheet(initial_qss)
+    inspector = StyleSheetInspector(history_log_path=path)
+    qtbot.addWidget(inspector)
+    widget = inspector.widget
+    for size in (1, 2, 3):
+        widget.style_text_edit.setPlainText(
+            'QLabel {{ margin: {}px; }}'.format(size))
+        widget.applyStyleSheet()
+    widget.onUndo()
+    assert widget.tape_pos == 2
+    assert widget.history_log.metrics(2)['tape_pos'] == 2
+
+    # Tape is restored, current state is app style sheet so it isn't added
+    # again
+    restored_inspector = StyleSheetInspector(history_log_path=path)
+    qtbot.addWidget(restored_inspector)
+    restored = restored_inspector.widget
+    assert len(restored.tape) == 4
+    assert restored.tape_pos == 2
+    restored.onRedo()
+    assert qApp.styleSheet() == 'QLabel { margin: 3px; }'
+    restored.onUndo()
+    restored.onUndo()
+    restored.onUndo()
+    assert qApp.styleSheet() == initial_qss
+
+
+def test_template(inspector):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    widget = inspector.widget
+    widget.template_check_box.setChecked(True)
+    template = '@size: 2px;\nQLabel { margin: @size; }\n'
+    widget.style_text_edit.setPlainText(template)
+    widget.applyStyleSheet()
+    assert qApp.styleSheet() == 'QLabel { margin: 2px; }'
+    assert widget.compiled_style_sheet == qApp.styleSheet()
+    assert widget.style_sheet == template
+    assert widget.tape[-1] == template
+
+    widget.style_text_edit.setPlainText(template.replace('2px', '3px'))
+    widget.applyStyleSheet(incremental=True)
+    assert qApp.styleSheet() == 'QLabel { margin: 3px; }'
+    assert widget.last_apply_scope == 'scoped'
+    widget.onUndo()
+    assert qApp.styleSheet() == 'QLabel { margin: 2px; }'
+    assert widget.style_text_edit.toPlainText() == template
+
+    widget.style_text_edit.setPlainText('QLabel { margin: @missing; }')
+    widget.applyStyleSheet()
+    assert qApp.styleSheet() == 'QLabel { margin: 2px; }'
+    assert widget.status_label.text() == \
+        'Could not compile template: Undefined variable "@missing"'
+
+
 @pytest.fixture
 def initial_qss():
     return """\
@@ -168,3 +641,177 @@ def inspector(qtbot, initial_qss):
     inspector_ = StyleSheetInspector()
     qtbot.addWidget(inspector_)
     return inspector_
+
+
+def test_rule_coverage(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    label = QLabel()
+    qtbot.addWidget(label)
+    widget = inspector.widget
+    initial = widget.style_text_edit.toPlainText()
+    cursor = widget.style_text_edit.textCursor()
+    cursor.movePosition(cursor.End)
+    cursor.insertText('\nQLabel#nowhere { color: red; }\nQLabel { }\n')
+    widget.applyStyleSheet()
+    applied = qApp.styleSheet()
+
+    dialog = widget.onRuleCoverage()
+    assert [
+        dialog.table.item(row, 0).text()
+        for row in range(dialog.table.rowCount())
+    ][-1] == 'QLabel#nowhere'
+
+    # Pruning is refused once text changes
+    cursor.insertText(' ')
+    dialog.prune_button.click()
+    assert qApp.styleSheet() == applied
+    cursor.deletePreviousChar()
+
+    dialog.prune_button.click()
+    pruned = qApp.styleSheet()
+    assert 'QLabel#nowhere' not in pruned
+    assert 'QLabel { }' in pruned
+    assert not dialog.isVisible()
+    widget.onUndo()
+    assert qApp.styleSheet() == applied
+    assert initial in applied
+
+
+def test_optimize_style_sheet(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    widget = inspector.widget
+    widget.optimize_timed_applies = 1
+    cursor = widget.style_text_edit.textCursor()
+    cursor.movePosition(cursor.End)
+    cursor.insertText('\n/* dead */\nQLabel { color: red; color: blue; }\n')
+    widget.applyStyleSheet()
+    applied = qApp.styleSheet()
+
+    dialog = widget.onOptimizeStyleSheet()
+    assert qApp.styleSheet() == applied
+    assert 'Apply: ' in dialog.summary_label.text()
+    assert dialog.optimized.endswith('QLabel{color:blue}')
+
+    dialog.apply_button.click()
+    assert qApp.styleSheet() == dialog.optimized
+    assert widget.style_text_edit.toPlainText() == dialog.optimized
+    widget.onUndo()
+    assert qApp.styleSheet() == applied
+
+    cursor.insertText('QLabel {')
+    assert widget.onOptimizeStyleSheet() is None
+    assert 'Could not optimize' in widget.status_label.text()
+
+
+def test_sandbox_preview(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    label = QLabel('Preview')
+    label.setObjectName('preview')
+    qtbot.addWidget(label)
+    label.show()
+    inspector.show()
+    widget = inspector.widget
+    applied = qApp.styleSheet()
+    cursor = widget.style_text_edit.textCursor()
+    cursor.movePosition(cursor.End)
+    cursor.insertText('\n#preview { color: red; }\n')
+
+    dialog = widget.onSandboxPreview()
+    assert inspector not in dialog.widgets
+    dialog.widget_combo.setCurrentIndex(dialog.widgets.index(label))
+    with qtbot.waitSignal(dialog.preview().finished):
+        pass
+    assert qApp.styleSheet() == applied
+    assert dialog.table.rowCount() == 1
+    assert dialog.table.item(0, 0).text() == 'QLabel#preview'
+    assert '1 of 1 visible widgets' in dialog.summary_label.text()
+    assert not dialog.image_label.pixmap().isNull()
+    dialog.close()
+
+    widget.template_check_box.setChecked(True)
+    cursor.insertText('QLabel { color: @missing; }')
+    assert widget.onSandboxPreview() is None
+    assert 'Could not compile' in widget.status_label.text()
+
+
+def test_pick_widget(inspector, qtbot):
+    """
+    :type inspector: qt_style_sheet_inspector.StyleSheetInspector
+    """
+    label = QLabel('Pick')
+    label.setObjectName('pick')
+    qtbot.addWidget(label)
+    inspector.show()
+    label.move(inspector.geometry().right() + 100, 0)
+    label.show()
+    qtbot.waitExposed(label)
+    widget = inspector.widget
+    editor = widget.style_text_edit
+    editor.setPlainText(editor.toPlainText() + (
+        'QLabel { color: red; }\n#pick { color: blue; }'))
+    widget.apply_button.click()
+
+    dialog = widget.onPickWidget()
+    assert widget.widget_picker.isActive()
+    # Clicks in inspector aren't picks
+    qtbot.mouseClick(widget.apply_button, Qt.LeftButton)
+    assert widget.widget_picker.isActive()
+    qtbot.mouseClick(label, Qt.LeftButton)
+    assert not widget.widget_picker.isActive()
+    assert dialog.widget is label
+    assert [match.selector for match in dialog.matches] == [
+        '#pick', 'QLabel', '*']
+    assert dialog.table.item(0, 2).text() == '{}'.format(
+        editor.document().blockCount())
+    # Rule winning conflicts is selected
+    assert editor.textCursor().selectedText() == '#pick { color: blue; }'
+    assert widget.status_label.text() == '3 rules match QLabel'
+
+    # Double click jumps to rule
+    dialog.onCellDoubleClicked(1, 0)
+    assert editor.textCursor().selectedText() == 'QLabel { color: red; }'
+
+    # Rules edited since applied can't be jumped to
+    cursor = editor.textCursor()
+    cursor.insertText('QLabel { color: green; }')
+    widget.showWidgetRules(label)
+    assert dialog.table.item(1, 2).text() == 'edited'
+    dialog.onCellDoubleClicked(1, 0)
+    assert editor.textCursor().selectedText() == '#pick { color: blue; }'
+
+    # Index follows applied style sheet
+    editor.setPlainText('#pick { color: blue; }')
+    widget.apply_button.click()
+    assert [match.selector for match in widget.matchingRules(label)] == [
+        '#pick']
+    dialog.close()
+
+
+@pytest.mark.parametrize('isolate_style', [True, False])
+def test_isolate_style(qtbot, isolate_style):
+    qApp.setStyleSheet('')
+    inspector = StyleSheetInspector(isolate_style=isolate_style)
+    qtbot.addWidget(inspector)
+    inspector.show()
+    widget = inspector.widget
+    editor = widget.style_text_edit
+    font = editor.font()
+
+    widget._replaceStyleText(
+        '* { font-size: 40px; }\nQPushButton { color: red; }')
+    widget.applyStyleSheet()
+    color = widget.apply_button.palette().color(QPalette.ButtonText)
+    if isolate_style:
+        assert editor.font() == font
+        assert color != QColor('red')
+    else:
+        assert editor.font().pixelSize() == 40
+        assert color == QColor('red')
+    # Editor lays out its document with its font
+    assert editor.document().defaultFont() == editor.font()
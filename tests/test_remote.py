@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+from PyQt5.QtCore import QDir
+from PyQt5.QtWidgets import qApp
+from qt_style_sheet_inspector import RemoteStyleSheet, StyleSheetAgent, \
+    StyleSheetInspector
+from qt_style_sheet_inspector._remote import MessageBuffer, encode_message, \
+    server_running
+
+
+def test_messages():
+    messages = [
+        {'t': 'load'},
+        {'t': 'apply', 'a': 'undo', 'd': [1, 2, 'QLabel { }' * 1000]},
+    ]
+    data = b''.join(encode_message(message) for message in messages)
+    # Big messages are compressed
+    assert len(data) < 1000
+    buffer_ = MessageBuffer()
+    assert buffer_.feed(data[:5]) == []
+    assert buffer_.feed(data[5:-1]) == messages[:1]
+    assert buffer_.feed(data[-1:]) == messages[1:]
+
+
+@pytest.fixture
+def remote_app():
+    """
+    :return: local server name of a stand-in app with an agent, running in
+        another process.
+    """
+    name = 'qt_style_sheet_inspector_test_{}'.format(os.getpid())
+    tests_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(tests_dir)] +
+        ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(tests_dir, 'remote_app.py'), name],
+        stdout=subprocess.PIPE, env=env)
+    try:
+        assert process.stdout.readline().strip() == b'ready'
+        yield name
+    finally:
+        process.kill()
+        process.wait()
+        process.stdout.close()
+
+
+def test_remote_inspector(qtbot, remote_app):
+    qApp.setStyleSheet('')
+    remote = RemoteStyleSheet()
+    remote.timeout = 10000
+    remote.connectToAgent(remote_app)
+    inspector = StyleSheetInspector(app_style_sheet=remote)
+    qtbot.addWidget(inspector)
+    widget = inspector.widget
+    assert widget.style_text_edit.toPlainText() == 'QLabel { color: red; }'
+
+    cursor = widget.style_text_edit.textCursor()
+    cursor.movePosition(cursor.End)
+    cursor.insertText('\nQPushButton { color: blue; }')
+    with qtbot.waitSignal(remote.metricsReceived) as blocker:
+        widget.applyStyleSheet()
+    action, _repolish_time, polished_count = blocker.args
+    assert action == 'apply'
+    # Stand-in app widgets, not inspector ones
+    assert polished_count == 3
+    assert widget.applyMetrics()[-1].polished_count == 3
+    assert remote.styleSheet() == (
+        'QLabel { color: red; }\nQPushButton { color: blue; }')
+    assert qApp.styleSheet() == ''
+
+    with qtbot.waitSignal(remote.metricsReceived) as blocker:
+        widget.onUndo()
+    assert blocker.args[0] == 'undo'
+    assert remote.styleSheet() == 'QLabel { color: red; }'
+
+    # Features that need app widgets aren't available
+    assert widget.onRuleCoverage() is None
+    assert 'another process' in widget.status_label.text()
+
+
+def test_remote_errors(qtbot):
+    remote = RemoteStyleSheet()
+    remote.timeout = 1000
+    with pytest.raises(IOError):
+        remote.connectToAgent('qt_style_sheet_inspector_test_missing')
+    with pytest.raises(IOError):
+        remote.styleSheet()
+
+
+@pytest.mark.skipif(
+    not hasattr(socket, 'AF_UNIX'), reason='needs Unix domain sockets')
+def test_agent_listen(qtbot):
+    name = 'qt_style_sheet_inspector_test_listen_{}'.format(os.getpid())
+    agent = StyleSheetAgent()
+    assert agent.listen(name)
+    try:
+        # Only user can connect
+        path = os.path.join(QDir.tempPath(), name)
+        assert os.stat(path).st_mode & 0o077 == 0
+        # Server of an app still running is kept
+        other = StyleSheetAgent()
+        assert not other.listen(name)
+        assert server_running(name)
+    finally:
+        agent.close()
+    assert not server_running(name)
+
+    # Server left behind by a crashed app is replaced
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+    try:
+        assert agent.listen(name)
+        assert server_running(name)
+    finally:
+        agent.close()
+
+
+def test_remote_apply_timeout(qtbot):
+    name = 'qt_style_sheet_inspector_test_timeout_{}'.format(os.getpid())
+    agent = StyleSheetAgent()
+    assert agent.listen(name)
+    try:
+        remote = RemoteStyleSheet()
+        remote.timeout = 100
+        remote.connectToAgent(name)
+        # Agent in this process can't answer while remote waits for it
+        with pytest.raises(IOError):
+            remote.setStyleSheet('QLabel { color: red; }')
+        # Next apply is sent as a delta from the last style sheet agent has
+        assert remote._synced == ''
+    finally:
+        agent.close()
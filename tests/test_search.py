@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import re
+
+import pytest
+from PyQt5.QtCore import QRegularExpression
+from qt_style_sheet_inspector._search import RegexSearcher, SearchIndex, \
+    _SearchState, _SearchTask, next_hit, previous_hit
+
+
+def _expected_hits(text, query):
+    return [m.start() for m in re.finditer(
+        '(?={})'.format(re.escape(query.lower())), text.lower())]
+
+
+@pytest.mark.parametrize('position, removed, added', [
+    (0, 0, 'PX '),
+    (10, 4, ''),
+    (11, 2, 'pXp'),
+    (13, 0, 'p'),
+    (30, 5, 'xpx px'),
+])
+def test_search_index_update(position, removed, added):
+    text = 'margin: 0px; padding: 1px; border: 2px;'
+    index = SearchIndex(text)
+    assert index.find('Px') == _expected_hits(text, 'px')
+
+    new_text = text[:position] + added + text[position + removed:]
+    index.update(position, removed, added)
+    assert len(index) == len(new_text)
+    assert index.find('px') == _expected_hits(new_text, 'px')
+
+
+def test_search_index_keeps_offsets():
+    # Lower case of 'İ' has 2 chars
+    index = SearchIndex('İx px')
+    assert index.find('px') == [3]
+    assert len(index) == 5
+    index.update(0, 0, 'İ')
+    assert index.find('px') == [4]
+    assert index.find('İX') == [1]
+
+
+def test_next_previous_hit():
+    hits = [2, 10, 20]
+    assert next_hit(hits, 0) == 0
+    assert next_hit(hits, 10) == 1
+    assert next_hit(hits, 21) == 0
+    assert previous_hit(hits, 10) == 0
+    assert previous_hit(hits, 2) == 2
+    assert next_hit([], 0) is None
+    assert previous_hit([], 0) is None
+
+
+@pytest.mark.parametrize('pattern, options, expected', [
+    ('[0-9]px', {}, [(8, 11), (22, 25)]),
+    ('PX', {'regex': False, 'case_sensitive': True}, []),
+    ('px', {'regex': False, 'whole_words': True}, []),
+    ('margin', {'regex': False, 'whole_words': True}, [(0, 6)]),
+])
+def test_regex_searcher(qtbot, searcher, pattern, options, expected):
+    with qtbot.waitSignal(searcher.finished) as blocker:
+        searcher.search('margin: 0px; padding: 1px;', pattern, **options)
+    starts, ends = blocker.args
+    assert list(zip(starts, ends)) == expected
+
+
+def test_regex_searcher_cancel(qtbot, searcher):
+    results = []
+    searcher.finished.connect(lambda starts, ends: results.append(starts))
+    searcher.search('a' * 100000, 'a')
+    searcher.search('abc', 'b')
+    qtbot.waitUntil(lambda: not searcher.isRunning())
+    qtbot.waitUntil(lambda: bool(results))
+    qtbot.wait(10)
+    assert results == [[1]]
+
+    with qtbot.waitSignal(searcher.failed) as blocker:
+        searcher.search('abc', '(')
+    assert blocker.args[0]
+
+
+class _StaleState(object):
+    """
+    Search state cancelled while a search is halfway through.
+    """
+
+    def __init__(self, fresh_reads):
+        self._fresh_reads = fresh_reads
+
+    @property
+    def generation(self):
+        self._fresh_reads -= 1
+        return 0 if self._fresh_reads >= 0 else 1
+
+
+def test_search_task_cancel_without_hits():
+    text = 'b' + 'a' * 4 * RegexSearcher.CANCEL_CHECK_INTERVAL
+    expression = QRegularExpression('b*')
+    task = _SearchTask(_SearchState(), 0, text, expression, None)
+    assert task._search() == ([0], [1])
+
+    task = _SearchTask(_StaleState(2), 0, text, expression, None)
+    assert task._search() is None
+
+
+@pytest.fixture
+def searcher(qtbot):
+    searcher_ = RegexSearcher()
+    yield searcher_
+    searcher_.cancel()
+    qtbot.waitUntil(lambda: not searcher_.isRunning())
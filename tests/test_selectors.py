@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import pytest
+from PyQt5.QtWidgets import QComboBox, QDialog, QLabel, QMenu, \
+    QPushButton, QWidget
+from qt_style_sheet_inspector._qss import diff_rules, split_rules
+from qt_style_sheet_inspector._selectors import parse_selector, \
+    selector_matches, split_selector_group
+
+
+def test_split_rules():
+    rules = split_rules("""
+        /* header */
+        QLabel, QLineEdit {
+            color:   red;
+            margin: 0px;
+        }
+        #ok{border:0px}
+        QLabel { image: url("a{b}.png"); }
+    """)
+    assert rules == [
+        ('QLabel, QLineEdit', 'color: red;margin: 0px'),
+        ('#ok', 'border:0px'),
+        ('QLabel', 'image: url("a{b}.png")'),
+    ]
+
+    with pytest.raises(ValueError):
+        split_rules('QLabel { color: red;')
+
+
+def test_diff_rules():
+    old = [('A', 'x'), ('B', 'y'), ('C', 'z')]
+    new = [('A', 'x'), ('B', 'w'), ('C', 'z')]
+    assert diff_rules(old, new) == ([('B', 'y')], [('B', 'w')])
+    assert diff_rules(old, old) == ([], [])
+
+
+def test_parse_selector():
+    selector = parse_selector(
+        'QDialog > QPushButton#ok[flat="true"]:!hover::menu-indicator')
+    assert len(selector.parts) == 2
+    subject = selector.subject
+    assert subject.type_name == 'QPushButton'
+    assert subject.object_name == 'ok'
+    assert subject.attributes == (('flat', '=', 'true'),)
+    assert subject.pseudo_states == ('!hover',)
+    assert subject.subcontrol == 'menu-indicator'
+    assert selector.specificity() == (1, 2, 2)
+
+    assert split_selector_group('QLabel, QLineEdit[a="x,y"]') == \
+        ['QLabel', 'QLineEdit[a="x,y"]']
+
+    with pytest.raises(ValueError):
+        parse_selector('QLabel {')
+
+
+def test_selector_matches(qtbot):
+    dialog = QDialog()
+    qtbot.addWidget(dialog)
+    frame = QWidget(dialog)
+    button = QPushButton(frame)
+    button.setObjectName('ok')
+    button.setFlat(True)
+    label = QLabel(dialog)
+
+    def matches(text, widget):
+        return selector_matches(parse_selector(text), widget)
+
+    assert matches('QPushButton', button)
+    assert matches('QAbstractButton', button)
+    assert not matches('.QAbstractButton', button)
+    assert matches('#ok[flat="true"]', button)
+    assert not matches('#ok[flat="false"]', button)
+    assert matches('QDialog QPushButton', button)
+    assert not matches('QDialog > QPushButton', button)
+    assert matches('QDialog > QLabel:hover', label)
+
+
+def test_selector_matches_pseudo_states(qtbot):
+    dialog = QDialog()
+    qtbot.addWidget(dialog)
+    button = QPushButton(dialog)
+    menu = QMenu(dialog)
+    combo_box = QComboBox(dialog)
+    label = QLabel(dialog)
+
+    def matches(text, widget):
+        return selector_matches(
+            parse_selector(text), widget, pseudo_states=True)
+
+    assert not matches('QPushButton:checked', button)
+    assert matches('QPushButton:!checked', button)
+    assert matches('QPushButton:hover', button)
+    button.setCheckable(True)
+    assert matches('QPushButton:checked', button)
+    assert not matches('QPushButton:flat', button)
+    # Pseudo states of sub-controls are the ones of items, not of widget
+    assert matches('QMenu::item:checked', menu)
+    assert matches('QPushButton::menu-indicator:flat', button)
+    # Check states only need checkable buttons
+    assert matches('QComboBox:on', combo_box)
+    assert matches('QLabel:checked', label)
+    assert not matches('QComboBox:editable', combo_box)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import os
+
+import pytest
+from qt_style_sheet_inspector._qss import ParsedStyleSheet, split_rules
+from qt_style_sheet_inspector._template import StyleSheetTemplate, \
+    TemplateError
+
+
+def test_at_statements_are_skipped():
+    parsed = ParsedStyleSheet(
+        '@accent: red;\n@import "base.qss";\nQLabel { color: @accent; }')
+    assert not parsed.errors
+    assert [rule.selector for rule in parsed.rules] == ['QLabel']
+
+
+def test_compile():
+    template = StyleSheetTemplate()
+    compiled = template.compile(
+        '/* colors */\n'
+        '@accent: #336699;\n'
+        '@border: 1px solid @accent;\n'
+        'QLabel { color: @accent; }\n'
+        'QLineEdit { border: @border; image: url(icon@2x.png); }\n'
+        'QComboBox { margin: 2px; }\n')
+    assert compiled.text == (
+        'QLabel { color: #336699; }\n'
+        'QLineEdit { border: 1px solid #336699; image: url(icon@2x.png); }\n'
+        'QComboBox { margin: 2px; }')
+    assert compiled.rules == split_rules(compiled.text)
+
+
+def test_compile_comments():
+    template = StyleSheetTemplate()
+    compiled = template.compile(
+        '@accent: #336699;\n'
+        'QLabel /* @label */ { color: @accent; /* see @accent, @missing */ }')
+    assert compiled.text == (
+        'QLabel /* @label */ { color: #336699; /* see @accent, @missing */ }')
+    assert compiled.rules == split_rules(compiled.text)
+
+
+def test_compile_memoized(monkeypatch):
+    template = StyleSheetTemplate()
+    text = (
+        '@a: red;\n@b: blue;\n'
+        'QLabel { color: @a; }\nQLineEdit { color: @b; }\n')
+    template.compile(text)
+    compiled_fragments = []
+    original = template._compileFragment
+
+    def compile_fragment(fragment, rule, values):
+        compiled_fragments.append(fragment)
+        return original(fragment, rule, values)
+
+    monkeypatch.setattr(template, '_compileFragment', compile_fragment)
+    assert template.compile(text).text == \
+        'QLabel { color: red; }\nQLineEdit { color: blue; }'
+    assert template.compile('\n' + text).text == \
+        'QLabel { color: red; }\nQLineEdit { color: blue; }'
+    assert compiled_fragments == []
+
+    # Only rules using changed variable are compiled again
+    compiled = template.compile(text.replace('@b: blue', '@b: green'))
+    assert compiled.text == \
+        'QLabel { color: red; }\nQLineEdit { color: green; }'
+    assert compiled_fragments == ['QLineEdit { color: @b; }']
+
+
+def test_compile_imports(tmpdir):
+    tmpdir.mkdir('theme').join('colors.qss').write(
+        '@accent: red;\n@import "widgets.qss";\n')
+    tmpdir.join('theme', 'widgets.qss').write('QLabel { color: @accent; }')
+    template = StyleSheetTemplate(include_paths=[str(tmpdir)])
+    text = '@import url(theme/colors.qss);\nQLineEdit { color: @accent; }'
+    assert template.compile(text).text == \
+        'QLabel { color: red; }\nQLineEdit { color: red; }'
+
+    # Imported files are read again when modified
+    colors = tmpdir.join('theme', 'colors.qss')
+    colors.write('@accent: blue;\n@import "widgets.qss";\n')
+    os.utime(str(colors), (0, 1))
+    assert template.compile(text).text == \
+        'QLabel { color: blue; }\nQLineEdit { color: blue; }'
+
+
+@pytest.mark.parametrize('text, message', [
+    ('QLabel { color: @missing; }', 'Undefined variable "@missing"'),
+    ('@a: @b;\n@b: @a;\n', 'Circular variable'),
+    ('@import "missing.qss";', 'Imported file not found: missing.qss'),
+    ('@import missing.qss;', 'Invalid import'),
+])
+def test_compile_errors(text, message):
+    template = StyleSheetTemplate()
+    with pytest.raises(TemplateError) as error:
+        template.compile(text)
+    assert message in '{}'.format(error.value)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from qt_style_sheet_inspector._qss import ParsedStyleSheet
+from qt_style_sheet_inspector._validation import SEVERITY_ERROR, \
+    SEVERITY_WARNING, style_sheet_problems, validate_rules
+
+
+def test_valid_style_sheet():
+    parsed = ParsedStyleSheet(
+        'QPushButton:!hover:checked { color: red; qproperty-flat: 1; }\n'
+        'QLabel { -qt-background-role: base; }')
+    assert style_sheet_problems(parsed) == []
+
+
+def test_problems():
+    text = (
+        'QLabel:hovr { colr: red; }\n'
+        'QLineEdit { : blue; }\n'
+        'QComboBox { color: red;')
+    parsed = ParsedStyleSheet(text)
+    problems = style_sheet_problems(parsed)
+    assert [(p.severity, p.message) for p in problems] == [
+        (SEVERITY_WARNING, 'Unknown pseudo state ":hovr"'),
+        (SEVERITY_WARNING, 'Unknown property "colr"'),
+        (SEVERITY_ERROR, 'Declaration without property'),
+        (SEVERITY_ERROR, 'Unterminated rule'),
+    ]
+    assert text[problems[0].start:problems[0].end] == 'QLabel:hovr '
+    assert text[problems[1].start:problems[1].end] == 'colr: red'
+    assert text[problems[2].start:problems[2].end] == ': blue'
+
+
+def test_validate_rules_cache():
+    parsed = ParsedStyleSheet(
+        'A { }\nB { }\nC { colr: red; }\nD { }\n')
+    assert validate_rules(parsed.rules, parsed.text)
+    rule = parsed.rules[2]
+    problems = rule.problems
+    assert len(problems) == 1
+
+    # Rules after an edit keep their problems, edited rules are validated
+    # again
+    parsed.update(parsed.text.index('B { ') + 4, 0, 'color: red; ')
+    assert parsed.rules[2] is rule
+    assert rule.problems is problems
+    assert parsed.rules[1].problems is None
+    problem, = style_sheet_problems(parsed)
+    assert parsed.text[problem.start:problem.end] == 'colr: red'
+
+
+def test_validate_rules_deadline():
+    parsed = ParsedStyleSheet('QLabel { color: red; }\n' * 200)
+    assert not validate_rules(parsed.rules, parsed.text, deadline=0.0)
+    assert validate_rules(parsed.rules, parsed.text)
+    assert all(rule.problems == [] for rule in parsed.rules)